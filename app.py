@@ -1,18 +1,31 @@
-from flask import Flask, render_template, request, redirect, url_for, send_file, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, send_file, flash, session, jsonify, g
 from flask_migrate import Migrate
 from flask_wtf import CSRFProtect
 import os
 from werkzeug.utils import secure_filename
+from werkzeug.http import quote_etag
 from gallery.models.exhibit import db
 from gallery.models.wall import Wall
 from gallery.models.exhibit import Exhibit
 from gallery.models import db
-from gallery.models.project_exporter import export_exhibit_to_excel, import_exhibit_from_excel
+from gallery.models.project_exporter import (export_exhibit_to_excel, export_guest_exhibit_to_excel,
+                                             import_exhibit_from_excel, ExcelImportError, SheetPool)
 from gallery.models.user import User
 from gallery.models.base import db
 from gallery.models.artwork import Artwork
+from gallery.models.pool_metrics import PoolMetrics
+from gallery.models.query_stats import QueryStats
+from gallery.models.sqlite_mode import SQLiteMode
+from gallery.models.guest_migration import migrate_guest_session
+from gallery.models.guest_cleanup import GuestCleanup, GUEST_UPLOAD_DIR
+from gallery.models.exhibit_listing import user_exhibit_page, guest_exhibit_page
+from gallery.models.export_jobs import ExportJobs, JOB_FORMATS
+from gallery.models.export_cache import ExportCache, exhibit_fingerprint, guest_fingerprint, export_key
+from gallery.models.wall_scene import (WallSceneCache, scene_document, guest_scene_document, encode_scene,
+                                       scene_etag, guest_scene_etag)
 from authlib.integrations.flask_client import OAuth
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, select, or_, and_
+from sqlalchemy.orm import joinedload, selectinload
 from config import load_config
 from authlib.integrations.base_client.errors import MismatchingStateError
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -59,6 +72,19 @@ engine = create_engine(db_url)
 print(f"Using {db_config['type'].upper()} database: {safe_url}")
 app.config['SQLALCHEMY_DATABASE_URI'] = db_url
 
+# Checkout waits, overflow and connection age are exported on /admin/db-stats
+db_pool_metrics = PoolMetrics()
+# Statement count and time per request, see report_query_log
+query_stats = QueryStats()
+engine_options = {'poolclass': db_pool_metrics.pool_class()}
+if db_config['type'] == 'mysql':
+    engine_options.update({key: db_config[key] for key in
+                           ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')})
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+# SQLite: WAL, pragmas and serialized write transactions (see start_query_log)
+sqlite_mode = SQLiteMode(db_config['pragmas'], db_config['serialize_writes']) if db_config['type'] == 'sqlite' else None
+
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
@@ -66,16 +92,40 @@ migrate = Migrate(app, db)
 csrf = CSRFProtect(app)
 
 with app.app_context():
+    db_pool_metrics.attach(db.engine)
+    query_stats.attach(db.engine)
+    if sqlite_mode:
+        sqlite_mode.attach(db.engine)
     db.create_all()
 
 # Import or define RedisSessionManager before using it
-from gallery.models.redis_manager import RedisSessionManager  # Adjust the import path as needed
+from gallery.models.redis_manager import RedisSessionManager, SessionConflictError, has_child, MAX_MEMORY_SAMPLE  # Adjust the import path as needed
+from gallery.models.unit_of_work import GuestUnitOfWork
 
 # Initialize Redis after config loading
-redis_manager = RedisSessionManager(
-    host=config['redis']['host'],
-    port=config['redis']['port']
-)
+redis_manager = RedisSessionManager.from_config(config['redis'])
+
+# Serialized wall scenes, keyed by wall id and version
+scene_cache = WallSceneCache(redis_manager.redis)
+
+# Expired guest rows and unused uploads, see schedule_cleanup
+guest_cleanup = GuestCleanup.from_config(redis_manager, os.path.join(app.static_folder, 'uploads'), config['cleanup'])
+
+# Finished exports by exhibit content hash, shared by /export-exhibit and the jobs
+export_cache = ExportCache.from_config(config['export_cache'])
+
+# Worker processes for the per-wall sheets of large Excel exports; on a
+# single core they would only add pickling overhead
+sheet_processes = min(config['jobs']['sheet_processes'], os.cpu_count() or 1)
+sheet_pool = SheetPool(sheet_processes) if sheet_processes > 1 else None
+
+# Exports that run in the background; clients poll /export-jobs/<id>
+export_jobs = ExportJobs.from_config(redis_manager.redis, app, export_cache, config['jobs'], sheet_pool)
+
+@app.errorhandler(SessionConflictError)
+def session_conflict(e):
+    logger.warning(f"[REDIS] {e}")
+    return jsonify({'success': False, 'error': 'The session was changed concurrently, please retry'}), 409
 
 def load_projects_for_user(user_id):
     return Exhibit.query.filter_by(user_id=user_id).all()
@@ -83,8 +133,96 @@ def load_projects_for_user(user_id):
 def load_temp_projects_for_guest(guest_id):
     return Exhibit.query.filter_by(guest_id=guest_id).all()
 
+# Per-request cache: the user, the guest session and the current wall are each
+# loaded at most once per request and shared by helpers and handlers via flask.g.
+# Guest changes made through guest_unit().mutate() are written back once, after
+# the handler has run.
+def current_user():
+    """The logged-in User, or None"""
+    if '_current_user' not in g:
+        user_id = session.get('user_id')
+        g._current_user = db.session.get(User, user_id) if user_id else None
+    return g._current_user
+
+def guest_unit():
+    """The request's GuestUnitOfWork, or None if this is not a guest session"""
+    guest_id = session.get('guest_session_id')
+    if not guest_id:
+        return None
+    unit = g.get('_guest_unit')
+    if unit is None or unit.session_id != guest_id:
+        unit = g._guest_unit = GuestUnitOfWork(redis_manager, guest_id)
+    return unit
+
+def guest_document():
+    """The guest session as a GuestSession, loaded once per request"""
+    unit = guest_unit()
+    return unit.document if unit else None
+
+@app.after_request
+def flush_guest_session(response):
+    unit = g.get('_guest_unit')
+    if unit is not None and response.status_code < 500:
+        try:
+            unit.flush()
+        except SessionConflictError as e:
+            return app.make_response(session_conflict(e))
+    return response
+
+@app.before_request
+def start_query_log():
+    g._query_log = query_stats.start()
+    if sqlite_mode:
+        # Requests that may write take the SQLite write lock when their transaction begins
+        sqlite_mode.set_writing(request.method not in ('GET', 'HEAD', 'OPTIONS'))
+
+@app.after_request
+def report_query_log(response):
+    log = g.pop('_query_log', None)
+    if log is None:
+        return response
+    query_stats.stop(log)
+    response.headers['Server-Timing'] = f'db;dur={log.duration * 1000:.1f};desc="{log.count} queries"'
+    repeated = log.repeated()
+    if (repeated or log.count > db_config['query_warn_count']
+            or log.duration * 1000 > db_config['query_warn_ms']):
+        logger.warning(f"[DB] {request.method} {request.path}: {log.summary()}")
+        for shape, n in repeated.items():
+            logger.warning(f"[DB]   possible N+1, {n}x: {shape[:200]}")
+    return response
+
+@app.teardown_request
+def drop_query_log(exc):
+    log = g.pop('_query_log', None)
+    if log is not None:
+        query_stats.stop(log)
+    if sqlite_mode:
+        sqlite_mode.set_writing(False)
+
+def user_exhibit_artworks(user_id, exhibit_id):
+    """
+    Query for a user's artworks in one exhibit: those hanging on any of its
+    walls plus the unplaced ones (artworks created before they were tagged
+    with an exhibit count as unplaced in every exhibit).
+    """
+    exhibit_walls = select(Wall.id).where(Wall.exhibit_id == exhibit_id)
+    return Artwork.query.filter(
+        Artwork.user_id == user_id,
+        or_(
+            Artwork.wall_id.in_(exhibit_walls),
+            and_(Artwork.wall_id.is_(None),
+                 or_(Artwork.exhibit_id == exhibit_id, Artwork.exhibit_id.is_(None)))
+        )
+    )
+
 def get_current_wall():
     wall_id = session.get("current_wall_id")
+    cached = g.get('_current_wall')
+    if cached is None or cached[0] != wall_id:
+        cached = g._current_wall = (wall_id, _load_current_wall(wall_id))
+    return cached[1]
+
+def _load_current_wall(wall_id):
     if wall_id is None:
         logger.info("No current_wall_id in session")
         return None
@@ -93,23 +231,27 @@ def get_current_wall():
     guest_id = session.get('guest_session_id')
     
     if user_id:
-        # Regular user - get from DB
-        wall = db.session.get(Wall, wall_id)
+        # Regular user - get from DB, with everything the wall pages render
+        # loaded up front (one statement per collection instead of one per row)
+        wall = Wall.query.options(
+            joinedload(Wall.exhibit),
+            selectinload(Wall.artworks),
+            selectinload(Wall.permanent_objects),
+            selectinload(Wall.snap_lines)
+        ).filter_by(id=wall_id).first()
         if wall:
-            exhibit = Exhibit.query.get(wall.exhibit_id)
+            exhibit = wall.exhibit
             if exhibit and exhibit.user_id == user_id:
                 logger.info(f"[DB] Retrieved wall {wall_id} for user {user_id}")
                 return wall
     elif guest_id:
         # Guest user - get from Redis
-        guest_data = redis_manager.get_session(guest_id)
-        if guest_data:
+        guest_doc = guest_document()
+        if guest_doc:
             exhibit_id = session.get('current_exhibit_id')
-            exhibits = guest_data.get('data', {}).get('exhibits', [])
-            exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
+            exhibit = guest_doc.exhibit(exhibit_id)
             if exhibit:
-                walls = exhibit.get('walls', [])
-                wall = next((w for w in walls if str(w.get('id')) == str(wall_id)), None)
+                wall = guest_doc.wall(wall_id, exhibit_id)
                 if wall:
                     logger.info(f"[REDIS] Retrieved wall {wall_id} for guest {guest_id}")
                     return wall
@@ -142,15 +284,14 @@ def guest():
 def home():
     # Regular user session
     if 'user_id' in session:
-        user = User.query.get(session['user_id'])
+        user = current_user()
         if user:
             projects = Exhibit.query.filter_by(user_id=user.id).all()
             return render_template('home.html', projects=projects, user=user)
     
     # Guest session
     if 'guest_session_id' in session:
-        guest_data = redis_manager.get_session(session['guest_session_id'])
-        if guest_data:
+        if guest_document():
             projects = []  # Or load from Redis if you store projects there
             return render_template('home.html', 
                                 projects=projects, 
@@ -159,66 +300,22 @@ def home():
     return redirect(url_for('landing_page'))
     
 def migrate_guest_data(guest_session_id, user_id):
-    """Move guest data from Redis to database"""
-    guest_data = redis_manager.get_session(guest_session_id)
-    if not guest_data:
-        return []
-    exhibits = []
-    for exhibit in guest_data.get('data', {}).get('exhibits', []):
-        new_exhibit = Exhibit(
-            name=exhibit.get('name', 'Untitled'),
-            user_id=user_id,
-            guest_id=None
-        )
-        db.session.add(new_exhibit)
-        db.session.flush()  # Get new_exhibit.id
-
-        # Migrate walls if present
-        for wall in exhibit.get('walls', []):
-            from gallery.models.wall import Wall
-            new_wall = Wall(
-                name=wall.get('name', 'Wall'),
-                width=wall.get('width', 0),
-                height=wall.get('height', 0),
-                color=wall.get('color', 'White'),
-                exhibit_id=new_exhibit.id
-            )
-            db.session.add(new_wall)
-            db.session.flush()  # Get new_wall.id
-
-            # Migrate artworks placed on this wall
-            for artwork in wall.get('artworks', []):
-                from gallery.models.artwork import Artwork
-                new_artwork = Artwork(
-                    name=artwork.get('name', 'Artwork'),
-                    width=artwork.get('width', 0),
-                    height=artwork.get('height', 0),
-                    wall_id=new_wall.id,
-                    exhibit_id=new_exhibit.id,
-                    user_id=user_id
-                )
-                db.session.add(new_artwork)
-
-        # Migrate unplaced artworks
-        for artwork in exhibit.get('artworks', []):
-            from gallery.models.artwork import Artwork
-            new_artwork = Artwork(
-                name=artwork.get('name', 'Artwork'),
-                width=artwork.get('width', 0),
-                height=artwork.get('height', 0),
-                wall_id=None,
-                exhibit_id=new_exhibit.id,
-                user_id=user_id
-            )
-            db.session.add(new_artwork)
-
-        exhibits.append(new_exhibit)
-        logger.info(f"[DB] Migrated guest exhibit to user: {new_exhibit.name} (user_id={user_id})")
-
+    """
+    Move guest data from Redis to database, returning the new exhibit ids.
+    Sign-in is a GET, so the migration's transaction is marked as a write
+    here: under SQLite it then holds the write lock from BEGIN, which the
+    id allocation relies on.
+    """
+    # End the sign-in's read transaction first; the next one begins marked
     db.session.commit()
-    redis_manager.delete_session(guest_session_id)
-    logger.info(f"[REDIS] Deleted guest session after migration: {guest_session_id}")
-    return exhibits  
+    if not sqlite_mode:
+        return migrate_guest_session(redis_manager, guest_session_id, user_id)
+    with sqlite_mode.writing():
+        try:
+            return migrate_guest_session(redis_manager, guest_session_id, user_id)
+        finally:
+            # An already migrated session reads only; release the lock anyway
+            db.session.rollback()
 
 @app.route('/new-exhibit', methods=['GET', 'POST'])
 def new_exhibit():
@@ -239,24 +336,17 @@ def new_exhibit():
             session['current_exhibit_id'] = exhibit.id
         elif 'guest_session_id' in session:
             # Guest: store in Redis
-            guest_data = redis_manager.get_session(session['guest_session_id']) or {'data': {}}
-            exhibits = guest_data.get('data', {}).get('exhibits', [])
             # Assign a unique id (use uuid4 for uniqueness)
-            import uuid
-            exhibit_id = str(uuid.uuid4())
+            exhibit_id = str(uuid4())
             new_exhibit = {
                 'id': exhibit_id,
                 'name': exhibit_name,
                 'walls': [],
                 'artworks': []
             }
-            exhibits.append(new_exhibit)
-            # Save back to Redis
-            if 'exhibits' not in guest_data.get('data', {}):
-                guest_data['data']['exhibits'] = exhibits
-            else:
-                guest_data['data']['exhibits'] = exhibits
-            redis_manager.update_session(session['guest_session_id'], guest_data['data'])
+            if not redis_manager.add_entity(session['guest_session_id'], 'exhibit', new_exhibit):
+                flash("Session expired. Please start again.", "error")
+                return redirect(url_for('landing_page'))
             logger.info(f"[REDIS] Created guest exhibit: {exhibit_name} (id={exhibit_id}) in session {session['guest_session_id']}")
             session['current_exhibit_id'] = exhibit_id
         else:
@@ -288,13 +378,8 @@ def load_exhibit():
             return redirect(url_for('select_wall_space'))
         elif 'guest_session_id' in session:
             # Guest: load from Redis
-            guest_data = redis_manager.get_session(session['guest_session_id'])
-            exhibits = guest_data.get('data', {}).get('exhibits', []) if guest_data else []
-            selected = None
-            for ex in exhibits:
-                if str(ex.get('id')) == str(exhibit_id):
-                    selected = ex
-                    break
+            guest_doc = guest_document()
+            selected = guest_doc.exhibit(exhibit_id) if guest_doc else None
             if selected:
                 session['current_exhibit_id'] = selected['id']
                 flash(f"Loaded exhibit: {selected.get('name', 'Untitled')}", "success")
@@ -303,24 +388,157 @@ def load_exhibit():
                 flash("Exhibit not found.", "danger")
                 return redirect(url_for('load_exhibit'))
 
-    # GET request — just show the list
+    # GET request — show one page of the list
+    after = request.args.get('after')
     if user_id:
         # Logged-in user: load from DB
-        exhibits = Exhibit.query.filter_by(user_id=user_id).all()
-        return render_template('load_exhibit.html', exhibits=exhibits)
+        exhibits, next_cursor = user_exhibit_page(user_id, after=after if (after or '').isdigit() else None)
+        return render_template('load_exhibit.html', exhibits=exhibits, next_cursor=next_cursor)
     elif 'guest_session_id' in session:
         # Guest: load from Redis
-        guest_data = redis_manager.get_session(session['guest_session_id'])
-        exhibits = []
-        if guest_data:
-            for idx, ex in enumerate(guest_data.get('data', {}).get('exhibits', [])):
-                ex = ex.copy()
-                ex['id'] = ex.get('id', str(idx))
-                exhibits.append(ex)
-        return render_template('load_exhibit.html', exhibits=exhibits, is_guest=True)
+        exhibits, next_cursor = guest_exhibit_page(guest_document(), after=after)
+        return render_template('load_exhibit.html', exhibits=exhibits, next_cursor=next_cursor, is_guest=True)
     else:
         return render_template('load_exhibit.html', exhibits=[])
 
+@app.route('/api/exhibits')
+def list_exhibits():
+    """
+    One page of the current user's (or guest's) exhibits, newest first, each
+    with wall, artwork, placed and unplaced counts and last-modified time.
+    Query: limit (max 100), after (the next_cursor of the previous page).
+    """
+    limit = request.args.get('limit', type=int)
+    after = request.args.get('after')
+    user_id = session.get('user_id')
+
+    if user_id:
+        if after is not None and not after.isdigit():
+            return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+        exhibits, next_cursor = user_exhibit_page(user_id, limit, after)
+    elif 'guest_session_id' in session:
+        exhibits, next_cursor = guest_exhibit_page(guest_document(), limit, after)
+    else:
+        return jsonify({'success': False, 'error': 'Session expired'}), 403
+    return jsonify({'success': True, 'exhibits': exhibits, 'next_cursor': next_cursor})
+
+@app.route('/export-exhibit')
+def export_exhibit():
+    """
+    The current exhibit (or ?exhibit_id=) as an .xlsx download. An exhibit
+    unchanged since its last export is sent from the export cache; otherwise
+    the workbook is built in constant memory straight into the cache.
+    """
+    exhibit_id = request.args.get('exhibit_id') or session.get('current_exhibit_id')
+    user_id = session.get('user_id')
+    if not exhibit_id:
+        return jsonify({'success': False, 'error': 'No exhibit selected'}), 400
+
+    if user_id:
+        exhibit = Exhibit.query.filter_by(id=exhibit_id, user_id=user_id).first()
+        if not exhibit:
+            return jsonify({'success': False, 'error': 'Exhibit not found'}), 404
+        name, fingerprint = exhibit.name, exhibit_fingerprint(exhibit.id)
+    elif 'guest_session_id' in session:
+        guest_doc = guest_document()
+        exhibit = guest_doc.exhibit(exhibit_id) if guest_doc else None
+        if not exhibit:
+            return jsonify({'success': False, 'error': 'Exhibit not found'}), 404
+        name, fingerprint = exhibit.get('name'), guest_fingerprint(exhibit)
+    else:
+        return jsonify({'success': False, 'error': 'Session expired'}), 403
+
+    key = export_key(fingerprint, 'excel', 'xlsx')
+    path = export_cache.get(key, 'xlsx')
+    if path is None:
+        scratch = export_cache.scratch_path()
+        try:
+            if user_id:
+                export_exhibit_to_excel(scratch, exhibit, pool=sheet_pool)
+            else:
+                export_guest_exhibit_to_excel(scratch, exhibit)
+        except Exception:
+            os.remove(scratch)
+            raise
+        path = export_cache.put(key, 'xlsx', scratch)
+        logger.info(f"[EXPORT] Exhibit {exhibit_id}: {os.path.getsize(path)} bytes")
+    return send_file(path, as_attachment=True, download_name=f"{secure_filename(name or '') or 'exhibit'}.xlsx")
+
+def job_owner():
+    if session.get('user_id'):
+        return f"user:{session['user_id']}"
+    if 'guest_session_id' in session:
+        return f"guest:{session['guest_session_id']}"
+    return None
+
+@app.route('/export-jobs', methods=['POST'])
+def start_export_job():
+    """
+    Queue an export of the current exhibit (or exhibit_id). kind is 'excel'
+    (the default) or 'instructions'; instructions take a format of xlsx,
+    txt, docx or pdf. Answers 202 with the job id to poll.
+    """
+    owner = job_owner()
+    if not owner:
+        return jsonify({'success': False, 'error': 'Session expired'}), 403
+    data = request.get_json(silent=True) or request.form
+    kind = data.get('kind', 'excel')
+    fmt = data.get('format') or None
+    exhibit_id = data.get('exhibit_id') or session.get('current_exhibit_id')
+    if kind not in JOB_FORMATS or (fmt and fmt not in JOB_FORMATS[kind]):
+        return jsonify({'success': False, 'error': 'Unknown export kind or format'}), 400
+
+    if session.get('user_id'):
+        exhibit = Exhibit.query.filter_by(id=exhibit_id, user_id=session['user_id']).first() if exhibit_id else None
+        if not exhibit:
+            return jsonify({'success': False, 'error': 'Exhibit not found'}), 404
+        job_id = export_jobs.submit(owner, kind, exhibit.name, fmt, exhibit_id=exhibit.id)
+    else:
+        guest_doc = guest_document()
+        exhibit = guest_doc.exhibit(exhibit_id) if guest_doc and exhibit_id else None
+        if not exhibit:
+            return jsonify({'success': False, 'error': 'Exhibit not found'}), 404
+        job_id = export_jobs.submit(owner, kind, exhibit.get('name'), fmt, guest_exhibit=exhibit)
+    return jsonify({'success': True, 'job_id': job_id,
+                    'status_url': url_for('export_job_status', job_id=job_id)}), 202
+
+@app.route('/export-jobs/<job_id>')
+def export_job_status(job_id):
+    job = export_jobs.status(job_id, job_owner())
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] == 'done':
+        job['download_url'] = url_for('download_export_job', job_id=job_id)
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/export-jobs/<job_id>/download')
+def download_export_job(job_id):
+    artifact = export_jobs.artifact(job_id, job_owner())
+    if not artifact:
+        return jsonify({'success': False, 'error': 'Export not ready or expired'}), 404
+    path, filename = artifact
+    return send_file(path, as_attachment=True, download_name=filename)
+
+@app.route('/import-exhibit', methods=['POST'])
+def import_exhibit():
+    """Create an exhibit from an uploaded .xlsx in the /export-exhibit layout"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Sign in to import exhibits'}), 403
+    upload = request.files.get('file')
+    if not upload or not upload.filename.lower().endswith('.xlsx'):
+        return jsonify({'success': False, 'error': 'Expected an .xlsx file'}), 400
+
+    name = request.form.get('exhibit_name') or os.path.splitext(upload.filename)[0]
+    try:
+        exhibit = import_exhibit_from_excel(upload.stream, user_id=user_id, name=name)
+    except ExcelImportError as e:
+        return jsonify({'success': False, 'error': str(e),
+                        'errors': [{'sheet': sheet, 'row': row, 'message': message}
+                                   for sheet, row, message in e.errors]}), 400
+    session['current_exhibit_id'] = exhibit.id
+    return jsonify({'success': True, 'exhibit_id': exhibit.id})
+
 @app.route('/create-wall', methods=['GET', 'POST'])
 def create_wall():
     exhibit_id = session.get('current_exhibit_id')
@@ -345,15 +563,7 @@ def create_wall():
             session['current_wall_id'] = wall.id
         elif 'guest_session_id' in session:
             # Guest: store in Redis
-            import uuid
-            guest_data = redis_manager.get_session(session['guest_session_id']) or {'data': {}}
-            exhibits = guest_data.get('data', {}).get('exhibits', [])
-            exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
-            if not exhibit:
-                flash("No exhibit found.", "error")
-                return redirect(url_for('new_exhibit'))
-
-            wall_id = str(uuid.uuid4())
+            wall_id = str(uuid4())
             new_wall = {
                 'id': wall_id,
                 'name': name,
@@ -363,8 +573,9 @@ def create_wall():
                 'permanent_objects': [],
                 'artworks': []
             }
-            exhibit.setdefault('walls', []).append(new_wall)
-            redis_manager.update_session(session['guest_session_id'], guest_data['data'])
+            if not redis_manager.add_entity(session['guest_session_id'], 'wall', new_wall, 'exhibit', exhibit_id):
+                flash("No exhibit found.", "error")
+                return redirect(url_for('new_exhibit'))
             session['current_wall_id'] = wall_id
             logger.info(f"[REDIS] Created guest wall: {name} (id={wall_id}) in exhibit {exhibit_id}")
         else:
@@ -380,25 +591,26 @@ def delete_wall(wall_id):
     user_id = session.get('user_id')
     if user_id:
         # Logged-in user: wall_id is int
-        wall = Wall.query.get_or_404(wall_id)
+        wall = Wall.query.join(Exhibit).filter(Wall.id == wall_id, Exhibit.user_id == user_id).first_or_404()
+        name = wall.name
+        # One DELETE; the artworks, objects and lines go with it (ON DELETE CASCADE)
         db.session.delete(wall)
         db.session.commit()
-        flash(f'Wall "{wall.name}" deleted.', "success")
+        flash(f'Wall "{name}" deleted.', "success")
         return redirect(url_for('select_wall_space'))
     elif 'guest_session_id' in session:
         # Guest: wall_id is a string (UUID)
-        guest_data = redis_manager.get_session(session['guest_session_id']) or {'data': {}}
         exhibit_id = session.get('current_exhibit_id')
-        exhibits = guest_data.get('data', {}).get('exhibits', [])
-        exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
-        if not exhibit:
+
+        def remove_wall(guest_doc):
+            # Remove the wall together with everything placed on it
+            if guest_doc.wall(wall_id, exhibit_id):
+                guest_doc.remove('wall', wall_id)
+            return guest_doc.exhibit(exhibit_id) is not None
+
+        if not guest_unit().mutate(remove_wall):
             flash("No exhibit found.", "error")
             return redirect(url_for('select_wall_space'))
-        walls = exhibit.get('walls', [])
-        # Remove wall with matching id
-        new_walls = [w for w in walls if str(w.get('id')) != str(wall_id)]
-        exhibit['walls'] = new_walls
-        redis_manager.update_session(session['guest_session_id'], guest_data['data'])
         flash("Wall deleted.", "success")
         return redirect(url_for('select_wall_space'))
     else:
@@ -415,7 +627,7 @@ def select_wall_space():
         return redirect(url_for('load_exhibit'))
 
     # Get the current user
-    user = User.query.get(user_id) if user_id else None
+    user = current_user()
 
     if user and not user.is_guest:
         # Logged-in user - show walls from their exhibit
@@ -424,24 +636,33 @@ def select_wall_space():
         return render_template('select_wall_space.html', walls=walls, current_wall=current_wall)
     elif 'guest_session_id' in session:
         # Guest user - load exhibit from Redis
-        guest_data = redis_manager.get_session(session['guest_session_id'])
-        exhibits = guest_data.get('data', {}).get('exhibits', []) if guest_data else []
-        exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
+        guest_doc = guest_document()
+        exhibit = guest_doc.exhibit(exhibit_id) if guest_doc else None
         if not exhibit:
             flash("Access to this exhibit is not allowed.", "error")
             return redirect(url_for('load_exhibit'))
         # Walls for guests are stored in the exhibit dict in Redis
         walls = exhibit.get('walls', [])
         # --- FIX: Set current_wall for guests ---
-        current_wall_id = session.get('current_wall_id')
-        current_wall = None
-        if current_wall_id:
-            current_wall = next((w for w in walls if str(w.get('id')) == str(current_wall_id)), None)
+        current_wall = guest_doc.wall(session.get('current_wall_id'), exhibit_id)
         return render_template('select_wall_space.html', walls=walls, current_wall=current_wall)
     else:
         flash("Access denied.", "error")
         return redirect(url_for('load_exhibit'))
 
+def save_upload(file):
+    """
+    Save an uploaded image below static/uploads; returns its path relative to
+    static. Guests' files go to uploads/guest, where cleanup may remove them
+    once nothing refers to them.
+    """
+    parts = ['uploads'] if session.get('user_id') else ['uploads', GUEST_UPLOAD_DIR]
+    upload_dir = os.path.join(app.static_folder, *parts)
+    os.makedirs(upload_dir, exist_ok=True)
+    filename = secure_filename(file.filename)
+    file.save(os.path.join(upload_dir, filename))
+    return os.path.join(*parts, filename)
+
 @app.route('/add_permanent_object', methods=['POST'])
 def add_permanent_object():
     from gallery.models.permanent_object import PermanentObject
@@ -458,12 +679,7 @@ def add_permanent_object():
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                filename = secure_filename(file.filename)
-                upload_dir = os.path.join(app.static_folder, 'uploads')
-                os.makedirs(upload_dir, exist_ok=True)
-                filepath = os.path.join(upload_dir, filename)
-                file.save(filepath)
-                image_path = os.path.join('uploads', filename)
+                image_path = save_upload(file)
         
         # Logged-in user case
         if 'user_id' in session:
@@ -484,31 +700,12 @@ def add_permanent_object():
         # Guest user case
         elif 'guest_session_id' in session:
             guest_session_id = session['guest_session_id']
-            guest_data = redis_manager.get_session(guest_session_id) or {'data': {}}
-            exhibits = guest_data.get('data', {}).get('exhibits', [])
-            
             logger.info(f"[REDIS] Attempting to add permanent object to guest session {guest_session_id}")
-            logger.info(f"[REDIS] Current exhibits in session: {len(exhibits)}")
             
             exhibit_id = session.get('current_exhibit_id')
-            exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
-            
-            if not exhibit:
-                logger.error(f"[REDIS] No exhibit found with id {exhibit_id}")
-                flash("No exhibit found.", "error")
-                return redirect(url_for('new_exhibit'))
-            
-            walls = exhibit.get('walls', [])
-            wall = next((w for w in walls if str(w.get('id')) == str(wall_id)), None)
-            
-            if not wall:
-                logger.error(f"[REDIS] No wall found with id {wall_id}")
-                flash("No wall found.", "error")
-                return redirect(url_for('select_wall_space'))
             
             # Create new object
-            import uuid
-            obj_id = str(uuid.uuid4())
+            obj_id = str(uuid4())
             new_obj = {
                 'id': obj_id,
                 'name': name,
@@ -520,14 +717,15 @@ def add_permanent_object():
                 'wall_id': wall_id
             }
             
-            # Initialize permanent_objects array if it doesn't exist
-            if 'permanent_objects' not in wall:
-                wall['permanent_objects'] = []
-            
-            wall['permanent_objects'].append(new_obj)
+            def add_object(guest_doc):
+                if guest_doc.wall(wall_id, exhibit_id):
+                    return guest_doc.add('permanent_object', new_obj, 'wall', wall_id)
             
             # Save back to Redis
-            redis_manager.update_session(guest_session_id, guest_data['data'])
+            if not guest_unit().mutate(add_object):
+                logger.error(f"[REDIS] No wall {wall_id} in exhibit {exhibit_id}")
+                flash("No wall found.", "error")
+                return redirect(url_for('select_wall_space'))
             logger.info(f"[REDIS] Created guest permanent object: {new_obj} in wall {wall_id}")
             
             obj = new_obj  # For the response
@@ -545,6 +743,8 @@ def add_permanent_object():
             flash("Fixture added successfully", "success")
             return redirect(url_for('edit_permanent_objects'))
         
+    except SessionConflictError:
+        raise
     except Exception as e:
         logger.error(f"Error adding fixture: {str(e)}", exc_info=True)
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -603,12 +803,7 @@ def update_permanent_object():
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                filename = secure_filename(file.filename)
-                upload_dir = os.path.join(app.static_folder, 'uploads')
-                os.makedirs(upload_dir, exist_ok=True)
-                filepath = os.path.join(upload_dir, filename)
-                file.save(filepath)
-                obj.image_path = os.path.join('uploads', filename)
+                obj.image_path = save_upload(file)
         
         db.session.commit()
         flash("Fixture updated successfully", "success")
@@ -641,11 +836,10 @@ def editor():
     if not current_wall:
         return redirect(url_for('select_wall_space', error='no_wall'))
     
-    from gallery.models.wall_line import SingleLine as WallLine
     # Get user information from session
     user_info = None
     if 'user_id' in session:
-        user = User.query.get(session['user_id'])
+        user = current_user()
         user_info = {'name': user.name, 'is_guest': False} if user else None
     elif 'guest_session_id' in session:
         user_info = {'name': 'Guest', 'is_guest': True}
@@ -657,16 +851,22 @@ def editor():
         current_wall_artwork = all_artwork  # All artworks are on this wall in guest mode
         unplaced_artwork = []  # Or handle as needed
         wall_lines = current_wall.get('wall_lines', [])
+        etag = guest_scene_etag(current_wall['id'], guest_document().version)
     else:
-        # Logged-in user: get from DB
-        all_artwork = Artwork.query.all()
-        current_wall_artwork = Artwork.query.filter_by(wall_id=current_wall.id).all()
+        # Logged-in user: only this user's artworks in the current exhibit;
+        # the wall's own artworks, fixtures and lines are already loaded
+        all_artwork = user_exhibit_artworks(session['user_id'], current_wall.exhibit_id).all()
+        current_wall_artwork = current_wall.artworks
         unplaced_artwork = [a for a in all_artwork if a.wall_id != current_wall.id]
-        wall_lines = WallLine.query.filter_by(wall_id=current_wall.id).all()
+        wall_lines = current_wall.snap_lines
+        wall_data = current_wall.to_dict()
+        wall_data['permanent_objects'] = [obj.to_dict() for obj in current_wall.permanent_objects]
+        etag = scene_etag(current_wall.id, current_wall.version)
     
     return render_template(
         'editor.html',
-        current_wall=current_wall if isinstance(current_wall, dict) else current_wall.to_dict(),
+        scene_etag=quote_etag(etag),
+        current_wall=current_wall if isinstance(current_wall, dict) else wall_data,
         all_artwork=[a if isinstance(a, dict) else a.to_dict() for a in all_artwork],
         current_wall_artwork=[a if isinstance(a, dict) else a.to_dict() for a in current_wall_artwork],
         unplaced_artwork=[a if isinstance(a, dict) else a.to_dict() for a in unplaced_artwork],
@@ -693,25 +893,28 @@ def update_artwork_position(artwork_id):
         })
     elif 'guest_session_id' in session:
         # Guest: artwork_id is a string (UUID)
-        guest_data = redis_manager.get_session(session['guest_session_id']) or {'data': {}}
+        guest_id = session['guest_session_id']
         exhibit_id = session.get('current_exhibit_id')
-        exhibits = guest_data.get('data', {}).get('exhibits', [])
-        exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
+        wall_id = data.get('wall_id') or session.get('current_wall_id')
+
+        def move(exhibit, wall, artwork):
+            if has_child(exhibit, 'walls', wall_id) and has_child(wall, 'artworks', artwork_id) and artwork:
+                artwork.update({
+                    'x_position': data.get('x_position'),
+                    'y_position': data.get('y_position'),
+                    'wall_id': wall_id
+                })
+                # Only this artwork's entry is rewritten in Redis
+                return {('artwork', artwork_id): artwork}
+
+        exhibit, wall, artwork = redis_manager.mutate_entities(
+            guest_id, [('exhibit', exhibit_id), ('wall', wall_id), ('artwork', artwork_id)], move)
         if not exhibit:
             return jsonify({'success': False, 'error': 'Exhibit not found'}), 404
-        # Find the wall
-        wall_id = data.get('wall_id') or session.get('current_wall_id')
-        wall = next((w for w in exhibit.get('walls', []) if str(w.get('id')) == str(wall_id)), None)
-        if not wall:
+        if not has_child(exhibit, 'walls', wall_id):
             return jsonify({'success': False, 'error': 'Wall not found'}), 404
-        # Find the artwork
-        artwork = next((a for a in wall.get('artworks', []) if str(a.get('id')) == str(artwork_id)), None)
-        if not artwork:
+        if not artwork or not has_child(wall, 'artworks', artwork_id):
             return jsonify({'success': False, 'error': 'Artwork not found'}), 404
-        artwork['x_position'] = data.get('x_position')
-        artwork['y_position'] = data.get('y_position')
-        artwork['wall_id'] = wall_id
-        redis_manager.update_session(session['guest_session_id'], guest_data['data'])
         logger.info(f"[REDIS] Updated guest artwork position: {artwork['id']} (x={artwork['x_position']}, y={artwork['y_position']}, wall_id={artwork['wall_id']})")
         return jsonify({
             'success': True,
@@ -720,6 +923,152 @@ def update_artwork_position(artwork_id):
     else:
         return jsonify({'success': False, 'error': 'Session expired'}), 403
 
+@app.route('/walls/<wall_id>/positions', methods=['POST'])
+def update_wall_positions(wall_id):
+    """
+    Apply many artwork and permanent object moves on one wall in a single
+    transaction. Body: {"artworks": [{"id", "x_position", "y_position"}, ...],
+    "permanent_objects": [{"id", "x", "y"}, ...]}. An artwork entry may carry
+    "wall_id": null to take it off the wall (logged-in users only). Artworks
+    must be on the wall or unplaced in its exhibit; ids that are not, like
+    those that do not exist, are returned in "missing".
+    """
+    data = request.get_json(silent=True) or {}
+    artwork_moves = {str(m['id']): m for m in data.get('artworks', []) if m.get('id') is not None}
+    object_moves = {str(m['id']): m for m in data.get('permanent_objects', []) if m.get('id') is not None}
+    user_id = session.get('user_id')
+
+    if user_id:
+        from gallery.models.permanent_object import PermanentObject
+        wall = db.session.get(Wall, wall_id)
+        exhibit = db.session.get(Exhibit, wall.exhibit_id) if wall else None
+        if not exhibit or exhibit.user_id != user_id:
+            return jsonify({'success': False, 'error': 'Wall not found'}), 404
+        # Moves stay on this wall; the only other target is off the wall
+        if any(move['wall_id'] is not None and str(move['wall_id']) != str(wall.id)
+               for move in artwork_moves.values() if 'wall_id' in move):
+            return jsonify({'success': False, 'error': 'Artworks can only be moved on this wall or off it'}), 400
+
+        # Only artworks already on this wall, or unplaced in its exhibit, can be moved here
+        artworks = Artwork.query.filter(
+            Artwork.id.in_([int(i) for i in artwork_moves if i.isdigit()]),
+            Artwork.user_id == user_id,
+            or_(Artwork.wall_id == wall.id,
+                and_(Artwork.wall_id.is_(None), Artwork.exhibit_id == wall.exhibit_id))
+        ).all() if artwork_moves else []
+        objects = PermanentObject.query.filter(
+            PermanentObject.id.in_([int(i) for i in object_moves if i.isdigit()]),
+            PermanentObject.wall_id == wall.id
+        ).all() if object_moves else []
+
+        for artwork in artworks:
+            move = artwork_moves.pop(str(artwork.id))
+            artwork.x_position = move.get('x_position', artwork.x_position)
+            artwork.y_position = move.get('y_position', artwork.y_position)
+            artwork.wall_id = None if 'wall_id' in move and move['wall_id'] is None else wall.id
+        for obj in objects:
+            move = object_moves.pop(str(obj.id))
+            obj.x = move.get('x', obj.x)
+            obj.y = move.get('y', obj.y)
+        db.session.commit()
+        logger.info(f"[DB] Moved {len(artworks)} artworks and {len(objects)} permanent objects on wall {wall.id}")
+        updated = {'artworks': [a.id for a in artworks], 'permanent_objects': [o.id for o in objects]}
+    elif 'guest_session_id' in session:
+        exhibit_id = session.get('current_exhibit_id')
+        refs = ([('exhibit', exhibit_id), ('wall', wall_id)]
+                + [('artwork', i) for i in artwork_moves]
+                + [('permanent_object', i) for i in object_moves])
+
+        def move_all(exhibit, wall, *entities):
+            if not has_child(exhibit, 'walls', wall_id):
+                return None
+            changes = {}
+            for (kind, entity_id), entity in zip(refs[2:], entities):
+                if kind == 'artwork' and entity and has_child(wall, 'artworks', entity_id):
+                    move = artwork_moves[entity_id]
+                    entity.update({'x_position': move.get('x_position', entity.get('x_position')),
+                                   'y_position': move.get('y_position', entity.get('y_position'))})
+                elif kind == 'permanent_object' and entity and has_child(wall, 'permanent_objects', entity_id):
+                    move = object_moves[entity_id]
+                    entity.update({'x': move.get('x', entity.get('x')), 'y': move.get('y', entity.get('y'))})
+                else:
+                    continue
+                changes[(kind, entity_id)] = entity
+            return changes
+
+        # One optimistic read-modify-write covering every moved entity
+        exhibit, wall, *entities = redis_manager.mutate_entities(session['guest_session_id'], refs, move_all)
+        if not has_child(exhibit, 'walls', wall_id):
+            return jsonify({'success': False, 'error': 'Wall not found'}), 404
+        updated = {'artworks': [], 'permanent_objects': []}
+        for (kind, entity_id), entity in zip(refs[2:], entities):
+            if entity and has_child(wall, f"{kind}s", entity_id):
+                updated[f"{kind}s"].append(entity_id)
+                (artwork_moves if kind == 'artwork' else object_moves).pop(entity_id)
+        logger.info(f"[REDIS] Moved {len(updated['artworks'])} artworks and "
+                    f"{len(updated['permanent_objects'])} permanent objects on guest wall {wall_id}")
+    else:
+        return jsonify({'success': False, 'error': 'Session expired'}), 403
+
+    return jsonify({
+        'success': True,
+        'updated': updated,
+        'missing': {'artworks': list(artwork_moves), 'permanent_objects': list(object_moves)}
+    })
+
+@app.route('/walls/<wall_id>/scene')
+def wall_scene(wall_id):
+    """
+    The wall with its artworks, permanent objects and snap lines as JSON.
+    Responses carry an ETag of the wall version, so a client that sends it
+    back in If-None-Match gets a 304 until something on the wall changes.
+    """
+    user_id = session.get('user_id')
+
+    if user_id:
+        version = db.session.execute(
+            select(Wall.version).join(Exhibit, Wall.exhibit_id == Exhibit.id)
+            .where(Wall.id == wall_id, Exhibit.user_id == user_id)
+        ).scalar()
+        if version is None:
+            return jsonify({'success': False, 'error': 'Wall not found'}), 404
+        if request.if_none_match.contains(scene_etag(wall_id, version)):
+            return scene_response(None, scene_etag(wall_id, version))
+
+        body = scene_cache.get(wall_id, version)
+        if body is None:
+            wall = Wall.query.options(
+                selectinload(Wall.artworks),
+                selectinload(Wall.permanent_objects),
+                selectinload(Wall.snap_lines)
+            ).filter_by(id=wall_id).one()
+            # The wall may have moved on since the version check
+            version = wall.version
+            body = scene_cache.put(wall_id, version, encode_scene(scene_document(wall)))
+            logger.info(f"[DB] Built scene for wall {wall_id} v{version}")
+        return scene_response(body, scene_etag(wall_id, version))
+    elif 'guest_session_id' in session:
+        # Revalidating only reads the session version, not the whole session
+        version = redis_manager.session_version(session['guest_session_id'])
+        if version is not None and request.if_none_match.contains(guest_scene_etag(wall_id, version)):
+            return scene_response(None, guest_scene_etag(wall_id, version))
+
+        guest_doc = guest_document()
+        wall = guest_doc.wall(wall_id) if guest_doc else None
+        if not wall:
+            return jsonify({'success': False, 'error': 'Wall not found'}), 404
+        return scene_response(encode_scene(guest_scene_document(wall)), guest_scene_etag(wall_id, guest_doc.version))
+    else:
+        return jsonify({'success': False, 'error': 'Session expired'}), 403
+
+def scene_response(body, etag):
+    """200 with the encoded scene, or 304 when body is None"""
+    response = app.response_class(body, status=200 if body is not None else 304, mimetype='application/json')
+    response.set_etag(etag)
+    # Always revalidate; the ETag makes that a cheap 304
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/check-auth-status')
 def check_auth_status():
     return jsonify({
@@ -751,38 +1100,22 @@ def artwork_manual():
                     wall_id=None,  # leave at None for now
                     user_id=session.get('user_id')
                 )
+                artwork.exhibit_id = session.get('current_exhibit_id')
                 # Handle file upload
                 if 'imageUpload' in request.files:
                     file = request.files['imageUpload']
                     if file and file.filename != '':
-                        filename = secure_filename(file.filename)
-                        upload_dir = os.path.join(app.static_folder, 'uploads')
-                        os.makedirs(upload_dir, exist_ok=True)
-                        upload_path = os.path.join(upload_dir, filename)
-                        file.save(upload_path)
-                        artwork.image_path = os.path.join('static', 'uploads', filename)
+                        artwork.image_path = os.path.join('static', save_upload(file))
                 db.session.add(artwork)
                 db.session.commit()
                 logger.info(f"[DB] Created artwork: {artwork.id} ({artwork.name}), wall_id: {artwork.wall_id}")
 
             elif 'guest_session_id' in session and isinstance(wall, dict):
                 # Guest: store in Redis
-                guest_data = redis_manager.get_session(session['guest_session_id']) or {'data': {}}
                 exhibit_id = session.get('current_exhibit_id')
-                exhibits = guest_data.get('data', {}).get('exhibits', [])
-                exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
-                if not exhibit:
-                    flash("No exhibit found.", "error")
-                    return redirect(url_for('new_exhibit'))
-                # Find the wall in the exhibit
                 wall_id = wall.get('id')
-                wall_in_redis = next((w for w in exhibit.get('walls', []) if str(w.get('id')) == str(wall_id)), None)
-                if not wall_in_redis:
-                    flash("No wall found.", "error")
-                    return redirect(url_for('select_wall_space'))
                 # Create artwork dict
-                import uuid
-                artwork_id = str(uuid.uuid4())
+                artwork_id = str(uuid4())
                 artwork = {
                     'id': artwork_id,
                     'name': request.form.get('name', '').strip(),
@@ -802,14 +1135,16 @@ def artwork_manual():
                 if 'imageUpload' in request.files:
                     file = request.files['imageUpload']
                     if file and file.filename != '':
-                        filename = secure_filename(file.filename)
-                        upload_dir = os.path.join(app.static_folder, 'uploads')
-                        os.makedirs(upload_dir, exist_ok=True)
-                        upload_path = os.path.join(upload_dir, filename)
-                        file.save(upload_path)
-                        artwork['image_path'] = os.path.join('static', 'uploads', filename)
-                wall_in_redis.setdefault('artworks', []).append(artwork)
-                redis_manager.update_session(session['guest_session_id'], guest_data['data'])
+                        artwork['image_path'] = os.path.join('static', save_upload(file))
+
+                def add_artwork(guest_doc):
+                    # The wall must still be part of the current exhibit
+                    if guest_doc.wall(wall_id, exhibit_id):
+                        return guest_doc.add('artwork', artwork, 'wall', wall_id)
+
+                if not guest_unit().mutate(add_artwork):
+                    flash("No wall found.", "error")
+                    return redirect(url_for('select_wall_space'))
                 logger.info(f"[REDIS] Created guest artwork: {artwork['name']} (id={artwork_id}) on wall {wall_id}")
 
             else:
@@ -820,6 +1155,8 @@ def artwork_manual():
                 return jsonify({'success': True, 'artwork': artwork if isinstance(artwork, dict) else artwork.to_dict()})
             return redirect(url_for('artwork_manual'))
             
+        except SessionConflictError:
+            raise
         except Exception as e:
             if 'user_id' in session:
                 db.session.rollback()
@@ -830,7 +1167,11 @@ def artwork_manual():
             return redirect(url_for('artwork_manual'))
     
     # --- GET: Show artworks ---
-    artworks = Artwork.query.filter_by(wall_id=None).all()
+    artworks = []
+    if 'user_id' in session:
+        # The user's unplaced artworks in the current exhibit
+        artworks = user_exhibit_artworks(session['user_id'], session.get('current_exhibit_id')) \
+            .filter(Artwork.wall_id.is_(None)).all()
     if wall:
         if isinstance(wall, dict):
             # Guest: wall is a dict from Redis
@@ -859,34 +1200,28 @@ def delete_artwork(artwork_id):
             
         elif guest_id:
             # Guest: delete from Redis
-            guest_data = redis_manager.get_session(guest_id)
-            if not guest_data:
-                return jsonify({'success': False, 'error': 'Session expired'}), 400
-                
             exhibit_id = session.get('current_exhibit_id')
-            exhibits = guest_data.get('data', {}).get('exhibits', [])
-            
-            # Find the exhibit and wall containing the artwork
-            for exhibit in exhibits:
-                if str(exhibit.get('id')) == str(exhibit_id):
-                    # Check walls first
-                    for wall in exhibit.get('walls', []):
-                        wall['artworks'] = [a for a in wall.get('artworks', []) 
-                                           if str(a.get('id')) != str(artwork_id)]
-                    
-                    # Also check unplaced artworks
-                    exhibit['artworks'] = [a for a in exhibit.get('artworks', [])
-                                          if str(a.get('id')) != str(artwork_id)]
-                    
-                    redis_manager.update_session(guest_id, guest_data['data'])
-                    logger.info(f"[REDIS] Deleted guest artwork: {artwork_id} (session={guest_id})")
-                    break
+
+            def remove_artwork(guest_doc):
+                # The artwork is either on one of the exhibit's walls or unplaced
+                parent = guest_doc.parent('artwork', artwork_id)
+                if parent and guest_doc.exhibit(exhibit_id) and (
+                        parent == ('exhibit', str(exhibit_id))
+                        or guest_doc.parent(*parent) == ('exhibit', str(exhibit_id))):
+                    guest_doc.remove('artwork', artwork_id)
+                return True
+
+            if guest_unit().mutate(remove_artwork) is None:
+                return jsonify({'success': False, 'error': 'Session expired'}), 400
+            logger.info(f"[REDIS] Deleted guest artwork: {artwork_id} (session={guest_id})")
             
         else:
             return jsonify({'success': False, 'error': 'Session expired'}), 403
             
         return jsonify({'success': True})
         
+    except SessionConflictError:
+        raise
     except Exception as e:
         if user_id:
             db.session.rollback()
@@ -911,22 +1246,16 @@ def save_snap_line():
             })
         elif 'guest_session_id' in session:
             # Guest: save to Redis
-            guest_data = redis_manager.get_session(session['guest_session_id']) or {'data': {}}
+            guest_id = session['guest_session_id']
             exhibit_id = session.get('current_exhibit_id')
-            exhibits = guest_data.get('data', {}).get('exhibits', [])
-            
-            exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
+            exhibit, wall = redis_manager.get_entities(guest_id, ('exhibit', exhibit_id), ('wall', wall_id))
             if not exhibit:
                 return jsonify({'success': False, 'error': 'Exhibit not found'}), 404
                 
-            wall = next((w for w in exhibit.get('walls', []) if str(w.get('id')) == str(wall_id)), None)
-            if not wall:
+            if not wall or not has_child(exhibit, 'walls', wall_id):
                 return jsonify({'success': False, 'error': 'Wall not found'}), 404
                 
-            if 'wall_lines' not in wall:
-                wall['wall_lines'] = []
-                
-            line_id = str(uuid.uuid4())
+            line_id = str(uuid4())
             new_line = {
                 'id': line_id,
                 'x_cord': data.get('x_cord', 0),
@@ -941,8 +1270,8 @@ def save_snap_line():
                 'wall_id': wall_id
             }
             
-            wall['wall_lines'].append(new_line)
-            redis_manager.update_session(session['guest_session_id'], guest_data['data'])
+            if not redis_manager.add_entity(guest_id, 'wall_line', new_line, parent_kind='wall', parent_id=wall_id):
+                return jsonify({'success': False, 'error': 'Wall not found'}), 404
             
             return jsonify({
                 'success': True,
@@ -951,6 +1280,8 @@ def save_snap_line():
         else:
             return jsonify({'success': False, 'error': 'Session expired'}), 403
             
+    except SessionConflictError:
+        raise
     except Exception as e:
         logger.error(f"Error saving snap line: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -973,30 +1304,25 @@ def delete_snap_line(line_id):
             
         elif 'guest_session_id' in session:
             # Guest: delete from Redis
-            guest_data = redis_manager.get_session(session['guest_session_id'])
-            if not guest_data:
-                return jsonify({'success': False, 'error': 'Session expired'}), 400
-                
+            guest_id = session['guest_session_id']
             exhibit_id = session.get('current_exhibit_id')
-            exhibits = guest_data.get('data', {}).get('exhibits', [])
-            
-            exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
+            exhibit, wall = redis_manager.get_entities(guest_id, ('exhibit', exhibit_id), ('wall', wall_id))
             if not exhibit:
                 return jsonify({'success': False, 'error': 'Exhibit not found'}), 404
                 
-            wall = next((w for w in exhibit.get('walls', []) if str(w.get('id')) == str(wall_id)), None)
-            if not wall:
+            if not wall or not has_child(exhibit, 'walls', wall_id):
                 return jsonify({'success': False, 'error': 'Wall not found'}), 404
                 
-            if 'wall_lines' in wall:
-                wall['wall_lines'] = [line for line in wall['wall_lines'] if str(line.get('id')) != str(line_id)]
-                redis_manager.update_session(session['guest_session_id'], guest_data['data'])
+            if has_child(wall, 'wall_lines', line_id):
+                redis_manager.remove_entity(guest_id, 'wall_line', line_id, parent_kind='wall', parent_id=wall_id)
                 
             return jsonify({'success': True})
             
         else:
             return jsonify({'success': False, 'error': 'Session expired'}), 403
             
+    except SessionConflictError:
+        raise
     except Exception as e:
         logger.error(f"Error deleting snap line: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1006,15 +1332,11 @@ def select_wall(wall_id):
     session["current_wall_id"] = wall_id
     # For guests, we need to verify the wall exists in their session
     if 'guest_session_id' in session:
-        guest_data = redis_manager.get_session(session['guest_session_id'])
-        if guest_data:
+        guest_doc = guest_document()
+        if guest_doc:
             exhibit_id = session.get('current_exhibit_id')
-            exhibits = guest_data.get('data', {}).get('exhibits', [])
-            exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
-            if exhibit:
-                walls = exhibit.get('walls', [])
-                wall = next((w for w in walls if str(w.get('id')) == str(wall_id)), None)
-                if not wall:
+            if guest_doc.exhibit(exhibit_id):
+                if not guest_doc.wall(wall_id, exhibit_id):
                     flash("Wall not found in your exhibit", "error")
                     return redirect(url_for('select_wall_space'))
     return redirect(url_for('select_wall_space'))
@@ -1038,36 +1360,34 @@ def update_object_position(obj_id):
             return jsonify({'success': True})
         elif 'guest_session_id' in session:
             # Guest: update in Redis (uses string UUID)
-            guest_data = redis_manager.get_session(session['guest_session_id'])
-            if not guest_data:
-                return jsonify({'success': False, 'error': 'Session expired'}), 400
-                
+            guest_id = session['guest_session_id']
             exhibit_id = session.get('current_exhibit_id')
-            exhibits = guest_data.get('data', {}).get('exhibits', [])
-            exhibit = next((ex for ex in exhibits if str(ex.get('id')) == str(exhibit_id)), None)
+            wall_id = session.get('current_wall_id')
+
+            def move(exhibit, wall, obj):
+                if obj and has_child(exhibit, 'walls', wall_id) and has_child(wall, 'permanent_objects', obj_id):
+                    obj.update({'x': x, 'y': y})
+                    # Only this object's entry is rewritten in Redis
+                    return {('permanent_object', obj_id): obj}
+
+            exhibit, wall, obj = redis_manager.mutate_entities(
+                guest_id, [('exhibit', exhibit_id), ('wall', wall_id), ('permanent_object', obj_id)], move)
             if not exhibit:
                 return jsonify({'success': False, 'error': 'Exhibit not found'}), 404
                 
-            # Find the wall and object
-            wall_id = session.get('current_wall_id')
-            wall = next((w for w in exhibit.get('walls', []) if str(w.get('id')) == str(wall_id)), None)
-            if not wall:
+            if not has_child(exhibit, 'walls', wall_id):
                 return jsonify({'success': False, 'error': 'Wall not found'}), 404
                 
-            obj = next((o for o in wall.get('permanent_objects', []) if str(o.get('id')) == str(obj_id)), None)
-            if not obj:
+            if not obj or not has_child(wall, 'permanent_objects', obj_id):
                 return jsonify({'success': False, 'error': 'Object not found'}), 404
                 
-            logger.info(f"Before update: {obj}")
-            obj['x'] = x
-            obj['y'] = y
-            logger.info(f"After update: {obj}")
-            redis_manager.update_session(session['guest_session_id'], guest_data['data'])
             logger.info(f"[REDIS] Updated guest permanent object {obj.get('id')} location: x={x}, y={y}")
             return jsonify({'success': True})
         else:
             return jsonify({'success': False, 'error': 'Session expired'}), 403
             
+    except SessionConflictError:
+        raise
     except Exception as e:
         if 'user_id' in session:
             db.session.rollback()
@@ -1079,25 +1399,28 @@ def save_and_continue_permanent_objects():
     # Add save logic
     return redirect(url_for('select_wall_space'))
 
-@app.route('/admin/cleanup-guests', methods=['POST'])
-def cleanup_guest_galleries():
-    import datetime
-    from sqlalchemy import and_
-    
-    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=1)  # or X minutes/hours
+@app.route('/admin/redis-stats')
+def redis_stats():
+    return jsonify({'pool': redis_manager.pool_stats()})
 
-    # Optionally: add a created_at column to filter old ones
-    guest_galleries = Exhibit.query.filter(
-        Exhibit.user_id.is_(None),
-        Exhibit.guest_id.isnot(None)
-    ).all()
+@app.route('/admin/db-stats')
+def db_stats():
+    return jsonify({'pool': db_pool_metrics.snapshot(db.engine)})
 
-    count = len(guest_galleries)
-    for g in guest_galleries:
-        db.session.delete(g)
+@app.route('/admin/redis-memory')
+def redis_memory():
+    """Memory report over up to `sample` guest sessions (at most MAX_MEMORY_SAMPLE)"""
+    sample = request.args.get('sample', '100')
+    if not sample.isdigit() or int(sample) < 1:
+        return jsonify({'success': False, 'error': 'sample must be a positive number'}), 400
+    return jsonify(redis_manager.memory_report(sample=min(int(sample), MAX_MEMORY_SAMPLE)))
 
-    db.session.commit()
-    return jsonify({'deleted': count})
+@app.route('/admin/cleanup-guests', methods=['POST'])
+def cleanup_guest_galleries():
+    report = guest_cleanup.run()
+    if report is None:
+        return jsonify({'success': False, 'error': 'A cleanup is already running'}), 409
+    return jsonify(report)
 
 oauth = OAuth(app)
 
@@ -1145,8 +1468,7 @@ def auth_callback():
         user = User(
             sub=sub,
             email=userinfo.get('email'),
-            name=userinfo.get('name'),
-            is_guest=False
+            name=userinfo.get('name')
         )
         db.session.add(user)
         db.session.commit()
@@ -1154,9 +1476,16 @@ def auth_callback():
         # Optional: update existing user info
         user.email = userinfo.get('email')
         user.name = userinfo.get('name')
-        user.is_guest = False
         db.session.commit()
 
+    # Keep what the visitor built as a guest
+    guest_session_id = session.pop('guest_session_id', None)
+    if guest_session_id:
+        migrate_guest_data(guest_session_id, user.id)
+        # The current exhibit and wall were guest ids
+        session.pop('current_exhibit_id', None)
+        session.pop('current_wall_id', None)
+
     # Store internal DB user id in session for app use
     session['user_id'] = user.id
     session['user'] = userinfo
@@ -1167,20 +1496,27 @@ def auth_callback():
     return redirect(redirect_url)
 
 # Initialize scheduler for guest data cleanup
+def run_scheduled_cleanup():
+    with app.app_context():
+        if sqlite_mode:
+            sqlite_mode.set_writing(True)
+        try:
+            guest_cleanup.run()
+        finally:
+            if sqlite_mode:
+                sqlite_mode.set_writing(False)
+
 def schedule_cleanup():
     scheduler = BackgroundScheduler()
     scheduler.add_job(
-        func=lambda: Exhibit.cleanup_guest_galleries(),
+        func=run_scheduled_cleanup,
         trigger='interval',
-        hours=6
+        hours=config['cleanup']['interval_hours'],
+        max_instances=1,
+        coalesce=True
     )
     scheduler.start()
 
 # Only start the scheduler when not in debug mode or when running directly
 if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
     schedule_cleanup()
-
-if __name__ == "__main__":
-    host = os.environ.get("HOST", "0.0.0.0")  # Default to 0.0.0.0
-    port = int(os.environ.get("HOST_PORT", 8080))  # Default to 8080
-    app.run(debug=True, host=host, port=port)
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Peak memory of an exhibit export, pandas/openpyxl in memory vs streaming.
+
+    python benchmarks/excel_export.py --walls 20 --artworks 20000 --processes 4
+
+"pandas" loads every artwork as an ORM object, builds a DataFrame per wall
+and writes them through pd.ExcelWriter(engine="openpyxl"), the way the
+exporter used to. "streaming" is export_exhibit_to_excel: rows come from
+a server-side cursor into a constant-memory xlsxwriter workbook. Peak is
+Python heap as seen by tracemalloc. "parallel" is the same export with
+its per-wall sheets rendered by a SheetPool of --processes workers (the
+pool is started before timing; its peak covers this process only).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd  # noqa: E402
+from flask import Flask  # noqa: E402
+
+from gallery.models.base import db  # noqa: E402
+from gallery.models.exhibit import Exhibit  # noqa: E402
+from gallery.models.wall import Wall  # noqa: E402
+from gallery.models.artwork import Artwork  # noqa: E402
+from gallery.models.project_exporter import (export_exhibit_to_excel, render_wall_sheet, SheetPool,  # noqa: E402
+                                             ARTWORK_COLUMNS)
+import gallery.models  # noqa: E402,F401  (registers every table)
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    return app
+
+
+def setup(walls, artworks):
+    exhibit = Exhibit(name='Benchmark')
+    db.session.add(exhibit)
+    db.session.flush()
+    wall_objects = [Wall(name=f'Wall {i}', width=1000, height=300, exhibit_id=exhibit.id) for i in range(walls)]
+    db.session.add_all(wall_objects)
+    db.session.flush()
+    db.session.execute(Artwork.__table__.insert(), [
+        {'name': f'Artwork {i}', 'width': 40, 'height': 30, 'hanging_point': 0, 'medium': 'Oil on canvas',
+         'notes': 'Lorem ipsum dolor sit amet', 'wall_id': wall_objects[i % walls].id}
+        for i in range(artworks)
+    ])
+    db.session.commit()
+    return exhibit.id
+
+
+def export_pandas(path, exhibit):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for wall in exhibit.walls:
+            pd.DataFrame([a.to_dict() for a in wall.artworks]).to_excel(
+                writer, index=False, sheet_name=f"{wall.name} - Art")
+
+
+def measure(name, export, exhibit_id, out):
+    # Timed and traced in separate runs; tracemalloc slows this process
+    # down, but not the pool's workers
+    db.session.expunge_all()
+    started = time.perf_counter()
+    export(out, db.session.get(Exhibit, exhibit_id))
+    elapsed = time.perf_counter() - started
+    db.session.expunge_all()
+    tracemalloc.start()
+    export(out, db.session.get(Exhibit, exhibit_id))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>10}: {elapsed:6.2f}s, peak {peak / 1024 / 1024:7.1f} MB, file {os.path.getsize(out) / 1024:.0f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--walls', type=int, default=20)
+    parser.add_argument('--artworks', type=int, default=20000)
+    parser.add_argument('--processes', type=int, default=4, help="SheetPool size; 0 skips the parallel run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            exhibit_id = setup(args.walls, args.artworks)
+            print(f"{args.walls} walls, {args.artworks} artworks")
+            measure('pandas', export_pandas, exhibit_id, os.path.join(tmp, 'pandas.xlsx'))
+            measure('streaming', export_exhibit_to_excel, exhibit_id, os.path.join(tmp, 'streaming.xlsx'))
+            if args.processes:
+                pool = SheetPool(args.processes)
+                for future in [pool.submit(render_wall_sheet, ARTWORK_COLUMNS, [], '')
+                               for _ in range(args.processes)]:
+                    future.result()
+                try:
+                    measure('parallel', lambda out, exhibit: export_exhibit_to_excel(out, exhibit, pool=pool),
+                            exhibit_id, os.path.join(tmp, 'parallel.xlsx'))
+                finally:
+                    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
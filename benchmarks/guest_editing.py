@@ -0,0 +1,79 @@
+"""
+Guest editing throughput against the in-process Redis stand-in.
+
+    python benchmarks/guest_editing.py --artworks 50 --moves 2000 --threads 4
+
+Each thread plays one guest: it builds an exhibit with one wall and some
+artworks, then moves artworks around as the editor does while dragging.
+No Redis server is needed, so the numbers measure the application side
+(session encoding, entity layout, optimistic retries) only.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ['REDIS_BACKEND'] = 'memory'
+os.environ.setdefault('SQLITE_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import app as gallery_app  # noqa: E402
+
+AJAX = {'X-Requested-With': 'XMLHttpRequest'}
+
+
+def build_guest(client, artworks):
+    client.get('/guest')
+    client.post('/new-exhibit', data={'exhibit_name': 'Benchmark'})
+    client.post('/create-wall', data={'wall_name': 'Wall', 'wall_width': '1000', 'wall_height': '400'})
+    with client.session_transaction() as flask_session:
+        wall_id = flask_session['current_wall_id']
+    ids = []
+    for i in range(artworks):
+        response = client.post('/artwork-manual', data={'name': f'Artwork {i}', 'width': '40', 'height': '30'},
+                               headers=AJAX)
+        ids.append(response.get_json()['artwork']['id'])
+    return wall_id, ids
+
+
+def run_guest(moves, artworks, latencies):
+    with gallery_app.app.test_client() as client:
+        wall_id, ids = build_guest(client, artworks)
+        for i in range(moves):
+            start = time.perf_counter()
+            response = client.post(f'/update_artwork_position/{ids[i % len(ids)]}',
+                                   json={'x_position': i % 1000, 'y_position': i % 400, 'wall_id': wall_id})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--artworks', type=int, default=50)
+    parser.add_argument('--moves', type=int, default=2000, help='position updates per guest')
+    parser.add_argument('--threads', type=int, default=1, help='concurrent guests')
+    args = parser.parse_args()
+
+    gallery_app.app.config.update(WTF_CSRF_ENABLED=False)
+    latencies = []
+    threads = [threading.Thread(target=run_guest, args=(args.moves, args.artworks, latencies))
+               for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"codec={gallery_app.redis_manager.codec.name} guests={args.threads} artworks={args.artworks}")
+    print(f"{len(latencies)} moves in {elapsed:.2f}s ({len(latencies) / elapsed:.0f} req/s, "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms)")
+    print(f"memory: {gallery_app.redis_manager.memory_report()}")
+
+
+if __name__ == '__main__':
+    main()
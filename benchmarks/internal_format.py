@@ -0,0 +1,79 @@
+"""
+Size and speed of the _internal column, str(dict) repr vs the typed JSON format.
+
+    python benchmarks/internal_format.py --objects 50000
+
+"repr" is what _project_to_excel used to store: str() of the object's
+__dict__, read back with ast.literal_eval. Only plain literals are kept:
+literal_eval can not parse the reprs of _sa_instance_state, datetimes or
+enums at all, so that format never round-tripped them. "json" is
+encode_internal per object and one decode_internal call for the column;
+"rows" decodes to insert()-ready dicts with decode_internal_rows instead
+of model instances.
+Objects are artworks, permanent objects and snap lines in equal parts.
+"""
+import argparse
+import ast
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.wall import Wall  # noqa: E402
+from gallery.models.artwork import Artwork  # noqa: E402
+from gallery.models.permanent_object import PermanentObject  # noqa: E402
+from gallery.models.wall_line import SingleLine  # noqa: E402
+from gallery.models.project_exporter import encode_internal, decode_internal, decode_internal_rows  # noqa: E402
+import gallery.models  # noqa: E402,F401  (registers every table)
+
+
+def make_objects(count):
+    wall = Wall(name='Benchmark', width=1000, height=300)
+    wall.id, wall.updated_at = 1, datetime(2024, 5, 1, 12, 30)
+    objects = [wall]
+    for i in range(count // 3):
+        artwork = Artwork(name=f'Artwork {i}', width=40.5, height=30, medium='Oil on canvas', wall_id=1)
+        artwork.id, artwork.notes, artwork.price = i + 1, 'Lorem ipsum dolor sit amet', 1250.0
+        door = PermanentObject(name=f'Vent {i}', width=20, height=20, x=i, y=5, wall_id=1)
+        door.id = i + 1
+        line = SingleLine(x=i, y=60, length=1000, distance=60, wall_id=1)
+        objects += [artwork, door, line]
+    return objects
+
+
+def repr_encode(obj):
+    return str({k: v for k, v in obj.__dict__.items() if isinstance(v, (str, int, float, type(None)))})
+
+
+def repr_decode(values):
+    return [ast.literal_eval(value) for value in values]
+
+
+def measure(name, encode, decode, objects):
+    started = time.perf_counter()
+    values = [encode(obj) for obj in objects]
+    encoded = time.perf_counter() - started
+    started = time.perf_counter()
+    decode(values)
+    decoded = time.perf_counter() - started
+    size = sum(len(value.encode('utf-8')) for value in values)
+    print(f"{name:>5}: encode {encoded:6.3f}s, decode {decoded:6.3f}s, "
+          f"{size / 1024:8.0f} KB ({size / len(values):.0f} bytes per object)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--objects', type=int, default=50000)
+    args = parser.parse_args()
+
+    objects = make_objects(args.objects)
+    print(f"{len(objects)} objects")
+    measure('repr', repr_encode, repr_decode, objects)
+    measure('json', encode_internal, decode_internal, objects)
+    measure('rows', encode_internal, decode_internal_rows, objects)
+
+
+if __name__ == '__main__':
+    main()
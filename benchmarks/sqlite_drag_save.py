@@ -0,0 +1,114 @@
+"""
+Concurrent drag-save throughput on SQLite, default settings vs SQLiteMode.
+
+    python benchmarks/sqlite_drag_save.py --processes 4 --threads 4 --saves 200
+
+Every worker thread repeats what a position update does: read an artwork,
+change its position and commit, on one shared database file. Processes
+stand in for gunicorn workers, threads for requests within a worker.
+"default" is SQLAlchemy's stock SQLite engine (rollback journal, deferred
+transactions); "tuned" adds WAL, the pragmas and serialized writes.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from gallery.models.base import db  # noqa: E402
+from gallery.models.artwork import Artwork  # noqa: E402
+from gallery.models.sqlite_mode import SQLiteMode  # noqa: E402
+import gallery.models  # noqa: E402,F401  (registers every table)
+
+
+def make_engine(path, mode):
+    engine = create_engine(f"sqlite:///{path}")
+    sqlite_mode = SQLiteMode().attach(engine) if mode == 'tuned' else None
+    return engine, sqlite_mode
+
+
+def setup(path, artworks):
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Artwork(name=f'Artwork {i}', width=40, height=30) for i in range(artworks)])
+        session.commit()
+    engine.dispose()
+
+
+def save_loop(engine, sqlite_mode, saves, artworks, results):
+    done = failed = 0
+    rng = random.Random()
+    for _ in range(saves):
+        with Session(engine) as session:
+            try:
+                if sqlite_mode:
+                    sqlite_mode.set_writing(True)
+                artwork = session.scalars(select(Artwork).where(Artwork.id == rng.randint(1, artworks))).one()
+                artwork.x_position = rng.random() * 1000
+                artwork.y_position = rng.random() * 400
+                session.commit()
+                done += 1
+            except OperationalError:
+                # "database is locked"
+                session.rollback()
+                failed += 1
+    results.append((done, failed))
+
+
+def worker(path, mode, threads, saves, artworks, queue):
+    engine, sqlite_mode = make_engine(path, mode)
+    results = []
+    pool = [threading.Thread(target=save_loop, args=(engine, sqlite_mode, saves, artworks, results))
+            for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    queue.put((sum(r[0] for r in results), sum(r[1] for r in results)))
+
+
+def run(mode, args):
+    path = os.path.join(tempfile.mkdtemp(), f'{mode}.db')
+    setup(path, args.artworks)
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(path, mode, args.threads, args.saves,
+                                                              args.artworks, queue))
+                 for _ in range(args.processes)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    totals = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    done, failed = sum(t[0] for t in totals), sum(t[1] for t in totals)
+    print(f"{mode:>7}: {done} saves in {elapsed:.2f}s ({done / elapsed:.0f} saves/s), "
+          f"{failed} failed with 'database is locked'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4, help='threads per process')
+    parser.add_argument('--saves', type=int, default=200, help='saves per thread')
+    parser.add_argument('--artworks', type=int, default=50)
+    parser.add_argument('--mode', choices=['default', 'tuned', 'both'], default='both')
+    args = parser.parse_args()
+
+    print(f"processes={args.processes} threads={args.threads} saves/thread={args.saves}")
+    for mode in (['default', 'tuned'] if args.mode == 'both' else [args.mode]):
+        run(mode, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,12 +18,34 @@ def load_config():
             'user': os.getenv('MYSQL_USER', config.get('database', 'mysql_user', fallback='root')),
             'password': os.getenv('MYSQL_PASSWORD', config.get('database', 'mysql_password', fallback='')),
             'db': os.getenv('MYSQL_DB', config.get('database', 'mysql_db', fallback='app_db')),
+            # Connection pool: keep pool_size + max_overflow >= threads per worker and
+            # pool_recycle below the server's wait_timeout so idle connections are replaced
+            'pool_size': int(os.getenv('MYSQL_POOL_SIZE', config.get('database', 'mysql_pool_size', fallback='10'))),
+            'max_overflow': int(os.getenv('MYSQL_MAX_OVERFLOW', config.get('database', 'mysql_max_overflow', fallback='20'))),
+            'pool_timeout': float(os.getenv('MYSQL_POOL_TIMEOUT', config.get('database', 'mysql_pool_timeout', fallback='10'))),
+            'pool_recycle': int(os.getenv('MYSQL_POOL_RECYCLE', config.get('database', 'mysql_pool_recycle', fallback='280'))),
+            'pool_pre_ping': os.getenv('MYSQL_POOL_PRE_PING', config.get('database', 'mysql_pool_pre_ping', fallback='true')).lower() in ('1', 'true', 'yes', 'on'),
         })
     else:
         db_config.update({
             'path': os.getenv('SQLITE_PATH', config.get('database', 'sqlite_path', fallback='app.db')),
+            # Applied to every connection, see gallery/models/sqlite_mode.py
+            'pragmas': {
+                'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', config.get('database', 'sqlite_journal_mode', fallback='WAL')),
+                'synchronous': os.getenv('SQLITE_SYNCHRONOUS', config.get('database', 'sqlite_synchronous', fallback='NORMAL')),
+                'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KB', config.get('database', 'sqlite_cache_size_kb', fallback='64000'))),
+                'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE_MB', config.get('database', 'sqlite_mmap_size_mb', fallback='256'))) * 1024 * 1024,
+                'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', config.get('database', 'sqlite_busy_timeout_ms', fallback='5000'))),
+            },
+            'serialize_writes': os.getenv('SQLITE_SERIALIZE_WRITES', config.get('database', 'sqlite_serialize_writes', fallback='true')).lower() in ('1', 'true', 'yes', 'on'),
         })
 
+    db_config.update({
+        # Requests above either limit are logged with their statement summary
+        'query_warn_count': int(os.getenv('DB_QUERY_WARN_COUNT', config.get('database', 'query_warn_count', fallback='30'))),
+        'query_warn_ms': float(os.getenv('DB_QUERY_WARN_MS', config.get('database', 'query_warn_ms', fallback='250'))),
+    })
+
     authentik_config = {
         'client_id': os.getenv("AUTHENTIK_CLIENT_ID", config.get("authentik", "AUTHENTIK_CLIENT_ID", fallback="CLIENT_ID")),
         'client_secret': os.getenv("AUTHENTIK_CLIENT_SECRET", config.get("authentik", "AUTHENTIK_CLIENT_SECRET", fallback="CLIENT_SECRET")),
@@ -35,12 +57,56 @@ def load_config():
     }
 
     redis_config = {
-        'host': os.getenv('REDIS_HOST', 'localhost'),
-        'port': int(os.getenv('REDIS_PORT', 6379))
+        # 'redis' for a server, 'memory' for the in-process stand-in (tests, benchmarks)
+        'backend': os.getenv('REDIS_BACKEND', config.get('redis', 'backend', fallback='redis')).lower(),
+        'host': os.getenv('REDIS_HOST', config.get('redis', 'host', fallback='localhost')),
+        'port': int(os.getenv('REDIS_PORT', config.get('redis', 'port', fallback='6379'))),
+        # Connection pool sizing: keep max_connections >= gunicorn threads per worker
+        'max_connections': int(os.getenv('REDIS_MAX_CONNECTIONS', config.get('redis', 'max_connections', fallback='20'))),
+        'pool_timeout': float(os.getenv('REDIS_POOL_TIMEOUT', config.get('redis', 'pool_timeout', fallback='5'))),
+        'socket_timeout': float(os.getenv('REDIS_SOCKET_TIMEOUT', config.get('redis', 'socket_timeout', fallback='2'))),
+        'socket_connect_timeout': float(os.getenv('REDIS_CONNECT_TIMEOUT', config.get('redis', 'socket_connect_timeout', fallback='2'))),
+        'health_check_interval': int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', config.get('redis', 'health_check_interval', fallback='30'))),
+        # Guest session encoding: json, msgpack, msgpack+zlib, msgpack+zstd, ... or auto.
+        # Anything but json/json+zlib needs the optional msgpack or zstandard package.
+        'codec': os.getenv('REDIS_CODEC', config.get('redis', 'codec', fallback='json')),
+        'min_compress_size': int(os.getenv('REDIS_MIN_COMPRESS_SIZE', config.get('redis', 'min_compress_size', fallback='256'))),
+    }
+
+    cleanup_config = {
+        # Ownerless exhibits (taken to be guest data) older than this are removed
+        'guest_max_age_hours': float(os.getenv('CLEANUP_GUEST_MAX_AGE_HOURS', config.get('cleanup', 'guest_max_age_hours', fallback='24'))),
+        'interval_hours': float(os.getenv('CLEANUP_INTERVAL_HOURS', config.get('cleanup', 'interval_hours', fallback='6'))),
+        # Rows per DELETE batch and the pause between batches, to keep lock times short
+        'batch_size': int(os.getenv('CLEANUP_BATCH_SIZE', config.get('cleanup', 'batch_size', fallback='500'))),
+        'batch_pause_ms': float(os.getenv('CLEANUP_BATCH_PAUSE_MS', config.get('cleanup', 'batch_pause_ms', fallback='50'))),
+        # Stop a run after this long and carry on at the next one (0 = no limit)
+        'max_seconds': float(os.getenv('CLEANUP_MAX_SECONDS', config.get('cleanup', 'max_seconds', fallback='300'))) or None,
+        # Delete unreferenced files below static/uploads/guest; off unless enabled
+        'delete_uploads': os.getenv('CLEANUP_DELETE_UPLOADS', config.get('cleanup', 'delete_uploads', fallback='false')).lower() in ('1', 'true', 'yes', 'on'),
+    }
+
+    jobs_config = {
+        # Background exports; 'local' runs them on a thread pool in each app process
+        'backend': os.getenv('JOBS_BACKEND', config.get('jobs', 'backend', fallback='local')),
+        'workers': int(os.getenv('JOBS_WORKERS', config.get('jobs', 'workers', fallback='2'))),
+        'ttl_minutes': float(os.getenv('JOBS_TTL_MINUTES', config.get('jobs', 'ttl_minutes', fallback='60'))),
+        # Processes that render the per-wall sheets of large Excel exports; 0 or 1 renders them in line
+        'sheet_processes': int(os.getenv('JOBS_SHEET_PROCESSES', config.get('jobs', 'sheet_processes', fallback='4'))),
+    }
+
+    export_cache_config = {
+        # Finished exports keyed by exhibit content (empty directory = the system temp dir)
+        'directory': os.getenv('EXPORT_CACHE_DIR', config.get('export_cache', 'directory', fallback='')),
+        # Least recently used files are evicted beyond this size
+        'max_mb': float(os.getenv('EXPORT_CACHE_MAX_MB', config.get('export_cache', 'max_mb', fallback='512'))),
     }
 
     return {
+        'cleanup': cleanup_config,
         'database': db_config,
+        'export_cache': export_cache_config,
+        'jobs': jobs_config,
         'authentik': authentik_config,
         'redis': redis_config
     }
\ No newline at end of file
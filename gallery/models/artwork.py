@@ -11,6 +11,12 @@ from .base import db
 
 class Artwork(WallObject):
     __tablename__ = 'artworks'
+    __table_args__ = (
+        # Exhibit.unplaced_artworks: exhibit_id = ? AND wall_id IS NULL
+        db.Index('ix_artworks_exhibit_id_wall_id', 'exhibit_id', 'wall_id'),
+        # The editor's artwork list: user_id = ? AND (wall_id IN (...) OR wall_id IS NULL ...)
+        db.Index('ix_artworks_user_id_wall_id', 'user_id', 'wall_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -23,11 +29,11 @@ class Artwork(WallObject):
     nfs = db.Column(db.Boolean, default=False)
     notes = db.Column(db.String(500))
     image_path = db.Column(db.String(200))
-    exhibit_id = db.Column(db.Integer, db.ForeignKey('exhibits.id'))
+    exhibit_id = db.Column(db.Integer, db.ForeignKey('exhibits.id', ondelete='CASCADE'))
     x_position = db.Column(db.Float, nullable=True)
     y_position = db.Column(db.Float, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
-    wall_id = db.Column(db.Integer, db.ForeignKey('wall.id'), nullable=True)
+    wall_id = db.Column(db.Integer, db.ForeignKey('wall.id', ondelete='CASCADE'), nullable=True, index=True)
 
     user = db.relationship('User', back_populates='artworks')
     exhibit = db.relationship('Exhibit', back_populates='unplaced_artworks')
@@ -1,5 +1,4 @@
 import openpyxl
-from openpyxl.styles import Font, PatternFill
 from typing import List, Optional
 from .base import db
 from .artwork import Artwork
@@ -7,20 +6,25 @@ from datetime import datetime
 
 class Exhibit(db.Model):
     __tablename__ = 'exhibits'
+    __table_args__ = (
+        # Guest cleanup: user_id IS NULL AND created_at < ? ORDER BY created_at
+        db.Index('ix_exhibits_user_id_created_at', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128))
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
     user = db.relationship('User', back_populates='exhibits', lazy=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
-    walls = db.relationship('Wall', backref='exhibit', lazy=True, cascade='all, delete-orphan')
+    walls = db.relationship('Wall', backref='exhibit', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     unplaced_artworks = db.relationship(
         'Artwork',
         primaryjoin='and_(Artwork.wall_id==None, Artwork.exhibit_id==Exhibit.id)',
         back_populates='exhibit',
-        lazy=True
+        lazy=True,
+        passive_deletes=True
     )
 
     def __init__(self, name: str = "Exhibit", user_id: int = None):
@@ -85,93 +89,60 @@ class Exhibit(db.Model):
             return True
         return False
 
-    def export_to_excel(self, filename: str = "exhibit_export.xlsx") -> str:  # Changed from gallery_export        """Export gallery data to Excel file"""
-        """Export exhibit data to Excel file"""
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Artworks"
+    def export_to_excel(self, filename: str = "exhibit_export.xlsx") -> str:
+        """
+        Export exhibit data to Excel file. Artworks are streamed from the
+        database into a constant-memory workbook and column widths are
+        tracked while writing, so large exhibits never sit in memory.
+        """
+        from sqlalchemy import select
+        from .wall import Wall
+        from .project_exporter import SheetWriter, streaming_workbook, stream_rows
+
+        headers = ["ID", "Name", "Photo", "Medium", "Width", "Height", "Depth", "Value", "NFS", "Notes"]
+        colors = ["ADD8E6", "90EE90", "ADD8E6", "FFFF99", "FFFF99", "FFFF99", "FFFF99", "FA8072", "D8BFD8", "FFFFFF"]
+        columns = (Artwork.id, Artwork.name, Artwork.image_path, Artwork.medium, Artwork.width, Artwork.height,
+                   Artwork.depth, Artwork.price, Artwork.nfs, Artwork.notes)
+
+        workbook = streaming_workbook(filename)
+        header_formats = [workbook.add_format({'bold': True, 'bg_color': f"#{color}"}) for color in colors]
+        ws = SheetWriter(workbook.add_worksheet("Artworks"))
+
+        def write_headers():
+            for col, (header, header_format) in enumerate(zip(headers, header_formats)):
+                ws.worksheet.write(ws.row, col, header, header_format)
+            ws.skip()
+
+        def write_artworks(statement):
+            for row in stream_rows(statement):
+                # The photo is embedded by the editor, not in this export
+                ws.append([row[0], row[1], "", *row[3:]])
 
         # Add wall information
-        for wall in self.walls:
-            ws.append([wall.name, wall.width, wall.height, wall.color])
-        ws.append([])  # Empty row before gallery title
+        for wall in db.session.execute(
+                select(Wall.name, Wall.width, Wall.height, Wall.color)
+                .where(Wall.exhibit_id == self.id).order_by(Wall.id)):
+            ws.append(wall)
+        ws.skip()  # Empty row before gallery title
 
         # Gallery title
-        ws.append([self.name])
-        title_row = ws.max_row
-        ws.merge_cells(start_row=title_row, start_column=1, end_row=title_row, end_column=10)
-        title_cell = ws.cell(row=title_row, column=1)
-        title_cell.font = Font(size=14, bold=True)
-        title_cell.fill = PatternFill(start_color="D8BFD8", end_color="D8BFD8", fill_type="solid")
-        
-        ws.append([])  # Empty row before headers
-        
-        # Column headers
-        headers = ["ID", "Name", "Photo", "Medium", "Width", "Height", "Depth", "Value", "NFS", "Notes"]
-        colors = ["ADD8E6", "90EE90", "ADD8E6", "FFFF99", "FFFF99", "FFFF99", "FFFF99", "FA8072", "D8BFD8", "FFFFFF"]
-        
-        header_row = ws.max_row + 1
-        for col_num, (header, color) in enumerate(zip(headers, colors), start=1):
-            cell = ws.cell(row=header_row, column=col_num, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-
-        # Add placed artworks
-        art_counter = 0
-        for wall in self.walls:
-            for artwork in wall.artworks:
-                art_counter += 1
-                ws.append([
-                    artwork.id or art_counter,
-                    artwork.title,
-                    "",
-                    artwork.medium,
-                    artwork.width,
-                    artwork.height,
-                    artwork.depth,
-                    artwork.price,
-                    artwork.nfs,
-                    artwork.notes
-                ])
-
-        # Add unplaced artworks section
-        ws.append([])
-        ws.append(["Unplaced Artwork"])
-        ws.merge_cells(start_row=ws.max_row, start_column=1, end_row=ws.max_row, end_column=10)
-        title_cell = ws.cell(row=ws.max_row, column=1)
-        title_cell.font = Font(size=12, bold=True)
-        title_cell.fill = PatternFill(start_color="F0E68C", end_color="F0E68C", fill_type="solid")
-
-        # Add headers again for unplaced artwork
-        header_row = ws.max_row + 1
-        for col_num, (header, color) in enumerate(zip(headers, colors), start=1):
-            cell = ws.cell(row=header_row, column=col_num, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-
-        # Add unplaced artworks
-        for artwork in self.unplaced_artworks:
-            art_counter += 1
-            ws.append([
-                artwork.id or art_counter,
-                artwork.title,
-                "",
-                artwork.medium,
-                artwork.width,
-                artwork.height,
-                artwork.depth,
-                artwork.price,
-                artwork.nfs,
-                artwork.notes
-            ])
-
-        # Auto-adjust column widths
-        for col in ws.columns:
-            max_length = max(len(str(cell.value)) if cell.value else 0 for cell in col)
-            adjusted_width = (max_length + 2) * 1.2
-            ws.column_dimensions[col[0].column_letter].width = adjusted_width
-
-        wb.save(filename)
+        ws.merge(self.name, workbook.add_format({'bold': True, 'font_size': 14, 'bg_color': '#D8BFD8'}), 10)
+        ws.skip()  # Empty row before headers
+
+        # Placed artworks, wall by wall
+        write_headers()
+        write_artworks(select(*columns).join(Wall, Artwork.wall_id == Wall.id)
+                       .where(Wall.exhibit_id == self.id).order_by(Wall.id, Artwork.id))
+
+        # Unplaced artworks section
+        ws.skip()
+        ws.merge("Unplaced Artwork", workbook.add_format({'bold': True, 'font_size': 12, 'bg_color': '#F0E68C'}), 10)
+        write_headers()
+        write_artworks(select(*columns).where(Artwork.exhibit_id == self.id, Artwork.wall_id.is_(None))
+                       .order_by(Artwork.id))
+
+        ws.fit_columns()
+        workbook.close()
         return filename
 
     @classmethod
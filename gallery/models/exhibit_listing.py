@@ -0,0 +1,86 @@
+from sqlalchemy import func, select
+from .base import db
+from .exhibit import Exhibit
+from .wall import Wall
+from .artwork import Artwork
+
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Exhibit listings are paged by keyset: newest first (id descending), and a
+# page after `after` starts below that id. Unlike OFFSET this stays cheap on
+# later pages and does not skip or repeat rows when exhibits are added.
+
+
+def page_size(limit):
+    return max(1, min(limit or PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def _summary(exhibit_id, name, walls, placed, unplaced, created_at, last_modified):
+    return {
+        'id': exhibit_id,
+        'name': name,
+        'walls': walls,
+        'artworks': placed + unplaced,
+        'placed': placed,
+        'unplaced': unplaced,
+        'created_at': created_at.isoformat() if created_at else None,
+        'last_modified': last_modified.isoformat() if last_modified else None,
+    }
+
+
+def user_exhibit_page(user_id, limit=PAGE_SIZE, after=None):
+    """
+    One page of a user's exhibits with their counts, in a single query.
+    Returns (summaries, next cursor or None).
+    """
+    limit = page_size(limit)
+    # Correlated per-exhibit aggregates; each is an index lookup on the
+    # exhibit id, so only the rows of this page are counted
+    walls = (select(func.count(Wall.id)).where(Wall.exhibit_id == Exhibit.id)
+             .correlate(Exhibit).scalar_subquery())
+    walls_updated = (select(func.max(Wall.updated_at)).where(Wall.exhibit_id == Exhibit.id)
+                     .correlate(Exhibit).scalar_subquery())
+    placed = (select(func.count(Artwork.id)).join(Wall, Artwork.wall_id == Wall.id)
+              .where(Wall.exhibit_id == Exhibit.id).correlate(Exhibit).scalar_subquery())
+    unplaced = (select(func.count(Artwork.id))
+                .where(Artwork.exhibit_id == Exhibit.id, Artwork.wall_id.is_(None))
+                .correlate(Exhibit).scalar_subquery())
+
+    query = (select(Exhibit.id, Exhibit.name, walls, placed, unplaced, Exhibit.created_at, walls_updated)
+             .where(Exhibit.user_id == user_id)
+             .order_by(Exhibit.id.desc())
+             .limit(limit + 1))
+    if after is not None:
+        query = query.where(Exhibit.id < int(after))
+
+    rows = db.session.execute(query).all()
+    summaries = [
+        _summary(exhibit_id, name, walls, placed, unplaced, created_at,
+                 max(filter(None, (created_at, updated)), default=None))
+        for exhibit_id, name, walls, placed, unplaced, created_at, updated in rows[:limit]
+    ]
+    next_cursor = str(summaries[-1]['id']) if len(rows) > limit else None
+    return summaries, next_cursor
+
+
+def guest_exhibit_page(guest_doc, limit=PAGE_SIZE, after=None):
+    """The same page shape for a guest session (GuestSession), newest first"""
+    limit = page_size(limit)
+    # Session entities always have an id; anything without one could be neither opened nor paged past
+    exhibits = [exhibit for exhibit in reversed(guest_doc.exhibits) if exhibit.get('id') is not None] \
+        if guest_doc else []
+    if after is not None:
+        ids = [str(exhibit['id']) for exhibit in exhibits]
+        exhibits = exhibits[ids.index(str(after)) + 1:] if str(after) in ids else []
+
+    summaries = []
+    for exhibit in exhibits[:limit]:
+        walls = exhibit.get('walls', [])
+        summaries.append(_summary(
+            exhibit['id'], exhibit.get('name', 'Untitled'), len(walls),
+            sum(len(wall.get('artworks', [])) for wall in walls), len(exhibit.get('artworks', [])),
+            # Guest entities carry no timestamps
+            None, None))
+    next_cursor = str(summaries[-1]['id']) if len(exhibits) > limit else None
+    return summaries, next_cursor
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from sqlalchemy import select
+from .base import db
+from .exhibit import Exhibit
+from .wall import Wall
+
+logger = logging.getLogger(__name__)
+
+# Part of every cache key; bump it whenever an exporter's output changes, so
+# files written by the old code are never served again
+EXPORT_TEMPLATE_VERSION = 1
+
+SCRATCH_SUFFIX = '.part'
+
+
+def exhibit_fingerprint(exhibit_id):
+    """
+    Content hash of a database exhibit in one query. Every change to a wall
+    or to an artwork, object or line on it bumps the wall's version (see
+    wall_scene.py), so the exhibit name plus (wall id, version) for each of
+    its walls identifies what an export contains. The creation time keeps
+    keys apart when ids are reused, e.g. after a database reset.
+    """
+    rows = db.session.execute(
+        select(Exhibit.name, Exhibit.created_at, Wall.id, Wall.version)
+        .outerjoin(Wall, Wall.exhibit_id == Exhibit.id)
+        .where(Exhibit.id == exhibit_id)
+        .order_by(Wall.id)
+    ).all()
+    if not rows:
+        return None
+    content = [exhibit_id, rows[0].name, str(rows[0].created_at),
+               [(row.id, row.version) for row in rows if row.id is not None]]
+    return hashlib.sha256(json.dumps(content).encode('utf-8')).hexdigest()
+
+
+def guest_fingerprint(exhibit):
+    """Content hash of a guest exhibit dict; it has no versions, but is already in memory"""
+    body = json.dumps(exhibit, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def export_key(fingerprint, kind, fmt):
+    return hashlib.sha256(f"{fingerprint}:{kind}:{fmt}:v{EXPORT_TEMPLATE_VERSION}".encode('utf-8')).hexdigest()
+
+
+class ExportCache:
+    """
+    Export files on disk, named by export_key, with least recently used
+    files evicted once the directory grows past max_bytes. A hit touches
+    the file's mtime, which is what the LRU order goes by.
+
+    Files are moved in with os.replace, so readers (in any process) see a
+    whole file or none; an evicted file that is still being streamed stays
+    readable through its open handle.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, cache_config):
+        """Build from the 'export_cache' section returned by load_config()"""
+        directory = cache_config['directory'] or os.path.join(tempfile.gettempdir(), 'gallery-export-cache')
+        return cls(directory, int(cache_config['max_mb'] * 1024 * 1024))
+
+    def path(self, key, fmt):
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def scratch_path(self):
+        """A new file in the cache directory to write an export into before put()"""
+        fd, path = tempfile.mkstemp(suffix=SCRATCH_SUFFIX, dir=self.directory)
+        os.close(fd)
+        return path
+
+    def get(self, key, fmt):
+        """Path of the cached file, or None"""
+        path = self.path(key, fmt)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key, fmt, source):
+        """Move the finished file at source into the cache; returns its cache path"""
+        path = self.path(key, fmt)
+        os.replace(source, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    # Exports still being written are not in the cache yet
+                    if entry.is_file() and not entry.name.endswith(SCRATCH_SUFFIX):
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                logger.info(f"[CACHE] Evicted export {os.path.basename(path)} ({size} bytes)")
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'max_bytes': self.max_bytes}
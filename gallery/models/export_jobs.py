@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import groupby
+from uuid import uuid4
+from sqlalchemy import func, select
+from werkzeug.utils import secure_filename
+from .base import db
+from .exhibit import Exhibit
+from .wall import Wall
+from .artwork import Artwork
+from .permanent_object import PermanentObject
+from .wall_line import SingleLine
+from .redis_manager import _text
+from .project_exporter import export_exhibit_to_excel, export_guest_exhibit_to_excel
+from .export_cache import ExportCache, exhibit_fingerprint, guest_fingerprint, export_key
+from gallery.utils.export_helpers import (installation_lines, save_to_excel, save_to_text, save_to_word,
+                                          save_to_pdf)
+
+logger = logging.getLogger(__name__)
+
+INSTRUCTION_WRITERS = {'xlsx': save_to_excel, 'txt': save_to_text, 'docx': save_to_word, 'pdf': save_to_pdf}
+# Job kind -> formats it can produce (the first is the default)
+JOB_FORMATS = {
+    'excel': ('xlsx',),
+    'instructions': tuple(INSTRUCTION_WRITERS),
+}
+
+
+class LocalJobQueue:
+    """Runs jobs on a thread pool inside this process; enough for a single box"""
+
+    def __init__(self, workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export-job')
+
+    def submit(self, fn, *args):
+        self.executor.submit(fn, *args)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+class ExportJobs:
+    """
+    Exhibit exports (the Excel workbook or installation instructions) run
+    as background jobs, so a large exhibit does not tie up a request.
+
+    Job state lives in a Redis hash (export_job:<id>) that expires after
+    ttl, so any worker process can report progress. Finished files go into
+    the ExportCache under the exhibit's content hash, so a job for an
+    exhibit that has not changed since its last export is done as soon as
+    it is submitted. The queue only needs a submit(fn, *args) method;
+    LocalJobQueue runs jobs on a thread pool in the process that accepted
+    them. Excel exports of large exhibits render their sheets in
+    sheet_pool (a SheetPool) when one is given.
+    """
+
+    def __init__(self, redis_client, app, queue, cache: ExportCache, ttl=timedelta(hours=1), sheet_pool=None):
+        self.redis = redis_client
+        self.app = app
+        self.queue = queue
+        self.cache = cache
+        self.ttl = ttl
+        self.sheet_pool = sheet_pool
+
+    @classmethod
+    def from_config(cls, redis_client, app, cache, jobs_config, sheet_pool=None):
+        """Build from the 'jobs' section returned by load_config()"""
+        if jobs_config['backend'] != 'local':
+            raise ValueError(f"Unsupported job backend: {jobs_config['backend']}")
+        return cls(redis_client, app, LocalJobQueue(jobs_config['workers']), cache,
+                   ttl=timedelta(minutes=jobs_config['ttl_minutes']), sheet_pool=sheet_pool)
+
+    @staticmethod
+    def _key(job_id):
+        return f"export_job:{job_id}"
+
+    def _update(self, job_id, **fields):
+        self.redis.hset(self._key(job_id), mapping={k: '' if v is None else v for k, v in fields.items()})
+
+    def _progress(self, job_id):
+        def report(rows):
+            self.redis.hincrby(self._key(job_id), 'done', rows)
+        return report
+
+    def submit(self, owner, kind, exhibit_name, fmt=None, exhibit_id=None, guest_exhibit=None):
+        """
+        Queue an export of a database exhibit (exhibit_id) or of a guest
+        exhibit dict (copied now, so later edits do not leak into the job).
+        Returns the job id.
+        """
+        fmt = fmt or JOB_FORMATS[kind][0]
+        if fmt not in JOB_FORMATS[kind]:
+            raise ValueError(f"{kind} exports can not be written as {fmt}")
+        if guest_exhibit is not None:
+            guest_exhibit = json.loads(json.dumps(guest_exhibit))
+            fingerprint = guest_fingerprint(guest_exhibit)
+        else:
+            fingerprint = exhibit_fingerprint(exhibit_id)
+        key = export_key(fingerprint, kind, fmt)
+
+        job_id = uuid4().hex
+        base = secure_filename(exhibit_name or '') or 'exhibit'
+        suffix = '' if kind == 'excel' else '-instructions'
+        cached = self.cache.get(key, fmt) is not None
+        self._update(job_id, owner=owner, kind=kind, format=fmt, exhibit_id=exhibit_id, key=key,
+                     status='done' if cached else 'queued', done=0, total=0, error=None,
+                     filename=f"{base}{suffix}.{fmt}", created_at=time.time())
+        self.redis.expire(self._key(job_id), self.ttl)
+        if cached:
+            logger.info(f"[JOBS] {kind} export {job_id} for {owner} served from cache")
+        else:
+            self.queue.submit(self._run, job_id, kind, fmt, key, exhibit_id, exhibit_name, guest_exhibit)
+            logger.info(f"[JOBS] Queued {kind} export {job_id} for {owner}")
+        return job_id
+
+    def status(self, job_id, owner):
+        """The job as a dict, or None if it does not exist (any more) or belongs to someone else"""
+        if owner is None:
+            return None
+        job = {_text(k): _text(v) for k, v in self.redis.hgetall(self._key(job_id)).items()}
+        if not job or job.get('owner') != owner:
+            return None
+        done, total = int(job['done'] or 0), int(job['total'] or 0)
+        return {
+            'id': job_id,
+            'kind': job['kind'],
+            'format': job['format'],
+            'status': job['status'],
+            'done': done,
+            'total': total,
+            'progress': round(min(done / total, 1.0), 3) if total else (1.0 if job['status'] == 'done' else 0.0),
+            'error': job['error'] or None,
+            'filename': job['filename'],
+        }
+
+    def artifact(self, job_id, owner):
+        """(path, download name) of a finished job's file, or None (also once the cache evicted it)"""
+        job = self.status(job_id, owner)
+        if not job or job['status'] != 'done':
+            return None
+        path = self.cache.get(_text(self.redis.hget(self._key(job_id), 'key')), job['format'])
+        return (path, job['filename']) if path else None
+
+    def _run(self, job_id, kind, fmt, key, exhibit_id, exhibit_name, guest_exhibit):
+        path = self.cache.scratch_path()
+        started = time.monotonic()
+        self._update(job_id, status='running')
+        try:
+            with self.app.app_context():
+                if kind == 'excel':
+                    total = guest_row_count(guest_exhibit) if guest_exhibit is not None else row_count(exhibit_id)
+                    self._update(job_id, total=total)
+                    if guest_exhibit is not None:
+                        export_guest_exhibit_to_excel(path, guest_exhibit, self._progress(job_id))
+                    else:
+                        export_exhibit_to_excel(path, db.session.get(Exhibit, exhibit_id), self._progress(job_id),
+                                                self.sheet_pool)
+                else:
+                    walls = guest_exhibit.get('walls', []) if guest_exhibit is not None else instruction_walls(exhibit_id)
+                    lines = installation_lines(exhibit_name, walls)
+                    total = len(lines)
+                    self._update(job_id, total=total)
+                    INSTRUCTION_WRITERS[fmt](lines, path)
+        except Exception as e:
+            logger.exception(f"[JOBS] Export {job_id} failed")
+            self._update(job_id, status='failed', error=str(e))
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        self.cache.put(key, fmt, path)
+        self._update(job_id, status='done', done=total)
+        logger.info(f"[JOBS] Export {job_id} done in {time.monotonic() - started:.2f}s ({total} rows)")
+
+
+def row_count(exhibit_id):
+    """Rows an Excel export of the exhibit writes to its per-wall sheets"""
+    wall_ids = select(Wall.id).where(Wall.exhibit_id == exhibit_id).scalar_subquery()
+    counts = [select(func.count()).select_from(model).where(model.wall_id.in_(wall_ids)).scalar_subquery()
+              for model in (Artwork, SingleLine, PermanentObject)]
+    return sum(db.session.execute(select(*counts)).one())
+
+
+def guest_row_count(exhibit):
+    return sum(len(wall.get(collection) or [])
+               for wall in exhibit.get('walls', [])
+               for collection in ('artworks', 'wall_lines', 'permanent_objects'))
+
+
+def instruction_walls(exhibit_id):
+    """The exhibit's walls as dicts with their artworks, in two queries"""
+    walls = [dict(row._mapping, artworks=[]) for row in db.session.execute(
+        select(Wall.id, Wall.name, Wall.width, Wall.height)
+        .where(Wall.exhibit_id == exhibit_id).order_by(Wall.id))]
+    by_id = {wall['id']: wall for wall in walls}
+    artworks = db.session.execute(
+        select(Artwork.wall_id, Artwork.name, Artwork.width, Artwork.height, Artwork.x_position,
+               Artwork.y_position, Artwork.hanging_point)
+        .where(Artwork.wall_id.in_(list(by_id))).order_by(Artwork.wall_id)) if by_id else []
+    for wall_id, rows in groupby(artworks, key=lambda row: row.wall_id):
+        by_id[wall_id]['artworks'] = [dict(row._mapping) for row in rows]
+    return walls
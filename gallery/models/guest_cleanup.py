@@ -0,0 +1,201 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, select
+from .base import db
+from .exhibit import Exhibit
+from .wall import Wall
+from .artwork import Artwork
+from .permanent_object import PermanentObject
+from .wall_line import SingleLine
+from .guest_migration import GuestMigration
+
+logger = logging.getLogger(__name__)
+
+# Below the uploads directory; the app saves guests' files here, and it is
+# the only place cleanup deletes files from
+GUEST_UPLOAD_DIR = 'guest'
+
+
+def upload_key(image_path):
+    """An image_path as a path below the uploads directory, e.g. 'guest/a.png'"""
+    path = image_path.replace('\\', '/').lstrip('/')
+    return path.removeprefix('static/').removeprefix('uploads/')
+
+
+class CleanupProgress:
+    """Rows and files removed by one cleanup run, with its throughput"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.batches = 0
+        self.deleted = {}
+
+    def add(self, table, count):
+        self.deleted[table] = self.deleted.get(table, 0) + count
+
+    @property
+    def total(self):
+        return sum(self.deleted.values())
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            'batches': self.batches,
+            'deleted': dict(self.deleted),
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(self.total / elapsed, 1) if elapsed else None,
+        }
+
+
+class GuestCleanup:
+    """
+    Removes what guests leave behind: exhibits without an owner older than
+    max_age (with their walls, artworks, permanent objects and snap lines),
+    stale guest migration markers and, if delete_uploads is set, guest
+    upload files nothing refers to.
+
+    The schema has no guest marker on exhibits. Guests keep their exhibits
+    in Redis and signed-in users always own theirs, so any exhibit row with
+    user_id NULL is taken to be guest data. Rows written without an owner
+    some other way (a script, an import without a user) are removed too.
+
+    Rows go in batches of batch_size. Each batch selects its exhibit ids
+    through ix_exhibits_user_id_created_at, deletes by id list (one DELETE
+    per table) and commits on its own, with a pause between batches, so
+    locks are only ever held for one short batch.
+    """
+
+    def __init__(self, redis_manager, upload_dir, max_age=timedelta(days=1), marker_age=timedelta(days=30),
+                 batch_size=500, pause=0.05, file_min_age=timedelta(days=2), max_seconds=None,
+                 delete_uploads=False):
+        self.redis_manager = redis_manager
+        self.upload_dir = upload_dir
+        self.max_age = max_age
+        self.marker_age = marker_age
+        self.batch_size = batch_size
+        self.pause = pause
+        self.file_min_age = file_min_age
+        self.max_seconds = max_seconds
+        self.delete_uploads = delete_uploads
+        self._running = threading.Lock()
+
+    @classmethod
+    def from_config(cls, redis_manager, upload_dir, cleanup_config):
+        """Build from the 'cleanup' section returned by load_config()"""
+        return cls(
+            redis_manager, upload_dir,
+            max_age=timedelta(hours=cleanup_config['guest_max_age_hours']),
+            batch_size=cleanup_config['batch_size'],
+            pause=cleanup_config['batch_pause_ms'] / 1000,
+            max_seconds=cleanup_config['max_seconds'],
+            delete_uploads=cleanup_config['delete_uploads'],
+        )
+
+    def _out_of_time(self, progress):
+        return self.max_seconds is not None and time.monotonic() - progress.started > self.max_seconds
+
+    def _end_batch(self, progress, label):
+        db.session.commit()
+        progress.batches += 1
+        report = progress.report()
+        logger.info(f"[DB] Cleanup batch {progress.batches} ({label}): {report['deleted']}, "
+                    f"{report['rows_per_second']} rows/s")
+        time.sleep(self.pause)
+
+    def delete_expired_exhibits(self, progress, now=None):
+        # Ownerless means guest data, see the class docstring
+        cutoff = (now or datetime.utcnow()) - self.max_age
+        while not self._out_of_time(progress):
+            exhibit_ids = db.session.execute(
+                select(Exhibit.id)
+                .where(Exhibit.user_id.is_(None), Exhibit.created_at < cutoff)
+                .order_by(Exhibit.created_at)
+                .limit(self.batch_size)
+            ).scalars().all()
+            if not exhibit_ids:
+                return
+            wall_ids = db.session.execute(
+                select(Wall.id).where(Wall.exhibit_id.in_(exhibit_ids))).scalars().all()
+            # Children first; ids are materialised so no DELETE reads its own table
+            statements = [
+                (SingleLine, SingleLine.wall_id.in_(wall_ids)),
+                (PermanentObject, PermanentObject.wall_id.in_(wall_ids)),
+                (Artwork, or_(Artwork.wall_id.in_(wall_ids), Artwork.exhibit_id.in_(exhibit_ids))),
+                (Wall, Wall.id.in_(wall_ids)),
+            ] if wall_ids else [(Artwork, Artwork.exhibit_id.in_(exhibit_ids))]
+            statements.append((Exhibit, Exhibit.id.in_(exhibit_ids)))
+            for model, condition in statements:
+                result = db.session.execute(delete(model).where(condition).execution_options(synchronize_session=False))
+                progress.add(model.__tablename__, result.rowcount)
+            self._end_batch(progress, 'exhibits')
+
+    def delete_stale_markers(self, progress, now=None):
+        cutoff = (now or datetime.utcnow()) - self.marker_age
+        while not self._out_of_time(progress):
+            ids = db.session.execute(
+                select(GuestMigration.guest_session_id)
+                .where(GuestMigration.created_at < cutoff)
+                .limit(self.batch_size)
+            ).scalars().all()
+            if not ids:
+                return
+            result = db.session.execute(delete(GuestMigration).where(GuestMigration.guest_session_id.in_(ids)))
+            progress.add(GuestMigration.__tablename__, result.rowcount)
+            self._end_batch(progress, 'migration markers')
+
+    def referenced_files(self):
+        """Uploads (as upload_key paths) still used by a database row or a live guest session"""
+        paths = set(self.redis_manager.guest_image_paths())
+        for model in (Artwork, PermanentObject):
+            paths.update(db.session.execute(
+                select(model.image_path).where(model.image_path.isnot(None)).distinct()).scalars())
+        return {upload_key(path) for path in paths if path}
+
+    def delete_orphaned_uploads(self, progress, now=None):
+        guest_dir = os.path.join(self.upload_dir, GUEST_UPLOAD_DIR)
+        if not self.delete_uploads or not os.path.isdir(guest_dir):
+            return
+        referenced = self.referenced_files()
+        # Files younger than file_min_age may belong to a row not committed yet
+        cutoff = (now or time.time()) - self.file_min_age.total_seconds()
+        removed = 0
+        with os.scandir(guest_dir) as entries:
+            for entry in entries:
+                if self._out_of_time(progress):
+                    break
+                if (not entry.is_file() or f"{GUEST_UPLOAD_DIR}/{entry.name}" in referenced
+                        or entry.stat().st_mtime > cutoff):
+                    continue
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                progress.add('upload_files', 1)
+                removed += 1
+                if removed % self.batch_size == 0:
+                    progress.batches += 1
+                    logger.info(f"[CLEANUP] Removed {removed} orphaned uploads so far")
+                    time.sleep(self.pause)
+
+    def run(self, now=None):
+        """Run every step once; returns the progress report, or None if a run is already going"""
+        if not self._running.acquire(blocking=False):
+            logger.info("[CLEANUP] Previous run still going, skipping")
+            return None
+        try:
+            progress = CleanupProgress()
+            self.delete_expired_exhibits(progress, now)
+            self.delete_stale_markers(progress, now)
+            self.delete_orphaned_uploads(progress)
+            report = progress.report()
+            report['finished'] = not self._out_of_time(progress)
+            logger.info(f"[CLEANUP] Done: {report}")
+            return report
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            self._running.release()
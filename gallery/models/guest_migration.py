@@ -0,0 +1,166 @@
+import logging
+from datetime import datetime
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from .base import db
+from .exhibit import Exhibit
+from .wall import Wall
+from .artwork import Artwork
+from .permanent_object import PermanentObject
+from .wall_line import SingleLine, Orientation
+
+logger = logging.getLogger(__name__)
+
+
+class GuestMigration(db.Model):
+    """
+    Marker for a guest session whose data has been copied to a user. It is
+    written in the same transaction as the data, so a retried or concurrent
+    sign-in callback for the same session cannot copy it twice.
+    """
+    __tablename__ = 'guest_migrations'
+
+    guest_session_id = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    exhibit_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def _allocate_ids(model, count):
+    """
+    Reserve `count` consecutive primary keys for explicit-id inserts. On
+    MySQL the locking read keeps concurrent inserts out of the range until
+    commit. SQLite ignores FOR UPDATE: there the transaction must already
+    hold the write lock, i.e. have begun under SQLiteMode.writing() (BEGIN
+    IMMEDIATE), as non-GET requests and migrate_guest_data in app.py do.
+    """
+    if not count:
+        return []
+    first = db.session.execute(
+        select(func.coalesce(func.max(model.id), 0)).with_for_update()
+    ).scalar_one() + 1
+    return list(range(first, first + count))
+
+
+def _number(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _artwork_row(artwork, user_id, exhibit_id, wall_id):
+    return {
+        'name': artwork.get('name') or 'Artwork',
+        'width': _number(artwork.get('width')),
+        'height': _number(artwork.get('height')),
+        'hanging_point': _number(artwork.get('hanging_point')),
+        'medium': artwork.get('medium', ''),
+        'depth': _number(artwork.get('depth')),
+        'price': _number(artwork.get('price')),
+        'nfs': bool(artwork.get('nfs', False)),
+        'notes': artwork.get('notes', ''),
+        'image_path': artwork.get('image_path', ''),
+        'x_position': artwork.get('x_position') if wall_id else None,
+        'y_position': artwork.get('y_position') if wall_id else None,
+        'exhibit_id': exhibit_id,
+        'wall_id': wall_id,
+        'user_id': user_id,
+    }
+
+
+def _object_row(obj, wall_id):
+    return {
+        'name': obj.get('name') or 'Object',
+        'width': _number(obj.get('width')),
+        'height': _number(obj.get('height')),
+        'x': _number(obj.get('x')),
+        'y': _number(obj.get('y')),
+        'image_path': obj.get('image_path'),
+        'wall_id': wall_id,
+    }
+
+
+def _line_row(line, wall_id):
+    return {
+        # Guest line ids are uuid4s; their hex form fits the 32-char key
+        'id': str(line['id']).replace('-', '')[:32],
+        'x_cord': _number(line.get('x_cord')),
+        'y_cord': _number(line.get('y_cord')),
+        'length': _number(line.get('length')),
+        'angle': _number(line.get('angle')),
+        'snap_to': bool(line.get('snap_to', True)),
+        'moveable': bool(line.get('moveable', True)),
+        'orientation': Orientation(line.get('orientation') or 'horizontal'),
+        'alignment': line.get('alignment') or 'center',
+        'distance': _number(line.get('distance')),
+        'wall_id': wall_id,
+    }
+
+
+def build_rows(tree, user_id, exhibit_ids, wall_ids):
+    """Turn a guest session tree into insert rows per table, using pre-allocated exhibit and wall ids"""
+    rows = {'exhibits': [], 'walls': [], 'artworks': [], 'permanent_objects': [], 'wall_lines': []}
+    exhibit_ids, wall_ids = iter(exhibit_ids), iter(wall_ids)
+    for exhibit in tree.get('exhibits', []):
+        exhibit_id = next(exhibit_ids)
+        rows['exhibits'].append({'id': exhibit_id, 'name': exhibit.get('name') or 'Untitled', 'user_id': user_id})
+        for wall in exhibit.get('walls', []):
+            wall_id = next(wall_ids)
+            rows['walls'].append({
+                'id': wall_id,
+                'name': wall.get('name') or 'Wall',
+                'width': _number(wall.get('width')),
+                'height': _number(wall.get('height')),
+                'color': wall.get('color') or 'White',
+                'exhibit_id': exhibit_id,
+                'user_id': user_id,
+            })
+            rows['artworks'] += [_artwork_row(a, user_id, exhibit_id, wall_id) for a in wall.get('artworks', [])]
+            rows['permanent_objects'] += [_object_row(o, wall_id) for o in wall.get('permanent_objects', [])]
+            rows['wall_lines'] += [_line_row(l, wall_id) for l in wall.get('wall_lines', [])]
+        rows['artworks'] += [_artwork_row(a, user_id, exhibit_id, None) for a in exhibit.get('artworks', [])]
+    return rows
+
+
+def migrate_guest_session(manager, session_id, user_id):
+    """
+    Copy a guest session from Redis to the database for `user_id` in one
+    transaction, one batched INSERT per table, then drop the guest session.
+    Returns the ids of the new exhibits; a session that was already migrated
+    returns [] without writing anything.
+    """
+    if db.session.get(GuestMigration, session_id):
+        logger.info(f"[DB] Guest session {session_id} was already migrated")
+        manager.delete_session(session_id)
+        return []
+
+    guest_data = manager.get_session(session_id)
+    if not guest_data:
+        return []
+    tree = guest_data.get('data', {})
+    exhibits = tree.get('exhibits', [])
+    wall_count = sum(len(exhibit.get('walls', [])) for exhibit in exhibits)
+
+    try:
+        # The marker goes first: a concurrent migration of the same session
+        # blocks on (or fails at) this insert instead of copying the data again
+        db.session.execute(insert(GuestMigration), [{
+            'guest_session_id': session_id, 'user_id': user_id, 'exhibit_count': len(exhibits)}])
+        rows = build_rows(tree, user_id, _allocate_ids(Exhibit, len(exhibits)), _allocate_ids(Wall, wall_count))
+        for model, key in ((Exhibit, 'exhibits'), (Wall, 'walls'), (Artwork, 'artworks'),
+                           (PermanentObject, 'permanent_objects'), (SingleLine, 'wall_lines')):
+            if rows[key]:
+                db.session.execute(insert(model), rows[key])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        if db.session.get(GuestMigration, session_id):
+            logger.info(f"[DB] Guest session {session_id} was migrated concurrently")
+            return []
+        raise
+
+    manager.delete_session(session_id)
+    logger.info(f"[DB] Migrated guest session {session_id} to user {user_id}: "
+                + ', '.join(f"{len(v)} {k}" for k, v in rows.items()))
+    return [row['id'] for row in rows['exhibits']]
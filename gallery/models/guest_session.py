@@ -0,0 +1,122 @@
+from typing import Any, Dict, Optional, Set, Tuple
+from .redis_manager import CHILD_COLLECTIONS
+
+EntityKey = Tuple[str, str]
+
+
+class GuestSession:
+    """
+    Indexed view over a guest session tree as returned by
+    RedisSessionManager.get_session.
+
+    Every exhibit, wall, artwork, permanent object and wall line is indexed by
+    (kind, id) once, so lookups, inserts and removals no longer scan the nested
+    lists. Changes are tracked per entity so saving only rewrites what changed.
+    """
+
+    def __init__(self, session_id: str, session_data: Dict[str, Any]):
+        self.session_id = session_id
+        self.session_data = session_data
+        self.data = session_data.setdefault('data', {})
+        # Session version this document was loaded at; saves fail if it moved on
+        self.version: int = session_data.get('version', 0)
+        self.dirty: Set[EntityKey] = set()
+        self.removed: Set[EntityKey] = set()
+        self._index: Dict[EntityKey, Dict[str, Any]] = {}
+        self._parents: Dict[EntityKey, EntityKey] = {}
+        self._index_entity('root', self.data, None)
+
+    @staticmethod
+    def _key(kind: str, entity_id: Any) -> EntityKey:
+        return (kind, str(entity_id))
+
+    def _index_entity(self, kind: str, entity: Dict[str, Any], parent: Optional[EntityKey]) -> EntityKey:
+        key = self._key(kind, entity.get('id'))
+        self._index[key] = entity
+        if parent is not None:
+            self._parents[key] = parent
+        for collection, child_kind in CHILD_COLLECTIONS.get(kind, {}).items():
+            for child in entity.get(collection) or []:
+                self._index_entity(child_kind, child, key)
+        return key
+
+    def _subtree(self, kind: str, entity: Dict[str, Any]):
+        yield self._key(kind, entity.get('id'))
+        for collection, child_kind in CHILD_COLLECTIONS.get(kind, {}).items():
+            for child in entity.get(collection) or []:
+                yield from self._subtree(child_kind, child)
+
+    @property
+    def exhibits(self) -> list:
+        return self.data.get('exhibits', [])
+
+    def get(self, kind: str, entity_id: Any, parent_kind: Optional[str] = None,
+            parent_id: Any = None) -> Optional[Dict[str, Any]]:
+        """Look up an entity, optionally requiring it to belong to the given parent"""
+        if entity_id is None:
+            return None
+        key = self._key(kind, entity_id)
+        if parent_kind is not None and self._parents.get(key) != self._key(parent_kind, parent_id):
+            return None
+        return self._index.get(key)
+
+    def parent(self, kind: str, entity_id: Any) -> Optional[EntityKey]:
+        """Return the (kind, id) of the entity's parent"""
+        return self._parents.get(self._key(kind, entity_id))
+
+    def exhibit(self, exhibit_id: Any) -> Optional[Dict[str, Any]]:
+        return self.get('exhibit', exhibit_id)
+
+    def wall(self, wall_id: Any, exhibit_id: Any = None) -> Optional[Dict[str, Any]]:
+        if exhibit_id is None:
+            return self.get('wall', wall_id)
+        return self.get('wall', wall_id, 'exhibit', exhibit_id)
+
+    def add(self, kind: str, entity: Dict[str, Any], parent_kind: str = 'root', parent_id: Any = None,
+            collection: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Insert an entity (with any children) under its parent"""
+        parent_key = self._key(parent_kind, parent_id)
+        parent = self._index.get(parent_key)
+        if parent is None:
+            return None
+        parent.setdefault(collection or f"{kind}s", []).append(entity)
+        self._index_entity(kind, entity, parent_key)
+        self.dirty.add(parent_key)
+        for key in self._subtree(kind, entity):
+            self.dirty.add(key)
+            self.removed.discard(key)
+        return entity
+
+    def remove(self, kind: str, entity_id: Any, collection: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Remove an entity and everything below it"""
+        key = self._key(kind, entity_id)
+        entity = self._index.get(key)
+        if entity is None:
+            return None
+        parent_key = self._parents.get(key)
+        if parent_key is not None:
+            siblings = self._index[parent_key].get(collection or f"{kind}s", [])
+            siblings[:] = [s for s in siblings if s is not entity]
+            self.dirty.add(parent_key)
+        for child_key in list(self._subtree(kind, entity)):
+            self._index.pop(child_key, None)
+            self._parents.pop(child_key, None)
+            self.dirty.discard(child_key)
+            self.removed.add(child_key)
+        return entity
+
+    def update(self, kind: str, entity_id: Any, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply changes to one entity in place"""
+        entity = self.get(kind, entity_id)
+        if entity is not None:
+            entity.update(changes)
+            self.touch(kind, entity_id)
+        return entity
+
+    def touch(self, kind: str, entity_id: Any):
+        """Mark an entity changed after mutating it directly"""
+        self.dirty.add(self._key(kind, entity_id))
+
+    def to_data(self) -> Dict[str, Any]:
+        """The nested session data, kept in sync with every change"""
+        return self.data
@@ -0,0 +1,324 @@
+import fnmatch
+import math
+import threading
+import time
+from datetime import timedelta
+
+import redis
+
+# In-process stand-in for the subset of the redis-py client that
+# RedisSessionManager uses, so guest code paths can run in tests and
+# benchmarks without a Redis server.
+#
+# It follows Redis semantics where the session code depends on them:
+#   - replies are bytes, as with decode_responses=False
+#   - keys expire lazily after EXPIRE / SET EX, and TTL reports -2 / -1 / seconds
+#   - every write to a key (including EXPIRE) invalidates a WATCH on it, so
+#     optimistic transactions fail with WatchError exactly like they would
+#   - MULTI/EXEC blocks run atomically with respect to other clients
+#   - using a command on a key of the wrong type raises ResponseError
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, float):
+        return repr(value).encode('utf-8')
+    if isinstance(value, int):
+        return str(value).encode('utf-8')
+    raise redis.DataError(f"Invalid input of type: {type(value).__name__!r}")
+
+
+def _seconds(value):
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    return int(value)
+
+
+class MemoryRedis:
+    """
+    A thread-safe in-memory Redis.
+
+    clock can be replaced (e.g. by a test) to move time forward without
+    waiting for keys to expire.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.connection_pool = None
+        self._data = {}
+        self._expires = {}
+        self._versions = {}
+        self._lock = threading.RLock()
+
+    # -- bookkeeping ---------------------------------------------------------
+
+    def _alive(self, key):
+        """Drop the key if it has expired; True if it still exists"""
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= self.clock():
+            del self._data[key]
+            del self._expires[key]
+            self._bump(key)
+        return key in self._data
+
+    def _bump(self, key):
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def _version(self, key):
+        with self._lock:
+            self._alive(key)
+            return self._versions.get(key, 0)
+
+    def _typed(self, key, kind):
+        """The value stored at key, None if missing, ResponseError if of another type"""
+        if not self._alive(key):
+            return None
+        value = self._data[key]
+        if not isinstance(value, kind):
+            raise redis.ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _hash(self, key, create=False):
+        value = self._typed(key, dict)
+        if value is None and create:
+            value = self._data[key] = {}
+        return value
+
+    def _drop_if_empty(self, key):
+        if key in self._data and not self._data[key]:
+            del self._data[key]
+            self._expires.pop(key, None)
+
+    # -- keys ----------------------------------------------------------------
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in map(_to_bytes, keys):
+                if self._alive(key):
+                    del self._data[key]
+                    self._expires.pop(key, None)
+                    self._bump(key)
+                    removed += 1
+            return removed
+
+    def exists(self, *keys):
+        with self._lock:
+            return sum(1 for key in map(_to_bytes, keys) if self._alive(key))
+
+    def expire(self, name, time):
+        with self._lock:
+            key = _to_bytes(name)
+            if not self._alive(key):
+                return False
+            self._expires[key] = self.clock() + _seconds(time)
+            self._bump(key)
+            return True
+
+    def ttl(self, name):
+        with self._lock:
+            key = _to_bytes(name)
+            if not self._alive(key):
+                return -2
+            deadline = self._expires.get(key)
+            if deadline is None:
+                return -1
+            return max(0, math.ceil(deadline - self.clock()))
+
+    def keys(self, pattern='*'):
+        with self._lock:
+            pattern = _to_bytes(pattern)
+            return [key for key in list(self._data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    def scan_iter(self, match=None, count=None):
+        yield from self.keys(match or '*')
+
+    def memory_usage(self, key):
+        """Rough estimate of the bytes Redis would use for the key (None if missing)"""
+        with self._lock:
+            key = _to_bytes(key)
+            if not self._alive(key):
+                return None
+            value = self._data[key]
+            size = 56 + len(key)
+            if isinstance(value, dict):
+                size += sum(16 + len(f) + len(v) for f, v in value.items())
+            else:
+                size += len(value)
+            return size
+
+    def flushall(self):
+        with self._lock:
+            for key in list(self._data):
+                self._bump(key)
+            self._data.clear()
+            self._expires.clear()
+            return True
+
+    # -- strings -------------------------------------------------------------
+
+    def get(self, name):
+        with self._lock:
+            return self._typed(_to_bytes(name), bytes)
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            key = _to_bytes(name)
+            if nx and self._alive(key):
+                return None
+            self._data[key] = _to_bytes(value)
+            if ex is not None:
+                self._expires[key] = self.clock() + _seconds(ex)
+            else:
+                self._expires.pop(key, None)
+            self._bump(key)
+            return True
+
+    # -- hashes --------------------------------------------------------------
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        with self._lock:
+            items = dict(mapping or {})
+            if key is not None:
+                items[key] = value
+            if not items:
+                raise redis.DataError("'hset' with no key value pairs")
+            name = _to_bytes(name)
+            fields = self._hash(name, create=True)
+            added = 0
+            for field, field_value in items.items():
+                field = _to_bytes(field)
+                added += field not in fields
+                fields[field] = _to_bytes(field_value)
+            self._bump(name)
+            return added
+
+    def hget(self, name, key):
+        with self._lock:
+            fields = self._hash(_to_bytes(name))
+            return fields.get(_to_bytes(key)) if fields else None
+
+    def hmget(self, name, keys, *args):
+        with self._lock:
+            keys = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+            fields = self._hash(_to_bytes(name)) or {}
+            return [fields.get(_to_bytes(key)) for key in keys + list(args)]
+
+    def hgetall(self, name):
+        with self._lock:
+            return dict(self._hash(_to_bytes(name)) or {})
+
+    def hkeys(self, name):
+        with self._lock:
+            return list(self._hash(_to_bytes(name)) or {})
+
+    def hlen(self, name):
+        with self._lock:
+            return len(self._hash(_to_bytes(name)) or {})
+
+    def hdel(self, name, *keys):
+        with self._lock:
+            name = _to_bytes(name)
+            fields = self._hash(name)
+            if not fields:
+                return 0
+            removed = sum(1 for key in map(_to_bytes, keys) if fields.pop(key, None) is not None)
+            if removed:
+                self._bump(name)
+                self._drop_if_empty(name)
+            return removed
+
+    def hincrby(self, name, key, amount=1):
+        with self._lock:
+            name = _to_bytes(name)
+            fields = self._hash(name, create=True)
+            field = _to_bytes(key)
+            try:
+                value = int(fields.get(field, b'0')) + amount
+            except ValueError:
+                raise redis.ResponseError("ERR hash value is not an integer")
+            fields[field] = _to_bytes(value)
+            self._bump(name)
+            return value
+
+    # -- transactions --------------------------------------------------------
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self, transaction)
+
+
+class MemoryPipeline:
+    """
+    Pipeline with redis-py semantics: after watch() commands run immediately
+    until multi(); after that (or without watch) they are queued and sent by
+    execute(). With transaction=True the queued commands run atomically and
+    fail with WatchError if a watched key changed.
+    """
+
+    def __init__(self, client, transaction=True):
+        self.client = client
+        self.transaction = transaction
+        self.reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def reset(self):
+        self._queue = []
+        self._watched = {}
+        self._immediate = False
+
+    def watch(self, *names):
+        for key in map(_to_bytes, names):
+            self._watched[key] = self.client._version(key)
+        self._immediate = True
+        return True
+
+    def unwatch(self):
+        self._watched = {}
+        return True
+
+    def multi(self):
+        self._immediate = False
+
+    def execute(self, raise_on_error=True):
+        queue, watched = self._queue, self._watched
+        try:
+            with self.client._lock:
+                if self.transaction and any(self.client._version(key) != version
+                                            for key, version in watched.items()):
+                    raise redis.WatchError("Watched variable changed.")
+                results = []
+                for name, args, kwargs in queue:
+                    try:
+                        results.append(getattr(self.client, name)(*args, **kwargs))
+                    except redis.ResponseError as e:
+                        results.append(e)
+        finally:
+            self.reset()
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, redis.ResponseError):
+                    raise result
+        return results
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+        if not callable(command) or name.startswith('_'):
+            raise AttributeError(name)
+
+        def queue_or_run(*args, **kwargs):
+            if self._immediate:
+                return command(*args, **kwargs)
+            self._queue.append((name, args, kwargs))
+            return self
+        return queue_or_run
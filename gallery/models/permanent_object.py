@@ -12,7 +12,7 @@ class PermanentObject(WallObject):
     x = db.Column(db.Float, default=0.0)
     y = db.Column(db.Float, default=0.0)
     image_path = db.Column(db.String(256))
-    wall_id = db.Column(db.Integer, db.ForeignKey('wall.id'))
+    wall_id = db.Column(db.Integer, db.ForeignKey('wall.id', ondelete='CASCADE'), index=True)
 
     def __init__(self, name: str, width: float, height: float, 
                  x: float = 0, y: float = 0, image_path: Optional[str] = None,
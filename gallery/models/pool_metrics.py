@@ -0,0 +1,121 @@
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """
+    Counters for one SQLAlchemy connection pool: how long checkouts wait,
+    how far the pool runs into overflow, and how old connections are when
+    they are handed out. Use pool_class() as the engine's poolclass and
+    attach() the engine to collect them.
+    """
+
+    def __init__(self, slow_checkout=0.05):
+        self.slow_checkout = slow_checkout  # seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.slow_checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.overflow_max = 0
+            self.checked_out_max = 0
+            self.connections_opened = 0
+            self.connections_closed = 0
+            self.connections_invalidated = 0
+            self.age_total = 0.0
+            self.age_max = 0.0
+
+    def pool_class(self, base=QueuePool):
+        """A pool class that times every checkout into these metrics"""
+        metrics = self
+
+        class MeteredPool(base):
+            def connect(self):
+                start = time.perf_counter()
+                try:
+                    connection = super().connect()
+                except exc.TimeoutError:
+                    metrics._record_timeout()
+                    raise
+                metrics._record_checkout(time.perf_counter() - start, self)
+                return connection
+
+        MeteredPool.__name__ = f"Metered{base.__name__}"
+        return MeteredPool
+
+    def attach(self, engine):
+        """Track connection lifetimes on the engine's pool"""
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'close', self._on_close)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+        return self
+
+    def _record_checkout(self, wait, pool):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            if wait >= self.slow_checkout:
+                self.slow_checkouts += 1
+            if hasattr(pool, 'overflow'):
+                self.overflow_max = max(self.overflow_max, pool.overflow())
+                self.checked_out_max = max(self.checked_out_max, pool.checkedout())
+
+    def _record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        connection_record.info['connected_at'] = time.monotonic()
+        with self._lock:
+            self.connections_opened += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        age = time.monotonic() - connection_record.info.get('connected_at', time.monotonic())
+        with self._lock:
+            self.age_total += age
+            self.age_max = max(self.age_max, age)
+
+    def _on_close(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connections_closed += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.connections_invalidated += 1
+
+    def snapshot(self, engine=None):
+        """Current counters, plus the live pool state if an engine is given"""
+        with self._lock:
+            checkouts = self.checkouts or 1
+            stats = {
+                'checkouts': self.checkouts,
+                'checkout_wait_avg_ms': self.wait_total / checkouts * 1000,
+                'checkout_wait_max_ms': self.wait_max * 1000,
+                'slow_checkouts': self.slow_checkouts,
+                'checkout_timeouts': self.timeouts,
+                'overflow_max': self.overflow_max,
+                'checked_out_max': self.checked_out_max,
+                'connections_opened': self.connections_opened,
+                'connections_closed': self.connections_closed,
+                'connections_invalidated': self.connections_invalidated,
+                'connection_age_avg_s': self.age_total / checkouts,
+                'connection_age_max_s': self.age_max,
+            }
+        pool = engine.pool if engine is not None else None
+        if pool is not None and hasattr(pool, 'overflow'):
+            stats.update({
+                'pool_size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+            })
+        return stats
@@ -1,10 +1,23 @@
 # project_exporter.py
 
+import io
 import json
+import multiprocessing
 import os
-import ast
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from datetime import datetime
+from enum import Enum
+from itertools import groupby, islice, zip_longest
+from operator import itemgetter
+from uuid import uuid4
+import numpy as np
 import pandas as pd
 import openpyxl
+import xlsxwriter
+from sqlalchemy import DateTime, insert, select
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.dimensions import SheetFormatProperties
@@ -13,10 +26,11 @@ from openpyxl.workbook.workbook import Workbook
 from gallery.models.wall import Wall
 from gallery.models.artwork import Artwork
 from gallery.models.permanent_object import PermanentObject
-from gallery.models.structures import Position
 from .wall_line import SingleLine
 from gallery.models.exhibit import Exhibit
 from gallery.models.wall_line import Orientation
+from gallery.models.base import db
+from gallery.models.guest_migration import _allocate_ids
 from typing import Dict
 
 
@@ -61,15 +75,134 @@ def import_project(filepath):
     print(f"[INFO] Project loaded from {filepath}")
     return project_data
     
-def _project_to_excel(filepath, wall=None, artworks=None, permanent_objects=None):
+# The _internal column of project workbooks: every object's column values as
+# a compact JSON array [format version, type tag, [values...]], positional by
+# the field list of that version. The field lists are frozen per version;
+# when a model gains or loses a column, add a version instead of editing one,
+# so older workbooks still read back.
+INTERNAL_FORMAT_VERSION = 1
+INTERNAL_SCHEMAS = {
+    1: {
+        'wall': (Wall, ('id', 'name', 'exhibit_id', 'user_id', 'width', 'height', 'color', 'version',
+                        'updated_at')),
+        'artwork': (Artwork, ('id', 'name', 'width', 'height', 'hanging_point', 'medium', 'depth', 'price',
+                              'nfs', 'notes', 'image_path', 'exhibit_id', 'x_position', 'y_position',
+                              'user_id', 'wall_id')),
+        'permanent': (PermanentObject, ('id', 'name', 'width', 'height', 'x', 'y', 'image_path', 'wall_id',
+                                        'x_position', 'y_position')),
+        'line': (SingleLine, ('id', 'x_cord', 'y_cord', 'length', 'angle', 'snap_to', 'moveable',
+                              'orientation', 'alignment', 'distance', 'wall_id')),
+    },
+}
+INTERNAL_TAGS = {model: tag for tag, (model, _) in INTERNAL_SCHEMAS[INTERNAL_FORMAT_VERSION].items()}
+
+
+class InternalFormatError(ValueError):
+    """An _internal value that is not in (a known version of) the format"""
+
+
+def _internal_converters(model, fields):
+    """(encode, decode) per field for the values JSON has no type for: enums and datetimes"""
+    converters = []
+    for field in fields:
+        column_type = model.__table__.columns[field].type
+        if getattr(column_type, 'enum_class', None) is not None:
+            enum_class = column_type.enum_class
+            converters.append((lambda v: v.name, lambda v, enum_class=enum_class: enum_class[v]))
+        elif isinstance(column_type, DateTime):
+            converters.append((datetime.isoformat, datetime.fromisoformat))
+        else:
+            converters.append(None)
+    return converters
+
+
+_CONVERTERS = {(version, tag): _internal_converters(model, fields)
+               for version, schemas in INTERNAL_SCHEMAS.items()
+               for tag, (model, fields) in schemas.items()}
+
+
+_INTERNAL_JSON = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+
+def encode_internal(obj) -> str:
+    """One Wall, Artwork, PermanentObject or SingleLine as an _internal value"""
+    tag = INTERNAL_TAGS[type(obj)]
+    _, fields = INTERNAL_SCHEMAS[INTERNAL_FORMAT_VERSION][tag]
+    values = []
+    for field, converter in zip(fields, _CONVERTERS[INTERNAL_FORMAT_VERSION, tag]):
+        value = getattr(obj, field)
+        values.append(converter[0](value) if converter and value is not None else value)
+    return _INTERNAL_JSON.encode([INTERNAL_FORMAT_VERSION, tag, values])
+
+
+def _parse_internal_cell(row_number, value):
+    try:
+        return json.loads(value)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise InternalFormatError(f"Row {row_number}: unreadable _internal value: {e}") from None
+
+
+def decode_internal_rows(values):
+    """
+    A column of _internal values (the cells below its header, so value i is
+    sheet row i + 2; empty cells are skipped) as (model, {column: value})
+    pairs, in order. The column is parsed by one json.loads when every cell
+    holds exactly one record; the dicts can go straight into an insert()
+    executemany.
     """
-    Export project data to Excel. Any of wall, artworks, or permanent_objects may be None.
+    cells = [(row_number, value) for row_number, value in enumerate(values, start=2) if value is not None]
+    try:
+        records = json.loads(f"[{','.join(value for _, value in cells)}]")
+    except (TypeError, json.JSONDecodeError):
+        records = None
+    if records is None or len(records) != len(cells):
+        # Find the cell at fault, one by one: unreadable, or holding several records
+        records = [_parse_internal_cell(row_number, value) for row_number, value in cells]
+
+    rows = []
+    for (row_number, _), record in zip(cells, records):
+        try:
+            version, tag, row = record
+            model, fields = INTERNAL_SCHEMAS[version][tag]
+        except (TypeError, ValueError, KeyError):
+            raise InternalFormatError(f"Row {row_number}: unknown _internal record: {str(record)[:80]}") from None
+        if len(row) != len(fields):
+            raise InternalFormatError(
+                f"Row {row_number}: {tag} record has {len(row)} values, version {version} has {len(fields)}")
+        for i, converter in enumerate(_CONVERTERS[version, tag]):
+            if converter and row[i] is not None:
+                row[i] = converter[1](row[i])
+        rows.append((model, dict(zip(fields, row))))
+    return rows
+
+
+def decode_internal(values):
+    """
+    A column of _internal values as model instances, in order. They are
+    made without calling __init__, so ids and every other column come back
+    exactly as stored.
+    """
+    objects = []
+    for model, row in decode_internal_rows(values):
+        obj = model.__mapper__.class_manager.new_instance()
+        for field, value in row.items():
+            setattr(obj, field, value)
+        objects.append(obj)
+    return objects
+
+
+def _project_to_excel(filepath, wall=None, artworks=None, permanent_objects=None, wall_lines=None):
+    """
+    Export project data to Excel. Any of wall, artworks, permanent_objects
+    or wall_lines may be None. Next to the readable columns, every row has
+    the object itself in _internal (see encode_internal).
 
     Args:
         filepath (str): Destination Excel path
         wall (Wall): Wall object
         artworks (list of Artwork): Artwork objects
         permanent_objects (list of PermanentObject): Permanent objects
+        wall_lines (list of SingleLine): Snap lines
     """
     def to_visible_wall_data(wall):
         return {
@@ -90,472 +223,559 @@ def _project_to_excel(filepath, wall=None, artworks=None, permanent_objects=None
             "NFS (Y/N)": "Y" if art.nfs else "N"
         }
 
-    def to_internal_data(obj):
-        try:
-            d = obj.export()
-        except AttributeError:
-            d = obj.__dict__
-        safe = {}
-        for k, v in d.items():
-            if isinstance(v, Position):
-                safe[k] = {"x": v.x, "y": v.y}
-            else:
-                safe[k] = v
-        return str(safe)
-
-    with pd.ExcelWriter(filepath, engine="openpyxl") as writer:
-        if wall:
-            wall_data = pd.DataFrame([to_visible_wall_data(wall)])
-            wall_data["_internal"] = to_internal_data(wall)
-            wall_data.to_excel(writer, sheet_name="Wall", index=False)
+    def to_visible_permanent_data(obj):
+        return {"Name": obj.name, "Width": obj.width, "Height": obj.height, "X": obj.x, "Y": obj.y}
 
-        if artwork:
-            artworks_data = pd.DataFrame([to_visible_artwork_data(a) for a in artwork])
-            artworks_data["_internal"] = [to_internal_data(a) for a in artwork]
-            artworks_data.to_excel(writer, sheet_name="Artworks", index=False)
+    def to_visible_line_data(line):
+        return {"Orientation": line.orientation.value, "Alignment": line.alignment, "Distance": line.distance,
+                "Length": line.length}
 
-        if permanent_objects:
-            perms_data = pd.DataFrame([p.__dict__ for p in permanent_objects])
-            perms_data["_internal"] = [to_internal_data(p) for p in permanent_objects]
-            perms_data.to_excel(writer, sheet_name="Permanents", index=False)
+    sheets = [
+        ("Wall", [wall] if wall else [], to_visible_wall_data),
+        ("Artworks", artworks or [], to_visible_artwork_data),
+        ("Permanents", permanent_objects or [], to_visible_permanent_data),
+        ("Lines", wall_lines or [], to_visible_line_data),
+    ]
+    with pd.ExcelWriter(filepath, engine="openpyxl") as writer:
+        for sheet_name, objects, to_visible in sheets:
+            if objects:
+                data = pd.DataFrame([to_visible(obj) for obj in objects])
+                data["_internal"] = [encode_internal(obj) for obj in objects]
+                data.to_excel(writer, sheet_name=sheet_name, index=False)
 
     print(f"[INFO] Project exported to Excel at {filepath}")
 
-    def to_internal_data(obj):
-        # PRepares the _internal data for export
-        safe = {}
-        for k, v in obj.__dict__.items():
-            if isinstance(v, Position):
-                safe[k] = {"x": v.x, "y": v.y}
-            else:
-                safe[k] = v
-        return str(safe)
-    # Store data in pandas dataframe
-    wall_data = pd.DataFrame([to_visible_wall_data(wall)])
-    wall_data["_internal"] = to_internal_data(wall)
-
-    artworks_data = pd.DataFrame([to_visible_artwork_data(a) for a in artwork])
-    artworks_data["_internal"] = [to_internal_data(a) for a in artwork]
-
-    perms_data = pd.DataFrame([p.__dict__ for p in permanent_objects])
-    perms_data["_internal"] = [to_internal_data(p) for p in permanent_objects]
-    # Write pandas dataframe to excel using openpyxl
-    with pd.ExcelWriter(filepath, engine="openpyxl") as writer:
-        wall_data.to_excel(writer, sheet_name="Wall", index=False)
-        artworks_data.to_excel(writer, sheet_name="Artworks", index=False)
-        perms_data.to_excel(writer, sheet_name="Permanents", index=False)
 
-    print(f"[INFO] Project exported to Excel at {filepath}")
+def _project_from_excel(filepath):
+    """
+    Read back what _project_to_excel wrote, from the _internal columns.
+    Returns {'wall': Wall or None, 'artworks': [...], 'permanent_objects':
+    [...], 'wall_lines': [...]}; the objects are not added to the session.
+    """
+    workbook = load_workbook(filepath, read_only=True)
+    project = {}
+    try:
+        for sheet_name, key in (("Wall", "wall"), ("Artworks", "artworks"),
+                                ("Permanents", "permanent_objects"), ("Lines", "wall_lines")):
+            if sheet_name not in workbook.sheetnames:
+                project[key] = []
+                continue
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            column = next(rows).index("_internal")
+            project[key] = decode_internal(row[column] for row in rows)
+    finally:
+        workbook.close()
+    project["wall"] = project["wall"][0] if project["wall"] else None
+    print(f"[INFO] Project imported from Excel at {filepath}")
+    return project
+
+
+# Columns of the per-wall sheets, in to_dict() order
+ARTWORK_COLUMNS = ('id', 'name', 'width', 'height', 'x_position', 'y_position', 'wall_id', 'medium',
+                   'depth', 'hanging_point', 'price', 'nfs', 'image_path', 'notes', 'user_id')
+LINE_COLUMNS = ('id', 'x_cord', 'y_cord', 'length', 'angle', 'snap_to', 'moveable', 'orientation',
+                'alignment', 'distance', 'wall_id')
+PERMANENT_COLUMNS = ('id', 'name', 'width', 'height', 'x', 'y', 'image_path', 'wall_id')
+# 'sheet' is the prefix of the wall's own sheets, see wall_sheet_names
+WALL_COLUMNS = ('name', 'width', 'height', 'color', 'sheet')
+
+# Rows fetched per round trip while streaming
+EXPORT_BATCH_SIZE = 1000
+# Smaller exhibits are not worth handing to a SheetPool
+PARALLEL_MIN_WALLS = 8
+
+# (sheet suffix, model, columns, placeholder for a wall without rows)
+WALL_SHEETS = (
+    (" - Art", Artwork, ARTWORK_COLUMNS, "No artworks"),
+    (" - Lines", SingleLine, LINE_COLUMNS, "No wall lines"),
+    (" - Perm", PermanentObject, PERMANENT_COLUMNS, "No permanent objects"),
+)
+
+# Excel refuses these in sheet names, and names over 31 characters
+INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+SHEET_NAME_LENGTH = 31
+SHEET_PREFIX_LENGTH = SHEET_NAME_LENGTH - max(len(suffix) for suffix, _, _, _ in WALL_SHEETS)
+
+
+def wall_sheet_names(names):
+    """
+    The prefix of each wall's sheets ("<prefix> - Art" and so on), for wall
+    names in order: the name without characters Excel forbids, cut so the
+    longest suffix still fits, and made unique (Excel ignores case when
+    comparing sheet names) by appending the wall's position.
+    """
+    prefixes, taken = [], set()
+    for position, name in enumerate(names, 1):
+        prefix = INVALID_SHEET_CHARS.sub('', str(name or '')).strip().strip("'")[:SHEET_PREFIX_LENGTH].rstrip()
+        prefix = prefix or "Wall"
+        tag = 0
+        while prefix.lower() in taken:
+            tag += 1
+            mark = f" ({position})" if tag == 1 else f" ({position}.{tag})"
+            prefix = f"{prefix[:SHEET_PREFIX_LENGTH - len(mark)].rstrip()}{mark}"
+        taken.add(prefix.lower())
+        prefixes.append(prefix)
+    return prefixes
+
+
+class SheetWriter:
+    """
+    Appends rows to an xlsxwriter worksheet and keeps track of column widths
+    as it goes, so nothing has to be read back to size the columns.
+    """
 
-    def import_exhibit_from_excel(filepath):
-        print(f"[INFO] Importing gallery from {filepath}")
-        xls = pd.ExcelFile(filepath)
-        exhibit = Exhibit(name="Imported Exhibit")
-    
-        walls = {}
-    
-        # Load wall metadata first
-        if "Walls" in xls.sheet_names:
-            df_walls = xls.parse("Walls")
-            for _, row in df_walls.iterrows():
-                name = row["name"]
-                width = float(row["width"])
-                height = float(row["height"])
-                color = row.get("color", "#FFFFFF")
-                walls[name] = Wall(name=name, width=width, height=height, color=color)
-        else:
-            print("[WARN] No 'Walls' sheet found. Walls will use default dimensions.")
-    
-        # Now process each wall's data
-        for sheet in xls.sheet_names:
-            print(f"[INFO] Reading sheet: {sheet}")
-            df = xls.parse(sheet)
-            if df.empty:
-                print(f"[WARN] Sheet '{sheet}' is empty, skipping.")
+    def __init__(self, worksheet, max_width=60):
+        self.worksheet = worksheet
+        self.row = 0
+        self.widths = {}
+        self.max_width = max_width
+
+    def append(self, values, cell_format=None):
+        for col, value in enumerate(values):
+            if isinstance(value, Enum):
+                value = value.value
+            if value is None:
                 continue
-    
-            if " - Art" in sheet:
-                wall_name = sheet.replace(" - Art", "")
-                if df.columns.tolist() == ["info"] and "No artworks" in df["info"].values:
-                    continue
-                if wall_name in walls:
-                    walls[wall_name].artwork = [Artwork.from_dict(row) for _, row in df.iterrows()]
-                    print(f"[OK] Loaded artworks for wall '{wall_name}'.")
-                else:
-                    print(f"[ERROR] Wall '{wall_name}' not found in Walls sheet.")
-    
-            elif " - Lines" in sheet:
-                wall_name = sheet.replace(" - Lines", "")
-                if df.columns.tolist() == ["info"] and "No wall lines" in df["info"].values:
-                    continue
-                if wall_name in walls:
-                    walls[wall_name].wall_lines = [SingleLine.from_dict(row) for _, row in df.iterrows()]
-                    print(f"[OK] Loaded wall lines for wall '{wall_name}'.")
-                else:
-                    print(f"[ERROR] Wall '{wall_name}' not found in Walls sheet.")
-    
-            elif " - Perm" in sheet:
-                wall_name = sheet.replace(" - Perm", "")
-                if df.columns.tolist() == ["info"] and "No permanent objects" in df["info"].values:
-                    continue
-                if wall_name in walls:
-                    walls[wall_name].permanent_objects = [PermanentObject.from_dict(row) for _, row in df.iterrows()]
-                    print(f"[OK] Loaded permanent objects for wall '{wall_name}'.")
-                else:
-                    print(f"[ERROR] Wall '{wall_name}' not found in Walls sheet.")
-    
-        exhibit.walls = list(walls.values())
-        print(f"[DONE] Imported exhibit with {len(exhibit.walls)} walls.")
-        return exhibit
-
-
-
-def export_exhibit_to_excel(filepath: str, exhibit: Exhibit):
-    print(f"[INFO] Exporting exhibit to {filepath}")
-    writer = pd.ExcelWriter(filepath, engine='xlsxwriter')
-
-    # Sheet: ExportInfo
-    pd.DataFrame([{"Export status": "Initialized"}]).to_excel(writer, index=False, sheet_name="ExportInfo")
-
-    # NEW Sheet: Walls
-    wall_rows = []
-    for wall in exhibit.walls:
-        wall_rows.append({
-            "name": wall.name,
-            "width": wall.width,
-            "height": wall.height,
-            "color": wall.color
-        })
-    pd.DataFrame(wall_rows).to_excel(writer, index=False, sheet_name="Walls")
-
-    # Export each wall's elements
-    for wall in exhibit.walls:
-        # Artwork
-        if wall.artwork:
-            def artwork_to_export_dict(artwork):
-                d = artwork.to_dict()
-                d["x"] = getattr(artwork.position, "x", None)
-                d["y"] = getattr(artwork.position, "y", None)
-                return d
-
-            pd.DataFrame([artwork_to_export_dict(a) for a in wall.artwork]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Art"
-            )
-        else:
-            pd.DataFrame([{"info": "No artworks"}]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Art"
-            )
-
-        # Wall Lines
-        if wall.wall_lines:
-            for line in wall.wall_lines:
-                print(line.to_dict())
-            pd.DataFrame([l.to_dict() for l in wall.wall_lines]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Lines"
-            )
-        else:
-            pd.DataFrame([{"info": "No wall lines"}]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Lines"
-            )
-
-        # Permanent Objects
-        if wall.permanent_objects:
-            pd.DataFrame([p.to_dict() for p in wall.permanent_objects]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Perm"
-            )
-        else:
-            pd.DataFrame([{"info": "No permanent objects"}]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Perm"
-            )
+            self.worksheet.write(self.row, col, value, cell_format)
+            self.widths[col] = max(self.widths.get(col, 0), len(str(value)))
+        self.row += 1
 
-    writer.close()
-    print("[DONE] Finished exporting exhibit.")
+    def skip(self):
+        self.row += 1
 
-def import_exhibit_from_excel(filepath: str) -> Exhibit:
-    print(f"[INFO] Importing exhibit from {filepath}")
-    wb: Workbook = openpyxl.load_workbook(filepath, data_only=True)
-    exhibit = Exhibitt("Imported exhibit")
-
-    wall_map: Dict[str, Wall] = {}  # name -> Wall object
-
-    # Step 1: Load walls from "Walls" sheet
-    if "Walls" in wb.sheetnames:
-        sheet: Worksheet = wb["Walls"]
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            name, width, height, color = row[:4]
-            if name:
-                wall = Wall(name=name, width=width, height=height, color=color)
-                exhibit.add_wall(wall)
-                wall_map[name] = wall
-                print(f"[INFO] Loaded wall: {name}")
-    else:
-        print("[ERROR] 'Walls' sheet not found.")
-        return exhibit
+    def merge(self, value, cell_format, columns):
+        """A title row spanning the first `columns` columns"""
+        self.worksheet.merge_range(self.row, 0, self.row, columns - 1, value, cell_format)
+        self.row += 1
 
-    # Step 2: Loop through each sheet and map to walls
-    for sheet_name in wb.sheetnames:
-        if sheet_name in ["Walls", "ExportInfo"]:
-            continue
+    def fit_columns(self):
+        # Column widths are only written out when the workbook closes
+        for col, width in self.widths.items():
+            self.worksheet.set_column(col, col, min((width + 2) * 1.2, self.max_width))
 
-        try:
-            if " - Art" in sheet_name:
-                wall_name = sheet_name.replace(" - Art", "")
-                wall = wall_map.get(wall_name)
-                if not wall:
-                    print(f"[WARN] Art sheet found for unknown wall '{wall_name}' — skipping")
-                    continue
-                sheet: Worksheet = wb[sheet_name]
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    name, width, height, hanging_point, medium, depth, image_path, nfs, notes, price, x, y = row[:12]
-                    if name:
-                        artwork = Artwork(name=name, width=width, height=height,
-                                          hanging_point=hanging_point,
-                                          medium=medium or "",
-                                          depth=depth or 0.0,
-                                          image_path=image_path if isinstance(image_path, str) else None,
-                                          nfs=(str(nfs).strip().upper() == "Y"))
-
-                        if isinstance(x, (int, float)) and isinstance(y, (int, float)):
-                            artwork.position = Position(x, y)
-
-                        wall.add_artwork(artwork)
-                print(f"[INFO] Imported artwork for wall '{wall_name}'")
-
-            elif " - Lines" in sheet_name:
-                wall_name = sheet_name.replace(" - Lines", "")
-                wall = wall_map.get(wall_name)
-                if not wall:
-                    print(f"[WARN] Line sheet found for unknown wall '{wall_name}' — skipping")
-                    continue
-                sheet: Worksheet = wb[sheet_name]
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    x_cord, y_cord, length, angle, snap_to, moveable, orientation, alignment, distance = row[:9]
-                    line_orientation: Orientation = Orientation.HORIZONTAL if orientation == "horizontal" else Orientation.VERTICAL
-                    if x_cord is not None and y_cord is not None:
-                        wall_line = SingleLine(distance=distance, orientation=line_orientation)
-                        wall.add_wall_line(wall_line)
-                        print(f"[DEBUG] Adding wall line to wall: {wall_line}")
-                print(f"[INFO] Imported wall lines for wall '{wall_name}'")
-
-            elif " - Perm" in sheet_name:
-                wall_name = sheet_name.replace(" - Perm", "")
-                wall = wall_map.get(wall_name)
-                if not wall:
-                    print(f"[WARN] Perm sheet found for unknown wall '{wall_name}' — skipping")
-                    continue
-                sheet: Worksheet = wb[sheet_name]
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    values = list(row)
-                    if len(values) < 5:
-                        print(f"[WARN] Skipping incomplete permanent object row: {values}")
-                        continue
-                
-                    name = values[0]
-                    
-                    # Try parsing (x, y) from a single string
-                    x = y = None
-                    if isinstance(values[2], str) and "(" in values[2] and "," in values[2]:
-                        try:
-                            coord_str = values[2].strip("() ")
-                            x_str, y_str = coord_str.split(",")
-                            x = float(x_str.strip())
-                            y = float(y_str.strip())
-                        except Exception as e:
-                            print(f"[ERROR] Could not parse position from '{values[2]}': {e}")
-                    else:
-                        x = values[1]
-                        y = values[2]
-                    
-                    width = float(values[3]) if values[3] is not None else None
-                    height = float(values[4]) if values[4] is not None else None
-                    image_path = values[5] if len(values) > 5 else None
-                
-                    if name and x is not None and y is not None:
-                        safe_image_path = image_path if isinstance(image_path, str) and image_path.strip() else None
-                        perm = PermanentObject(name=name, width=width, height=height, image_path=safe_image_path)
-                        perm.position = Position(x, y)
-                        wall.add_permanent_object(perm)
-
-                        print(f"[DEBUG] Adding permanent object to wall: {perm}")
-                    
-                print(f"[INFO] Imported permanent objects for wall '{wall_name}'")
-                print(f"[DEBUG] Total permanent objects: {len(wall.permanent_objects)}")
-
-
-        except Exception as e:
-            print(f"[ERROR] Failed to load sheet '{sheet_name}': {e}")
-
-    print(f"[DONE] Finished importing exhibit with {len(exhibit.walls)} walls.")
-    return exhibit
 
-def export_exhibit_to_excel(filepath: str, exhibit: Exhibit):
-    print(f"[INFO] Exporting exhibit to {filepath}")
-    writer = pd.ExcelWriter(filepath, engine='xlsxwriter')
-
-    # Sheet: ExportInfo
-    pd.DataFrame([{"Export status": "Initialized"}]).to_excel(writer, index=False, sheet_name="ExportInfo")
-
-    # Sheet: Walls
-    wall_rows = []
-    for wall in exhibit.walls:
-        wall_rows.append({
-            "name": wall.name,
-            "width": wall.width,
-            "height": wall.height,
-            "color": wall.color
-        })
-    pd.DataFrame(wall_rows).to_excel(writer, index=False, sheet_name="Walls")
-
-    # Export each wall's elements
-    for wall in exhibit.walls:
-        # Artwork
-        if hasattr(wall, "artwork") and wall.artwork:
-            pd.DataFrame([a.to_dict() for a in wall.artwork]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Art"
-            )
-        else:
-            pd.DataFrame([{"info": "No artworks"}]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Art"
-            )
-
-        # Wall Lines
-        if hasattr(wall, "wall_lines") and wall.wall_lines:
-            pd.DataFrame([l.to_dict() for l in wall.wall_lines]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Lines"
-            )
-        else:
-            pd.DataFrame([{"info": "No wall lines"}]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Lines"
-            )
-
-        # Permanent Objects
-        if hasattr(wall, "permanent_objects") and wall.permanent_objects:
-            pd.DataFrame([p.to_dict() for p in wall.permanent_objects]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Perm"
-            )
+def streaming_workbook(target):
+    """
+    An xlsxwriter workbook in constant-memory mode: every row is flushed to a
+    temporary file as soon as the next one starts, so memory stays flat
+    however large the exhibit is. Rows must be written top to bottom.
+    """
+    return xlsxwriter.Workbook(target, {'constant_memory': True})
+
+
+def stream_rows(statement, batch_size=EXPORT_BATCH_SIZE):
+    """Rows of a Core select, fetched batch_size at a time from a server-side cursor"""
+    result = db.session.execute(statement.execution_options(stream_results=True, yield_per=batch_size))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _header_format(workbook):
+    # Always the first format added, so it has the same style index in every
+    # workbook, including the ones render_wall_sheet builds
+    return workbook.add_format({'bold': True})
+
+
+def _fill_wall_sheet(sheet, header, columns, rows, placeholder):
+    """The column header and rows of a per-wall sheet, or its placeholder. Returns the row count"""
+    count = 0
+    for row in rows:
+        if not count:
+            sheet.append(columns, header)
+        sheet.append(row)
+        count += 1
+    if not count:
+        sheet.append(["info"], header)
+        sheet.append([placeholder])
+    sheet.fit_columns()
+    return count
+
+
+def _rows_per_wall(walls, rows):
+    """
+    (wall, rows) for every wall in order. rows are (wall_id, row) pairs
+    grouped by wall in the order of walls; each wall's rows have to be used
+    up before the next pair is taken.
+    """
+    groups = groupby(rows, key=itemgetter(0))
+    group = next(groups, None)
+    for wall in walls:
+        if group is not None and group[0] == wall[0]:
+            yield wall, (row for _, row in group[1])
+            group = next(groups, None)
         else:
-            pd.DataFrame([{"info": "No permanent objects"}]).to_excel(
-                writer, index=False, sheet_name=f"{wall.name} - Perm"
-            )
+            yield wall, ()
+
+
+def _write_skeleton(workbook, walls):
+    """
+    ExportInfo, Walls and the (still empty) three sheets per wall. walls is
+    a list of (wall_id, name, width, height, color). Returns the header
+    format and the per-wall sheets by (suffix, wall_id).
+    """
+    prefixes = wall_sheet_names(wall[1] for wall in walls)
+    header = _header_format(workbook)
+    info = SheetWriter(workbook.add_worksheet("ExportInfo"))
+    info.append(["Export status"], header)
+    info.append(["Complete"])
+    info.fit_columns()
+
+    wall_sheet = SheetWriter(workbook.add_worksheet("Walls"))
+    wall_sheet.append(WALL_COLUMNS, header)
+    for wall, prefix in zip(walls, prefixes):
+        wall_sheet.append((*wall[1:], prefix))
+    wall_sheet.fit_columns()
+
+    # Art, Lines, Perm per wall, as the exporter has always laid them out
+    sheets = {}
+    for wall, prefix in zip(walls, prefixes):
+        for suffix, _, _, _ in WALL_SHEETS:
+            sheets[suffix, wall[0]] = SheetWriter(workbook.add_worksheet(f"{prefix}{suffix}"))
+    return header, sheets
+
+
+def _write_exhibit_sheets(workbook, walls, rows_by_sheet, progress=None):
+    """
+    Fill the workbook one table at a time. rows_by_sheet maps each
+    WALL_SHEETS suffix to (wall_id, row) pairs grouped by wall. progress, if
+    given, is called with the number of rows of each sheet written.
+    """
+    header, sheets = _write_skeleton(workbook, walls)
+    for suffix, _, columns, placeholder in WALL_SHEETS:
+        for wall, rows in _rows_per_wall(walls, rows_by_sheet[suffix]):
+            count = _fill_wall_sheet(sheets[suffix, wall[0]], header, columns, rows, placeholder)
+            if progress and count:
+                progress(count)
+
+
+def _init_sheet_worker():
+    """Pool initializer: unpickling it loads this module before the first sheet arrives"""
+
+
+class SheetPool:
+    """
+    Worker processes for render_wall_sheet. They are started on first use,
+    with spawn rather than fork, so they never inherit the app's threads or
+    database connections.
+
+    Spawned workers import the parent's main script (as __mp_main__) before
+    taking work, so that script must keep its start-up under
+    `if __name__ == '__main__'`; run.py does.
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_sheet_worker)
+        return self._executor.submit(fn, *args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+def render_wall_sheet(columns, rows, placeholder):
+    """
+    The worksheet XML of one per-wall sheet, rendered on its own in a
+    SheetPool worker. Constant-memory workbooks write strings inline and
+    the header is the first format, so the part can be moved as it is into
+    the exhibit's workbook.
+    """
+    buffer = io.BytesIO()
+    workbook = streaming_workbook(buffer)
+    header = _header_format(workbook)
+    _fill_wall_sheet(SheetWriter(workbook.add_worksheet()), header, columns, rows, placeholder)
+    workbook.close()
+    with zipfile.ZipFile(buffer) as package:
+        return package.read('xl/worksheets/sheet1.xml')
+
 
-    writer.close()
+def _write_parallel(target, walls, rows_by_sheet, pool, progress=None):
+    """
+    Build the workbook with its per-wall sheets rendered by pool. The
+    skeleton (every sheet, the wall sheets empty) is written here; each
+    wall's rows are handed to a worker as plain tuples, and the rendered
+    parts replace the empty ones in the zip package as they come back.
+    """
+    skeleton = io.BytesIO()
+    workbook = streaming_workbook(skeleton)
+    _write_skeleton(workbook, walls)
+    workbook.close()
+    # Worksheet parts are numbered in creation order: ExportInfo, Walls,
+    # then the per-wall sheets
+    parts = {(suffix, wall[0]): f"xl/worksheets/sheet{3 + w * len(WALL_SHEETS) + s}.xml"
+             for w, wall in enumerate(walls) for s, (suffix, _, _, _) in enumerate(WALL_SHEETS)}
+    pending = {}
+
+    def collect(block):
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED if block else ALL_COMPLETED)
+        for future in finished:
+            part, count = pending.pop(future)
+            package.writestr(zipfile.ZipInfo(part, date_time), future.result(), zipfile.ZIP_DEFLATED)
+            if progress and count:
+                progress(count)
+
+    with zipfile.ZipFile(skeleton) as source, zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as package:
+        date_time = source.infolist()[0].date_time
+        replaced = set(parts.values())
+        for entry in source.infolist():
+            if entry.filename not in replaced:
+                package.writestr(zipfile.ZipInfo(entry.filename, entry.date_time), source.read(entry),
+                                 zipfile.ZIP_DEFLATED)
+
+        for suffix, _, columns, placeholder in WALL_SHEETS:
+            for wall, rows in _rows_per_wall(walls, rows_by_sheet[suffix]):
+                rows = [tuple(row) for row in rows]
+                pending[pool.submit(render_wall_sheet, columns, rows, placeholder)] = (parts[suffix, wall[0]], len(rows))
+                # Two sheets per worker in flight keep them busy; more would
+                # only hold rows in memory
+                if len(pending) >= 2 * pool.processes:
+                    collect(block=True)
+        while pending:
+            collect(block=False)
+
+
+def export_exhibit_to_excel(target, exhibit: Exhibit, progress=None, pool=None):
+    """
+    Write an exhibit to .xlsx at target (a path or a binary file object).
+    Rows are streamed from the database one table at a time straight into
+    a constant-memory workbook, so neither side holds the whole exhibit.
+    With a SheetPool and at least PARALLEL_MIN_WALLS walls, the per-wall
+    sheets are rendered in its worker processes instead.
+    """
+    print(f"[INFO] Exporting exhibit {exhibit.id} to {target}")
+    walls = db.session.execute(
+        select(Wall.id, Wall.name, Wall.width, Wall.height, Wall.color)
+        .where(Wall.exhibit_id == exhibit.id)
+        .order_by(Wall.id)
+    ).all()
+    wall_ids = select(Wall.id).where(Wall.exhibit_id == exhibit.id).scalar_subquery()
+
+    def wall_rows(model, columns):
+        statement = (select(model.wall_id, *[getattr(model, column) for column in columns])
+                     .where(model.wall_id.in_(wall_ids))
+                     .order_by(model.wall_id, model.id))
+        for row in stream_rows(statement):
+            yield row[0], row[1:]
+
+    rows_by_sheet = {suffix: wall_rows(model, columns) for suffix, model, columns, _ in WALL_SHEETS}
+    if pool is not None and len(walls) >= PARALLEL_MIN_WALLS:
+        _write_parallel(target, walls, rows_by_sheet, pool, progress)
+    else:
+        workbook = streaming_workbook(target)
+        _write_exhibit_sheets(workbook, walls, rows_by_sheet, progress)
+        workbook.close()
     print("[DONE] Finished exporting exhibit.")
 
-def import_exhibit_from_excel(filepath: str) -> Exhibit:
-    print(f"[INFO] Importing exhibit from {filepath}")
-    wb: Workbook = openpyxl.load_workbook(filepath, data_only=True)
-    exhibit = Exhibit(name="Imported Exhibit")
-
-    wall_map: Dict[str, Wall] = {}
-
-    # Step 1: Load walls from "Walls" sheet
-    if "Walls" in wb.sheetnames:
-        sheet: Worksheet = wb["Walls"]
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            name, width, height, color = row[:4]
-            if name:
-                wall = Wall(name=name, width=width, height=height, color=color)
-                exhibit.add_wall(wall.name, wall.width, wall.height, wall.color)
-                wall_map[name] = wall
-                print(f"[INFO] Loaded wall: {name}")
+
+def export_guest_exhibit_to_excel(target, exhibit: dict, progress=None):
+    """The same workbook for a guest exhibit dict from the Redis session"""
+    walls = [(wall.get('id'), wall.get('name'), wall.get('width'), wall.get('height'), wall.get('color'))
+             for wall in exhibit.get('walls', [])]
+    collections = {" - Art": 'artworks', " - Lines": 'wall_lines', " - Perm": 'permanent_objects'}
+
+    def wall_rows(suffix, columns):
+        for wall in exhibit.get('walls', []):
+            for item in wall.get(collections[suffix]) or []:
+                yield wall.get('id'), [item.get(column) for column in columns]
+
+    workbook = streaming_workbook(target)
+    _write_exhibit_sheets(workbook, walls, {
+        suffix: wall_rows(suffix, columns) for suffix, _, columns, _ in WALL_SHEETS
+    }, progress)
+    workbook.close()
+
+# Rows parsed, validated and inserted at a time while importing
+IMPORT_BATCH_SIZE = 5000
+# Validation messages kept per import
+MAX_IMPORT_ERRORS = 100
+
+REQUIRED = object()
+
+# Import specs: column -> (type, default); REQUIRED columns must have a value.
+# "size" is a float that may not be negative.
+WALL_IMPORT = {
+    'name': ('text', REQUIRED), 'width': ('size', REQUIRED), 'height': ('size', REQUIRED),
+    'color': ('text', 'White'),
+    # Not a Wall column: which sheets hold the wall's rows
+    'sheet': ('text', None),
+}
+ARTWORK_IMPORT = {
+    'name': ('text', REQUIRED), 'width': ('size', REQUIRED), 'height': ('size', REQUIRED),
+    'hanging_point': ('float', 0.0), 'medium': ('text', ''), 'depth': ('size', 0.0), 'price': ('size', 0.0),
+    'nfs': ('bool', False), 'notes': ('text', ''), 'image_path': ('text', None),
+    'x_position': ('float', None), 'y_position': ('float', None),
+}
+LINE_IMPORT = {
+    'x_cord': ('float', 0.0), 'y_cord': ('float', 0.0), 'length': ('size', 0.0), 'angle': ('float', 0.0),
+    'snap_to': ('bool', True), 'moveable': ('bool', True), 'orientation': ('orientation', Orientation.HORIZONTAL),
+    'alignment': ('text', 'center'), 'distance': ('float', 0.0),
+}
+PERMANENT_IMPORT = {
+    'name': ('text', REQUIRED), 'width': ('size', REQUIRED), 'height': ('size', REQUIRED),
+    'x': ('float', 0.0), 'y': ('float', 0.0), 'image_path': ('text', None),
+}
+SHEET_IMPORTS = {
+    " - Art": (Artwork, ARTWORK_IMPORT),
+    " - Lines": (SingleLine, LINE_IMPORT),
+    " - Perm": (PermanentObject, PERMANENT_IMPORT),
+}
+TRUE_VALUES = ['Y', 'YES', 'TRUE', '1', '1.0']
+
+
+class ExcelImportError(Exception):
+    """The workbook did not validate; errors holds (sheet, row, message) tuples"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        sheet, row, message = errors[0]
+        super().__init__(f"{len(errors)} invalid cells, first in '{sheet}' row {row}: {message}")
+
+
+def _typed_column(values, kind, default, max_length=None):
+    """
+    Convert one column of raw cell values at once. Returns (Python values,
+    boolean array of invalid cells).
+    """
+    raw = pd.Series(values, dtype=object)
+    missing = raw.isna() | (raw.astype(str).str.strip() == '')
+    if kind in ('float', 'size'):
+        parsed = pd.to_numeric(raw.where(~missing), errors='coerce')
+        bad = parsed.isna() & ~missing
+        if kind == 'size':
+            bad |= parsed < 0
+        out = parsed.astype(object).where(~missing, None if default is REQUIRED else default)
+    elif kind == 'bool':
+        parsed = raw.astype(str).str.strip().str.upper().isin(TRUE_VALUES)
+        bad = pd.Series(False, index=raw.index)
+        out = parsed.astype(object).where(~missing, default)
+    elif kind == 'orientation':
+        parsed = raw.astype(str).str.strip().str.lower().map({o.value: o for o in Orientation})
+        bad = parsed.isna() & ~missing
+        out = parsed.where(~missing, default)
     else:
-        print("[ERROR] 'Walls' sheet not found.")
-        return exhibit
+        text = raw.astype(str).str.strip()
+        bad = text.str.len() > max_length if max_length else pd.Series(False, index=raw.index)
+        out = text.astype(object).where(~missing, None if default is REQUIRED else default)
+    if default is REQUIRED:
+        bad |= missing
+    return out.tolist(), bad.to_numpy()
 
-    # Step 2: Loop through each sheet and map to walls
-    for sheet_name in wb.sheetnames:
-        if sheet_name in ["Walls", "ExportInfo"]:
-            continue
 
-        try:
-            if " - Art" in sheet_name:
-                wall_name = sheet_name.replace(" - Art", "")
-                wall = wall_map.get(wall_name)
-                if not wall:
-                    print(f"[WARN] Art sheet found for unknown wall '{wall_name}' — skipping")
-                    continue
-                sheet: Worksheet = wb[sheet_name]
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    name, width, height, hanging_point, medium, depth, image_path, nfs, notes, price, x, y = row[:12]
-                    if name:
-                        artwork = Artwork(name=name, width=width, height=height,
-                                          hanging_point=hanging_point,
-                                          medium=medium or "",
-                                          depth=depth or 0.0,
-                                          image_path=image_path if isinstance(image_path, str) else None,
-                                          nfs=(str(nfs).strip().upper() == "Y"))
-
-                        if isinstance(x, (int, float)) and isinstance(y, (int, float)):
-                            artwork.position = Position(x, y)
-
-                        wall.add_artwork(artwork)
-                print(f"[INFO] Imported artwork for wall '{wall_name}'")
-
-            elif " - Lines" in sheet_name:
-                wall_name = sheet_name.replace(" - Lines", "")
-                wall = wall_map.get(wall_name)
-                if not wall:
-                    print(f"[WARN] Line sheet found for unknown wall '{wall_name}' — skipping")
-                    continue
-                sheet: Worksheet = wb[sheet_name]
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    x_cord, y_cord, length, angle, snap_to, moveable, orientation, alignment, distance = row[:9]
-                    line_orientation: Orientation = Orientation.HORIZONTAL if orientation == "horizontal" else Orientation.VERTICAL
-                    if x_cord is not None and y_cord is not None:
-                        wall_line = SingleLine(distance=distance, orientation=line_orientation)
-                        wall.add_wall_line(wall_line)
-                        print(f"[DEBUG] Adding wall line to wall: {wall_line}")
-                print(f"[INFO] Imported wall lines for wall '{wall_name}'")
-
-            elif " - Perm" in sheet_name:
-                wall_name = sheet_name.replace(" - Perm", "")
-                wall = wall_map.get(wall_name)
-                if not wall:
-                    print(f"[WARN] Perm sheet found for unknown wall '{wall_name}' — skipping")
-                    continue
-                sheet: Worksheet = wb[sheet_name]
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    values = list(row)
-                    if len(values) < 5:
-                        print(f"[WARN] Skipping incomplete permanent object row: {values}")
-                        continue
-                
-                    name = values[0]
-                    
-                    # Try parsing (x, y) from a single string
-                    x = y = None
-                    if isinstance(values[2], str) and "(" in values[2] and "," in values[2]:
-                        try:
-                            coord_str = values[2].strip("() ")
-                            x_str, y_str = coord_str.split(",")
-                            x = float(x_str.strip())
-                            y = float(y_str.strip())
-                        except Exception as e:
-                            print(f"[ERROR] Could not parse position from '{values[2]}': {e}")
-                    else:
-                        x = values[1]
-                        y = values[2]
-                    
-                    width = float(values[3]) if values[3] is not None else None
-                    height = float(values[4]) if values[4] is not None else None
-                    image_path = values[5] if len(values) > 5 else None
-                
-                    if name and x is not None and y is not None:
-                        safe_image_path = image_path if isinstance(image_path, str) and image_path.strip() else None
-                        perm = PermanentObject(name=name, width=width, height=height, image_path=safe_image_path)
-                        perm.position = Position(x, y)
-                        wall.add_permanent_object(perm)
-
-                        print(f"[DEBUG] Adding permanent object to wall: {perm}")
-                    
-                print(f"[INFO] Imported permanent objects for wall '{wall_name}'")
-                print(f"[DEBUG] Total permanent objects: {len(wall.permanent_objects)}")
-
-
-        except Exception as e:
-            print(f"[ERROR] Failed to load sheet '{sheet_name}': {e}")
-
-    print(f"[DONE] Finished importing exhibit with {len(exhibit.walls)} walls.")
+def _parse_chunk(model, spec, header, rows, sheet_name, first_row, errors):
+    """
+    Transpose a chunk of sheet rows into columns, convert and validate each
+    column in one go and return insert records. Invalid cells are appended
+    to errors instead.
+    """
+    count = len(rows)
+    by_name = dict(zip(header, zip_longest(*rows))) if rows else {}
+    blank = np.array([all(cell is None for cell in row) for row in rows], dtype=bool)
+    columns, invalid = {}, blank.copy()
+    for column, (kind, default) in spec.items():
+        raw = by_name.get(column, (None,) * count)
+        length = getattr(model.__table__.c[column].type, 'length', None) if column in model.__table__.c else None
+        values, bad = _typed_column(raw, kind, default, length)
+        bad = bad & ~blank
+        for index in np.flatnonzero(bad)[:max(0, MAX_IMPORT_ERRORS - len(errors))]:
+            errors.append((sheet_name, first_row + int(index), f"invalid {column}: {raw[index]!r}"))
+        invalid |= bad
+        columns[column] = values
+    names = list(columns)
+    return [dict(zip(names, record)) for record, skip in zip(zip(*columns.values()), invalid) if not skip]
+
+
+def _sheet_chunks(sheet, batch_size):
+    """(header, rows, number of the first row) per chunk of a read-only worksheet"""
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(cell).strip() if cell is not None else None for cell in next(rows, ())]
+    row_number = 2
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return
+        yield header, chunk, row_number
+        row_number += len(chunk)
+
+
+def import_exhibit_from_excel(source, user_id=None, name=None, batch_size=IMPORT_BATCH_SIZE) -> Exhibit:
+    """
+    Import a workbook written by export_exhibit_to_excel (a path or a binary
+    file object) as a new exhibit and commit it.
+
+    The workbook is opened read-only, so openpyxl streams rows instead of
+    loading every cell. Each sheet is read batch_size rows at a time; a
+    batch is turned into columns, converted and validated column by column,
+    and inserted with one executemany per table. Nothing is committed if any
+    cell is invalid: ExcelImportError then lists the offending cells.
+    """
+    print(f"[INFO] Importing exhibit from {source}")
+    wb: Workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    errors, counts = [], {}
+    try:
+        if "Walls" not in wb.sheetnames:
+            raise ExcelImportError([("Walls", 1, "sheet not found")])
+
+        walls = []
+        for header, rows, first_row in _sheet_chunks(wb["Walls"], batch_size):
+            walls += _parse_chunk(Wall, WALL_IMPORT, header, rows, "Walls", first_row, errors)
+
+        exhibit = Exhibit(name=name or "Imported Exhibit", user_id=user_id)
+        db.session.add(exhibit)
+        db.session.flush()
+        wall_ids = {}
+        for wall, wall_id in zip(walls, _allocate_ids(Wall, len(walls))):
+            # Older workbooks have no sheet column; their sheets carry the wall name
+            wall_ids.setdefault(wall.pop('sheet') or wall['name'], wall_id)
+            wall.update(id=wall_id, exhibit_id=exhibit.id, user_id=user_id)
+        if walls:
+            db.session.execute(insert(Wall), walls)
+        counts['walls'] = len(walls)
+
+        for sheet_name in wb.sheetnames:
+            suffix = next((s for s in SHEET_IMPORTS if sheet_name.endswith(s)), None)
+            if suffix is None:
+                continue
+            model, spec = SHEET_IMPORTS[suffix]
+            wall_id = wall_ids.get(sheet_name[:-len(suffix)])
+            if wall_id is None:
+                errors.append((sheet_name, 1, "no wall with this sheet on the Walls sheet"))
+                continue
+            for header, rows, first_row in _sheet_chunks(wb[sheet_name], batch_size):
+                if header == ["info"]:
+                    # Placeholder sheet of a wall without rows
+                    break
+                records = _parse_chunk(model, spec, header, rows, sheet_name, first_row, errors)
+                for record in records:
+                    record['wall_id'] = wall_id
+                if model is Artwork:
+                    for record in records:
+                        record.update(exhibit_id=exhibit.id, user_id=user_id)
+                elif model is SingleLine:
+                    for record in records:
+                        record['id'] = uuid4().hex
+                if records and not errors:
+                    db.session.execute(insert(model), records)
+                counts[model.__tablename__] = counts.get(model.__tablename__, 0) + len(records)
+
+        if errors:
+            raise ExcelImportError(errors)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        wb.close()
+
+    print(f"[DONE] Imported exhibit {exhibit.id}: {counts}")
     return exhibit
 
 # All available methods    
@@ -563,5 +783,12 @@ __all__ = [
     "export_project",
     "import_project",
     "export_exhibit_to_excel",
-    "import_exhibit_from_excel"
+    "export_guest_exhibit_to_excel",
+    "SheetPool",
+    "import_exhibit_from_excel",
+    "ExcelImportError",
+    "encode_internal",
+    "decode_internal",
+    "decode_internal_rows",
+    "InternalFormatError",
 ]
@@ -0,0 +1,93 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import event
+
+# Literals are bound separately by SQLAlchemy, but IN lists expand into
+# numbered placeholders; fold them so the same query shape groups together
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)')
+
+
+def statement_shape(statement):
+    return _IN_LIST.sub('(...)', ' '.join(statement.split()))
+
+
+class QueryLog:
+    """Statements run while a QueryStats.collect() block was active"""
+
+    def __init__(self):
+        self.statements = []  # (sql, seconds)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def duration(self):
+        return sum(seconds for _, seconds in self.statements)
+
+    def repeated(self, threshold=5):
+        """Query shapes run at least `threshold` times: the usual sign of an N+1 lazy load"""
+        shapes = Counter(statement_shape(sql) for sql, _ in self.statements)
+        return {shape: n for shape, n in shapes.most_common() if n >= threshold}
+
+    def summary(self):
+        return f"{self.count} queries in {self.duration * 1000:.1f}ms"
+
+
+class QueryStats:
+    """
+    Counts and times the SQL statements an engine runs, per thread. Each
+    collect() block (one per request in the app) gets its own QueryLog;
+    blocks can nest, and every active one sees the statement.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+        event.listen(engine, 'handle_error', self._on_error)
+        return self
+
+    def _logs(self):
+        if not hasattr(self._local, 'logs'):
+            self._local.logs = []
+        return self._local.logs
+
+    def start(self):
+        log = QueryLog()
+        self._logs().append(log)
+        return log
+
+    def stop(self, log):
+        logs = self._logs()
+        if log in logs:
+            logs.remove(log)
+        return log
+
+    @contextmanager
+    def collect(self):
+        log = self.start()
+        try:
+            yield log
+        finally:
+            self.stop(log)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_query_started'].pop()
+        seconds = time.perf_counter() - started
+        for log in self._logs():
+            log.statements.append((statement, seconds))
+
+    def _on_error(self, context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get('_query_started') if context.connection is not None else None
+        if started:
+            started.pop()
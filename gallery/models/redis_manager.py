@@ -1,57 +1,588 @@
 import redis
 import json
+import threading
 import uuid
 from datetime import datetime, timedelta
+from .session_codec import SessionCodec
+
+# Guest sessions are stored entity-by-entity instead of as one JSON blob:
+#
+#   <session_id>:meta           hash    created_at (never rewritten)
+#   <session_id>:entities       hash    one field per entity ("root", "exhibit:<id>",
+#                                       "wall:<id>", "artwork:<id>", ...)
+#   <session_id>:last_activity  string  timestamp of the last read or write
+#
+# Parents keep the ids of their children (in order) instead of the children
+# themselves, so moving an artwork only rewrites the "artwork:<id>" field.
+#
+# The entity hash also carries a "version" counter that every write bumps.
+# Writers WATCH the entity hash, so concurrent read-modify-writes from two
+# tabs or workers are detected and the losing one is retried.
+#
+# All keys share the session TTL, which slides: writes refresh it, and reads
+# refresh it once it has run down by more than touch_interval. Reads never
+# refresh on every request, because EXPIRE on the watched entity hash would
+# make concurrent writers retry.
+#
+# Entity values are encoded by a SessionCodec (JSON, msgpack, optionally
+# compressed); the client works on raw bytes so binary values survive.
+VERSION_FIELD = 'version'
+
+# memory_report() runs MEMORY USAGE on every key of each sampled session
+MAX_MEMORY_SAMPLE = 1000
+
+CHILD_COLLECTIONS = {
+    'root': {'exhibits': 'exhibit'},
+    'exhibit': {'walls': 'wall', 'artworks': 'artwork'},
+    'wall': {
+        'artworks': 'artwork',
+        'permanent_objects': 'permanent_object',
+        'wall_lines': 'wall_line',
+    },
+}
+
+
+def entity_field(kind, entity_id=None):
+    """Name of the entity hash field holding one exhibit/wall/object"""
+    if kind == 'root':
+        return 'root'
+    return f"{kind}:{entity_id}"
+
+
+def flat_entity(kind, entity):
+    """Copy of one entity with its child collections replaced by id lists"""
+    flat = {}
+    for key, value in entity.items():
+        if key in CHILD_COLLECTIONS.get(kind, {}) and isinstance(value, list):
+            flat[key] = [str(child['id']) for child in value]
+        else:
+            flat[key] = value
+    return flat
+
+
+def flatten_entity(kind, entity, out=None):
+    """Split a nested entity into {field: flat_entity}, children replaced by id lists"""
+    out = {} if out is None else out
+    for key, child_kind in CHILD_COLLECTIONS.get(kind, {}).items():
+        children = entity.get(key)
+        if not isinstance(children, list):
+            continue
+        for child in children:
+            if child.get('id') is None:
+                child['id'] = str(uuid.uuid4())
+            flatten_entity(child_kind, child, out)
+    out[entity_field(kind, entity.get('id'))] = flat_entity(kind, entity)
+    return out
+
+
+def assemble_entity(kind, flat, entities):
+    """Rebuild the nested entity from its flat form and the entity map"""
+    entity = dict(flat)
+    for key, child_kind in CHILD_COLLECTIONS.get(kind, {}).items():
+        if key not in entity:
+            continue
+        children = []
+        for child_id in entity[key]:
+            child = entities.get(entity_field(child_kind, child_id))
+            if child is not None:
+                children.append(assemble_entity(child_kind, child, entities))
+        entity[key] = children
+    return entity
+
+
+def has_child(entity, collection, child_id):
+    """Whether a flat entity lists child_id in one of its child collections"""
+    return entity is not None and str(child_id) in entity.get(collection, [])
+
+
+def _text(value):
+    """Decode a bytes reply from the binary-safe client"""
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class SessionConflictError(Exception):
+    """A guest session write kept losing the race against concurrent writers"""
+
+
+class CountingConnectionPool(redis.BlockingConnectionPool):
+    """
+    A blocking pool that counts the connections it creates and hands out,
+    so pool_stats() needs none of redis-py's private pool attributes.
+    """
+
+    def reset(self):
+        # Also runs from __init__ and after a fork, when the counts start over
+        self._stats_lock = threading.Lock()
+        self._created = 0
+        self._checked_out = set()
+        super().reset()
+
+    def make_connection(self):
+        connection = super().make_connection()
+        with self._stats_lock:
+            self._created += 1
+        return connection
+
+    def get_connection(self, *args, **kwargs):
+        connection = super().get_connection(*args, **kwargs)
+        with self._stats_lock:
+            self._checked_out.add(id(connection))
+        return connection
+
+    def release(self, connection):
+        with self._stats_lock:
+            self._checked_out.discard(id(connection))
+        super().release(connection)
+
+    def counts(self):
+        """(connections created, connections checked out)"""
+        with self._stats_lock:
+            return self._created, len(self._checked_out)
+
 
 class RedisSessionManager:
-    def __init__(self, host='localhost', port=6379):
-        self.redis = redis.Redis(
-            host=host,
-            port=port,
-            decode_responses=True
-        )
-        self.session_ttl = timedelta(days=1)  # 24 hour expiration
-        
+    max_retries = 5
+
+    def __init__(self, host='localhost', port=6379, max_connections=20, pool_timeout=5,
+                 socket_timeout=2, socket_connect_timeout=2, health_check_interval=30,
+                 codec='json', min_compress_size=256, backend='redis'):
+        if backend == 'memory':
+            # In-process stand-in for tests, benchmarks and running without Redis
+            from .memory_redis import MemoryRedis
+            self.pool = None
+            self.redis = MemoryRedis()
+        elif backend == 'redis':
+            # A blocking pool makes request threads wait (up to pool_timeout) for a
+            # free connection instead of failing when every connection is busy.
+            self.pool = CountingConnectionPool(
+                host=host,
+                port=port,
+                max_connections=max_connections,
+                timeout=pool_timeout,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_connect_timeout,
+                health_check_interval=health_check_interval,
+                decode_responses=False
+            )
+            self.redis = redis.Redis(connection_pool=self.pool)
+        else:
+            raise ValueError(f"Unsupported Redis backend: {backend}")
+        self.backend = backend
+        self.codec = SessionCodec(codec, min_compress_size)
+        self.session_ttl = timedelta(days=1)  # 24 hour expiration, sliding
+        self.touch_interval = timedelta(minutes=5)  # how stale the TTL may get on reads
+
+    @classmethod
+    def from_config(cls, redis_config):
+        """Build a manager from the 'redis' section returned by load_config()"""
+        return cls(**redis_config)
+
+    def pool_stats(self):
+        """Connection pool utilization, for sizing against the worker count"""
+        if self.pool is None:
+            return {'backend': self.backend}
+        created, in_use = self.pool.counts()
+        return {
+            'max_connections': self.pool.max_connections,
+            'created': created,
+            'in_use': in_use,
+            'idle': created - in_use,
+            'utilization': in_use / self.pool.max_connections if self.pool.max_connections else 0.0
+        }
+
+    def session_memory(self, session_id):
+        """Redis memory and encoded payload size of one guest session"""
+        keys = [session_id, self._meta_key(session_id), self._entities_key(session_id),
+                self._last_activity_key(session_id)]
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.memory_usage(key)
+        pipe.hgetall(self._entities_key(session_id))
+        # MEMORY USAGE is not available everywhere (some managed Redis services)
+        *usage, raw = pipe.execute(raise_on_error=False)
+        usage = [u if isinstance(u, int) else None for u in usage]
+        raw = raw if isinstance(raw, dict) else {}
+        return {
+            'memory_bytes': sum(u for u in usage if u) if any(usage) else None,
+            'payload_bytes': sum(len(value) for value in raw.values()),
+            'entities': max(len(raw) - 1, 0),
+        }
+
+    def memory_report(self, sample=100):
+        """Per-session memory figures over (a sample of) the live guest sessions"""
+        sample = max(1, min(sample, MAX_MEMORY_SAMPLE))
+        sessions = {}
+        for key in self.redis.scan_iter(match='guest:*:entities', count=500):
+            session_id = _text(key)[:-len(':entities')]
+            sessions[session_id] = self.session_memory(session_id)
+            if len(sessions) >= sample:
+                break
+
+        def summary(field):
+            values = [s[field] for s in sessions.values() if s[field] is not None]
+            if not values:
+                return None
+            return {'avg': sum(values) / len(values), 'max': max(values), 'total': sum(values)}
+
+        return {
+            'codec': self.codec.name,
+            'sampled_sessions': len(sessions),
+            'memory_bytes': summary('memory_bytes'),
+            'payload_bytes': summary('payload_bytes'),
+            'entities': summary('entities'),
+        }
+
+    def guest_image_paths(self, batch=100):
+        """image_path of every artwork and permanent object in the live guest sessions"""
+        paths = set()
+        keys = self.redis.scan_iter(match='guest:*:entities', count=500)
+        while True:
+            chunk = [key for _, key in zip(range(batch), keys)]
+            if not chunk:
+                return paths
+            pipe = self.redis.pipeline(transaction=False)
+            for key in chunk:
+                pipe.hgetall(key)
+            for raw in pipe.execute():
+                for field, value in raw.items():
+                    if _text(field).startswith(('artwork:', 'permanent_object:')):
+                        image_path = self.codec.decode(value).get('image_path')
+                        if image_path:
+                            paths.add(image_path)
+
+    @staticmethod
+    def _is_guest(session_id):
+        return bool(session_id) and session_id.startswith('guest:')
+
+    @staticmethod
+    def _meta_key(session_id):
+        return f"{session_id}:meta"
+
+    @staticmethod
+    def _entities_key(session_id):
+        return f"{session_id}:entities"
+
+    @staticmethod
+    def _last_activity_key(session_id):
+        return f"{session_id}:last_activity"
+
+    def _queue_refresh(self, pipe, session_id):
+        """Queue the last_activity update and TTL refresh of every session key"""
+        pipe.set(self._last_activity_key(session_id), datetime.utcnow().isoformat(), ex=self.session_ttl)
+        pipe.expire(self._meta_key(session_id), self.session_ttl)
+        pipe.expire(self._entities_key(session_id), self.session_ttl)
+
+    def _touch(self, pipe, session_id):
+        """Queue the version bump and TTL refresh that go with every write"""
+        pipe.hincrby(self._entities_key(session_id), VERSION_FIELD, 1)
+        self._queue_refresh(pipe, session_id)
+
+    def _refresh_after_read(self, session_id, ttl):
+        """Slide the TTL after a read, once it has run down by touch_interval"""
+        if ttl is None or ttl < 0:
+            return
+        if ttl > (self.session_ttl - self.touch_interval).total_seconds():
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        self._queue_refresh(pipe, session_id)
+        pipe.execute()
+
+    def _queue_tree(self, pipe, session_id, data, version=0, created_at=None, drop_legacy=False):
+        """Queue replacing every entity of a session with the given tree"""
+        fields = {k: self.codec.encode(v) for k, v in flatten_entity('root', data).items()}
+        fields[VERSION_FIELD] = version
+        if drop_legacy:
+            pipe.delete(session_id)
+        if created_at:
+            pipe.hset(self._meta_key(session_id), 'created_at', created_at)
+        pipe.delete(self._entities_key(session_id))
+        pipe.hset(self._entities_key(session_id), mapping=fields)
+
+    def _queue_document(self, pipe, document):
+        """Queue the entities a GuestSession marked as changed or removed"""
+        fields = {}
+        for kind, entity_id in document.dirty:
+            entity = document.get(kind, entity_id)
+            if entity is not None:
+                fields[entity_field(kind, entity_id)] = self.codec.encode(flat_entity(kind, entity))
+        removed = [entity_field(kind, entity_id) for kind, entity_id in document.removed]
+        if fields:
+            pipe.hset(self._entities_key(document.session_id), mapping=fields)
+        if removed:
+            pipe.hdel(self._entities_key(document.session_id), *removed)
+
+    def _decode_entities(self, raw):
+        """Split a raw entity hash into (version, {field: flat_entity})"""
+        raw = {_text(field): value for field, value in raw.items()}
+        version = int(raw.pop(VERSION_FIELD, 0) or 0)
+        return version, {field: self.codec.decode(value) for field, value in raw.items()}
+
+    def _read_entities(self, client, session_id):
+        """Read and decode the entity hash (converting a legacy session first)"""
+        raw = client.hgetall(self._entities_key(session_id))
+        if not raw and self._load_legacy_session(session_id):
+            raw = client.hgetall(self._entities_key(session_id))
+        return self._decode_entities(raw)
+
+    def _optimistic(self, session_id, attempt):
+        """
+        Run a read-modify-write against a session with optimistic concurrency.
+
+        attempt(pipe) reads through the watched pipeline and returns
+        (result, write); write(pipe) queues the changes inside MULTI, or is None
+        when nothing has to be written. If another writer touches the session
+        in between, EXEC fails and attempt runs again on fresh data.
+        """
+        with self.redis.pipeline() as pipe:
+            for _ in range(self.max_retries):
+                try:
+                    pipe.watch(self._entities_key(session_id))
+                    result, write = attempt(pipe)
+                    if write is None:
+                        pipe.unwatch()
+                        return result
+                    pipe.multi()
+                    write(pipe)
+                    self._touch(pipe, session_id)
+                    pipe.execute()
+                    return result
+                except redis.WatchError:
+                    print(f"[REDIS] Write conflict on session {session_id}, retrying")
+        raise SessionConflictError(f"Too many concurrent writes to {session_id}")
+
     def create_guest_session(self, initial_data=None):
         """Create a new guest session"""
         session_id = f"guest:{uuid.uuid4()}"
-        session_data = {
-            'created_at': datetime.utcnow().isoformat(),
-            'last_activity': datetime.utcnow().isoformat(),
-            'data': initial_data or {}
-        }
-        self.redis.setex(
-            session_id,
-            self.session_ttl,
-            json.dumps(session_data))
+        pipe = self.redis.pipeline()
+        self._queue_tree(pipe, session_id, initial_data or {}, created_at=datetime.utcnow().isoformat())
+        self._touch(pipe, session_id)
+        pipe.execute()
         print(f"[REDIS] Created guest session: {session_id}")
         return session_id
-        
+
     def get_session(self, session_id):
-        """Get session data if it exists"""
-        if not session_id or not session_id.startswith('guest:'):
+        """Get session data if it exists, assembled into the full tree"""
+        if not self._is_guest(session_id):
             return None
-            
+
+        pipe = self.redis.pipeline()
+        pipe.hgetall(self._meta_key(session_id))
+        pipe.hgetall(self._entities_key(session_id))
+        pipe.get(self._last_activity_key(session_id))
+        pipe.ttl(self._entities_key(session_id))
+        meta, raw_entities, last_activity, ttl = pipe.execute()
+        if not raw_entities:
+            return self._load_legacy_session(session_id)
+
+        self._refresh_after_read(session_id, ttl)
+        meta = {_text(k): _text(v) for k, v in meta.items()}
+        version, entities = self._decode_entities(raw_entities)
+        return {
+            'created_at': meta.get('created_at'),
+            # Sessions written before the side key kept last_activity in meta
+            'last_activity': _text(last_activity) or meta.get('last_activity'),
+            'version': version,
+            'data': assemble_entity('root', entities.get('root', {}), entities)
+        }
+
+    def _load_legacy_session(self, session_id):
+        """Convert a pre-entity JSON blob session to the entity layout"""
         data = self.redis.get(session_id)
-        return json.loads(data) if data else None
-        
+        if not data:
+            return None
+        session_data = json.loads(data)
+        pipe = self.redis.pipeline()
+        self._queue_tree(pipe, session_id, session_data.get('data', {}),
+                         created_at=session_data.get('created_at'), drop_legacy=True)
+        self._touch(pipe, session_id)
+        pipe.execute()
+        print(f"[REDIS] Converted legacy guest session: {session_id}")
+        session_data['version'] = 1
+        return session_data
+
     def update_session(self, session_id, data):
-        """Update session data"""
-        if not session_id or not session_id.startswith('guest:'):
+        """Replace the whole session tree (prefer mutate or the per-entity methods below)"""
+        if not self._is_guest(session_id):
             return False
-            
-        session_data = {
-            'created_at': datetime.utcnow().isoformat(),
-            'last_activity': datetime.utcnow().isoformat(),
-            'data': data
-        }
+
+        def attempt(pipe):
+            version = int(pipe.hget(self._entities_key(session_id), VERSION_FIELD) or 0)
+            return True, lambda p: self._queue_tree(p, session_id, data, version=version)
+
         print(f"[REDIS] Updated session: {session_id} with data keys: {list(data.keys())}")
-        return self.redis.setex(
-            session_id,
-            self.session_ttl,
-            json.dumps(session_data))
-            
+        return self._optimistic(session_id, attempt)
+
+    def load_document(self, session_id):
+        """Load a session as an indexed GuestSession document"""
+        from .guest_session import GuestSession
+        session_data = self.get_session(session_id)
+        return GuestSession(session_id, session_data) if session_data else None
+
+    def save_document(self, document):
+        """
+        Write back only the entities a GuestSession marked as changed.
+
+        Fails with SessionConflictError if the session changed since the
+        document was loaded; use mutate() to get automatic retries instead.
+        """
+        if not self._is_guest(document.session_id):
+            return False
+
+        def attempt(pipe):
+            version = int(pipe.hget(self._entities_key(document.session_id), VERSION_FIELD) or 0)
+            if version != document.version:
+                raise SessionConflictError(
+                    f"Session {document.session_id} is at version {version}, document has {document.version}")
+            return version + 1, lambda p: self._queue_document(p, document)
+
+        document.version = self._optimistic(document.session_id, attempt)
+        document.dirty.clear()
+        document.removed.clear()
+        return True
+
+    def mutate(self, session_id, fn):
+        """
+        Load the session as a GuestSession, apply fn(document) and save the
+        entities it changed atomically. Returns whatever fn returns, or None if
+        the session does not exist.
+
+        fn must only change the document: it is run again on freshly loaded
+        data whenever a concurrent write wins the race.
+        """
+        from .guest_session import GuestSession
+        if not self._is_guest(session_id):
+            return None
+
+        def attempt(pipe):
+            version, entities = self._read_entities(pipe, session_id)
+            if not entities:
+                return None, None
+            document = GuestSession(session_id, {
+                'version': version,
+                'data': assemble_entity('root', entities.get('root', {}), entities)
+            })
+            result = fn(document)
+            if not document.dirty and not document.removed:
+                return result, None
+            return result, lambda p: self._queue_document(p, document)
+
+        return self._optimistic(session_id, attempt)
+
+    def session_version(self, session_id):
+        """The session's write counter without loading it, or None if there is none"""
+        if not self._is_guest(session_id):
+            return None
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hget(self._entities_key(session_id), VERSION_FIELD)
+        pipe.ttl(self._entities_key(session_id))
+        version, ttl = pipe.execute()
+        if version is None:
+            return None
+        self._refresh_after_read(session_id, ttl)
+        return int(version)
+
+    def get_entities(self, session_id, *refs):
+        """Fetch flat entities by (kind, id) in one round trip; missing ones are None"""
+        if not self._is_guest(session_id) or not refs:
+            return [None] * len(refs)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hmget(self._entities_key(session_id), [entity_field(kind, entity_id) for kind, entity_id in refs])
+        pipe.ttl(self._entities_key(session_id))
+        values, ttl = pipe.execute()
+        self._refresh_after_read(session_id, ttl)
+        return [self.codec.decode(value) if value else None for value in values]
+
+    def _fetch_entities(self, client, session_id, refs):
+        values = client.hmget(self._entities_key(session_id),
+                              [entity_field(kind, entity_id) for kind, entity_id in refs])
+        return [self.codec.decode(value) if value else None for value in values]
+
+    def mutate_entities(self, session_id, refs, fn):
+        """
+        Fetch flat entities by (kind, id), call fn(*entities) and write back the
+        {(kind, id): entity} mapping it returns, all under optimistic
+        concurrency. Returns the entities as fn last saw them.
+
+        Like mutate(), fn may run more than once.
+        """
+        if not self._is_guest(session_id):
+            return [None] * len(refs)
+
+        def attempt(pipe):
+            entities = self._fetch_entities(pipe, session_id, refs)
+            changes = fn(*entities)
+            if not changes:
+                return entities, None
+            return entities, lambda p: p.hset(self._entities_key(session_id), mapping={
+                entity_field(kind, entity_id): self.codec.encode(entity)
+                for (kind, entity_id), entity in changes.items()
+            })
+
+        return self._optimistic(session_id, attempt)
+
+    def update_entity(self, session_id, kind, entity_id, changes):
+        """Merge changes into one entity, rewriting only that entity's field"""
+        def merge(entity):
+            if entity is not None:
+                entity.update(changes)
+                return {(kind, entity_id): entity}
+
+        entity, = self.mutate_entities(session_id, [(kind, entity_id)], merge)
+        return entity
+
+    def add_entity(self, session_id, kind, entity, parent_kind='root', parent_id=None, collection=None):
+        """Store a new entity (and its children) and link it into its parent"""
+        collection = collection or f"{kind}s"
+        subtree = {field: self.codec.encode(value) for field, value in flatten_entity(kind, entity).items()}
+
+        def attempt(pipe):
+            parent, = self._fetch_entities(pipe, session_id, [(parent_kind, parent_id)])
+            if parent is None:
+                return None, None
+            if str(entity['id']) not in parent.setdefault(collection, []):
+                parent[collection].append(str(entity['id']))
+            fields = dict(subtree)
+            fields[entity_field(parent_kind, parent_id)] = self.codec.encode(parent)
+            return entity, lambda p: p.hset(self._entities_key(session_id), mapping=fields)
+
+        if not self._is_guest(session_id):
+            return None
+        return self._optimistic(session_id, attempt)
+
+    def remove_entity(self, session_id, kind, entity_id, parent_kind='root', parent_id=None, collection=None):
+        """Unlink an entity from its parent and delete it with all its children"""
+        if not self._is_guest(session_id):
+            return False
+        collection = collection or f"{kind}s"
+
+        def attempt(pipe):
+            parent, entity = self._fetch_entities(pipe, session_id, [(parent_kind, parent_id), (kind, entity_id)])
+            if parent is None or entity is None:
+                return False, None
+            parent[collection] = [cid for cid in parent.get(collection, []) if cid != str(entity_id)]
+
+            doomed = [entity_field(kind, entity_id)]
+            pending = [(kind, entity)]
+            while pending:
+                current_kind, current = pending.pop()
+                refs = [(child_kind, child_id)
+                        for key, child_kind in CHILD_COLLECTIONS.get(current_kind, {}).items()
+                        for child_id in current.get(key, [])]
+                if not refs:
+                    continue
+                doomed.extend(entity_field(*ref) for ref in refs)
+                children = self._fetch_entities(pipe, session_id, refs)
+                pending.extend((ref[0], child) for ref, child in zip(refs, children) if child)
+
+            def write(p):
+                p.hset(self._entities_key(session_id), entity_field(parent_kind, parent_id), self.codec.encode(parent))
+                p.hdel(self._entities_key(session_id), *doomed)
+            return True, write
+
+        return self._optimistic(session_id, attempt)
+
     def delete_session(self, session_id):
         """Delete a session"""
-        if session_id and session_id.startswith('guest:'):
-            self.redis.delete(session_id)
\ No newline at end of file
+        if self._is_guest(session_id):
+            self.redis.delete(session_id, self._meta_key(session_id), self._entities_key(session_id),
+                              self._last_activity_key(session_id))
@@ -0,0 +1,113 @@
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+# Every value written to Redis starts with a small header:
+#
+#   MAGIC (2 bytes) | HEADER_VERSION | serializer id | compression id | payload
+#
+# so the format can change without breaking sessions that are already stored.
+# Values without the header are plain JSON text from before the codec layer
+# and are still decoded as such.
+MAGIC = b'GS'
+HEADER_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+SERIALIZERS = {'json': 0, 'msgpack': 1}
+COMPRESSIONS = {'none': 0, 'zlib': 1, 'zstd': 2}
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(payload):
+    return json.loads(payload)
+
+
+def _msgpack_dumps(obj):
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def _msgpack_loads(payload):
+    if msgpack is None:
+        raise RuntimeError("Session value was written with msgpack, which is not installed")
+    return msgpack.unpackb(payload, raw=False)
+
+
+def _zstd_compress(payload):
+    return zstandard.ZstdCompressor(level=3).compress(payload)
+
+
+def _zstd_decompress(payload):
+    if zstandard is None:
+        raise RuntimeError("Session value was compressed with zstd, which is not installed")
+    return zstandard.ZstdDecompressor().decompress(payload)
+
+
+_DUMPS = {0: _json_dumps, 1: _msgpack_dumps}
+_LOADS = {0: _json_loads, 1: _msgpack_loads}
+_COMPRESS = {0: lambda payload: payload, 1: zlib.compress, 2: _zstd_compress}
+_DECOMPRESS = {0: lambda payload: payload, 1: zlib.decompress, 2: _zstd_decompress}
+
+
+def available_codecs():
+    """Codec names usable with the libraries installed in this environment"""
+    serializers = ['json'] + (['msgpack'] if msgpack is not None else [])
+    compressions = ['none', 'zlib'] + (['zstd'] if zstandard is not None else [])
+    return [s if c == 'none' else f"{s}+{c}" for s in serializers for c in compressions]
+
+
+class SessionCodec:
+    """
+    Encodes guest session values for Redis.
+
+    The name is "<serializer>[+<compression>]", e.g. "json", "msgpack",
+    "msgpack+zlib" or "msgpack+zstd". "auto" picks the most compact one that
+    is installed. Values shorter than min_compress_size are stored
+    uncompressed, since most single entities are too small to gain anything.
+    Decoding reads the header, so any codec can read values written by any
+    other (and legacy JSON text).
+    """
+
+    def __init__(self, name='json', min_compress_size=256):
+        if name == 'auto':
+            name = 'msgpack' if msgpack is not None else 'json'
+            name += '+zstd' if zstandard is not None else '+zlib'
+        serializer, _, compression = name.partition('+')
+        compression = compression or 'none'
+        if serializer not in SERIALIZERS or compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown session codec: {name}")
+        if name not in available_codecs():
+            raise RuntimeError(f"Session codec {name} needs a library that is not installed")
+        self.name = name
+        self.serializer = SERIALIZERS[serializer]
+        self.compression = COMPRESSIONS[compression]
+        self.min_compress_size = min_compress_size
+
+    def encode(self, obj):
+        payload = _DUMPS[self.serializer](obj)
+        compression = self.compression if len(payload) >= self.min_compress_size else 0
+        header = MAGIC + bytes((HEADER_VERSION, self.serializer, compression))
+        return header + _COMPRESS[compression](payload)
+
+    @staticmethod
+    def decode(value):
+        """Decode a value written by any codec, or a legacy JSON string"""
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        if not value.startswith(MAGIC):
+            return json.loads(value)
+        header_version, serializer, compression = value[len(MAGIC):HEADER_SIZE]
+        if header_version != HEADER_VERSION:
+            raise ValueError(f"Unsupported session value header version {header_version}")
+        return _LOADS[serializer](_DECOMPRESS[compression](value[HEADER_SIZE:]))
@@ -0,0 +1,100 @@
+import logging
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRAGMAS = {
+    # Readers no longer block the writer (and vice versa)
+    'journal_mode': 'WAL',
+    # With WAL, NORMAL only syncs at checkpoints; a power cut can lose the
+    # last commits but never corrupts the database
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # KiB, i.e. 64 MB of page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    # Wait for the write lock instead of failing with "database is locked"
+    'busy_timeout': 5000,  # ms
+    'temp_store': 'MEMORY',
+    # Off by default in SQLite; the ON DELETE CASCADE foreign keys rely on it
+    'foreign_keys': 'ON',
+}
+
+
+class SQLiteMode:
+    """
+    Production settings for a SQLite engine: WAL and tuned pragmas on every
+    new connection, plus serialized write transactions.
+
+    SQLite allows one writer at a time. A deferred transaction that reads
+    first and writes later cannot wait for the lock once another connection
+    has committed since its read; it fails at once with "database is locked",
+    whatever busy_timeout says. Transactions started while writing() is
+    active (the app marks every non-GET request) therefore begin with BEGIN
+    IMMEDIATE, taking the write lock up front. Within a process they also
+    queue on a lock, so threads hand over in order instead of each polling
+    SQLite's busy handler. Reads stay deferred and never wait.
+    """
+
+    def __init__(self, pragmas=None, serialize_writes=True):
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        self.serialize_writes = serialize_writes
+        self.lock_timeout = self.pragmas['busy_timeout'] / 1000
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+
+    def attach(self, engine):
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'begin', self._on_begin)
+        event.listen(engine, 'commit', self._on_end)
+        event.listen(engine, 'rollback', self._on_end)
+        # Safety net for connections returned without commit or rollback
+        event.listen(engine, 'checkin', self._on_checkin)
+        return self
+
+    def set_writing(self, writing):
+        """Mark this thread's upcoming transactions as write transactions"""
+        self._local.writing = writing
+
+    @contextmanager
+    def writing(self):
+        previous = getattr(self._local, 'writing', False)
+        self._local.writing = True
+        try:
+            yield
+        finally:
+            self._local.writing = previous
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        # Let the 'begin' listener issue BEGIN itself (pysqlite would emit a
+        # plain deferred BEGIN lazily before the first write)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in self.pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+        cursor.close()
+        if mode.lower() != str(self.pragmas['journal_mode']).lower():
+            logger.warning(f"[DB] SQLite journal_mode is {mode}, not {self.pragmas['journal_mode']}")
+
+    def _on_begin(self, conn):
+        if conn.get_execution_options().get('isolation_level') == 'AUTOCOMMIT':
+            return
+        if self.serialize_writes and getattr(self._local, 'writing', False):
+            if self._write_lock.acquire(timeout=self.lock_timeout):
+                conn.info['_holds_write_lock'] = True
+            statement = "BEGIN IMMEDIATE"
+        else:
+            statement = "BEGIN"
+        # Straight on the DBAPI connection, so it is not counted as a query
+        conn.connection.driver_connection.execute(statement)
+
+    def _release(self, info):
+        if info.pop('_holds_write_lock', False):
+            self._write_lock.release()
+
+    def _on_end(self, conn):
+        self._release(conn.info)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self._release(connection_record.info)
@@ -0,0 +1,64 @@
+from .redis_manager import SessionConflictError
+
+
+class GuestUnitOfWork:
+    """
+    Request-scoped access to one guest session.
+
+    The session is loaded from Redis at most once, on first use, and every
+    handler and helper in the request shares the same GuestSession. Changes
+    made through mutate() are applied to it straight away and written back
+    once by flush() at the end of the request.
+    """
+
+    def __init__(self, manager, session_id):
+        self.manager = manager
+        self.session_id = session_id
+        self._document = None
+        self._loaded = False
+        self._pending = []
+
+    @property
+    def document(self):
+        """The guest session as a GuestSession, or None if it has expired"""
+        if not self._loaded:
+            self._document = self.manager.load_document(self.session_id)
+            self._loaded = True
+        return self._document
+
+    def mutate(self, fn):
+        """
+        Apply fn(document) to the request's document and return its result,
+        or None if the session does not exist. fn may run again at flush time
+        if another request changed the session in between, so it must only
+        change the document.
+        """
+        document = self.document
+        if document is None:
+            return None
+        self._pending.append(fn)
+        return fn(document)
+
+    @property
+    def dirty(self):
+        document = self._document
+        return document is not None and bool(document.dirty or document.removed)
+
+    def flush(self):
+        """Write the changed entities back; replay the changes if the session moved on"""
+        if not self.dirty:
+            return False
+        pending, self._pending = self._pending, []
+        try:
+            return self.manager.save_document(self._document)
+        except SessionConflictError:
+            print(f"[REDIS] Session {self.session_id} changed during the request, replaying {len(pending)} change(s)")
+
+        def replay(document):
+            for fn in pending:
+                fn(document)
+            return True
+
+        self._document = None
+        self._loaded = False
+        return bool(self.manager.mutate(self.session_id, replay))
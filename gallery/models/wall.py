@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import List, Dict, Optional
+from datetime import datetime
 from .base import db
 
 class Wall(db.Model):
@@ -7,16 +8,23 @@ class Wall(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128))
-    exhibit_id = db.Column(db.Integer, db.ForeignKey('exhibits.id'))
+    exhibit_id = db.Column(db.Integer, db.ForeignKey('exhibits.id', ondelete='CASCADE'), index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     width = db.Column(db.Float)
     height = db.Column(db.Float)
     color = db.Column(db.String(32))
+    # Bumped whenever the wall or anything on it changes (see wall_scene.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Set by every UPDATE, including the version bumps
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationships
-    permanent_objects = db.relationship('PermanentObject', backref='wall', lazy=True, cascade='all, delete-orphan')
-    artworks = db.relationship('Artwork', backref='wall', lazy=True, cascade='all, delete-orphan')
-    snap_lines = db.relationship('SingleLine', backref='wall', lazy=True, cascade='all, delete-orphan')
+    # Relationships; deleting a wall leaves its contents to ON DELETE CASCADE
+    permanent_objects = db.relationship('PermanentObject', backref='wall', lazy=True, cascade='all, delete-orphan',
+                                        passive_deletes=True)
+    artworks = db.relationship('Artwork', backref='wall', lazy=True, cascade='all, delete-orphan',
+                               passive_deletes=True)
+    snap_lines = db.relationship('SingleLine', backref='wall', lazy=True, cascade='all, delete-orphan',
+                                 passive_deletes=True)
     
     def __init__(self, name: str, width: float, height: float, color: str = "White", exhibit_id: Optional[int] = None):
         self.name = name
@@ -58,6 +66,7 @@ class Wall(db.Model):
             "width": self.width,
             "height": self.height,
             "color": self.color,
+            "version": self.version,
         }
 
     def __repr__(self):
@@ -39,7 +39,7 @@ class SingleLine(db.Model):
     orientation = db.Column(db.Enum(Orientation), nullable=False)
     alignment = db.Column(db.String(20), nullable=False)  # Stores either Horizontal or Vertical alignment
     distance = db.Column(db.Float, nullable=False, default=0.0)
-    wall_id = db.Column(db.Integer, db.ForeignKey('wall.id'))
+    wall_id = db.Column(db.Integer, db.ForeignKey('wall.id', ondelete='CASCADE'), index=True)
 
     def __init__(
         self,
@@ -0,0 +1,115 @@
+import json
+from sqlalchemy import event, inspect, update
+from .base import db
+from .wall import Wall
+from .artwork import Artwork
+from .permanent_object import PermanentObject
+from .wall_line import SingleLine
+
+# A wall scene is everything the editor draws for one wall: the wall itself,
+# the artworks hanging on it, its permanent objects and its snap lines.
+#
+# Walls carry a version that goes up with every change to the wall or to
+# anything on it, so (wall id, version) names one scene exactly: it is the
+# cache key and the ETag. The version is bumped in before_flush, which covers
+# every route that changes the scene through the ORM.
+WALL_ITEMS = (Artwork, PermanentObject, SingleLine)
+
+
+def _wall_ids(obj):
+    """Walls an artwork/object/line was on before this flush and is on now"""
+    ids = {obj.wall_id}
+    history = inspect(obj).attrs.wall_id.history
+    ids.update(history.deleted or ())
+    return ids
+
+
+@event.listens_for(db.session, 'before_flush')
+def bump_wall_versions(session, flush_context, instances):
+    changed = set()
+    for obj in session.new:
+        if isinstance(obj, WALL_ITEMS):
+            changed.add(obj.wall_id)
+    for obj in session.deleted:
+        if isinstance(obj, WALL_ITEMS):
+            changed |= _wall_ids(obj)
+    for obj in session.dirty:
+        if isinstance(obj, (Wall,) + WALL_ITEMS) and session.is_modified(obj, include_collections=False):
+            changed |= {obj.id} if isinstance(obj, Wall) else _wall_ids(obj)
+    changed.discard(None)
+    if not changed:
+        return
+
+    loaded = []
+    for wall_id in changed:
+        wall = session.identity_map.get(inspect(Wall).identity_key_from_primary_key((wall_id,)))
+        if wall is not None and wall not in session.deleted:
+            # Becomes part of this flush's UPDATE, and is reloaded afterwards
+            wall.version = Wall.version + 1
+            loaded.append(wall_id)
+    rest = changed.difference(loaded)
+    if rest:
+        session.connection().execute(
+            update(Wall.__table__).where(Wall.__table__.c.id.in_(rest)).values(version=Wall.__table__.c.version + 1))
+
+
+def scene_document(wall):
+    """The scene of a database Wall (load its collections up front)"""
+    return {
+        'wall': wall.to_dict(),
+        'version': wall.version,
+        'artworks': [artwork.to_dict() for artwork in wall.artworks],
+        'permanent_objects': [obj.to_dict() for obj in wall.permanent_objects],
+        'wall_lines': [line.to_dict() for line in wall.snap_lines],
+    }
+
+
+def guest_scene_document(wall):
+    """The scene of a guest wall dict from the Redis session"""
+    return {
+        'wall': {key: wall.get(key) for key in ('id', 'name', 'width', 'height', 'color')},
+        'artworks': wall.get('artworks', []),
+        'permanent_objects': wall.get('permanent_objects', []),
+        'wall_lines': wall.get('wall_lines', []),
+    }
+
+
+def encode_scene(scene):
+    return json.dumps(scene, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def scene_etag(wall_id, version):
+    return f"wall-{wall_id}-v{version}"
+
+
+def guest_scene_etag(wall_id, session_version):
+    # Guest walls have no version of their own; the session's write counter
+    # covers them, at the cost of a 200 when another wall of the session changed
+    return f"guest-{wall_id}-s{session_version}"
+
+
+class WallSceneCache:
+    """Encoded scenes in Redis, keyed by wall id and version"""
+
+    def __init__(self, redis_client, ttl=3600):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(wall_id, version):
+        return f"wall_scene:{wall_id}:{version}"
+
+    def get(self, wall_id, version):
+        body = self.redis.get(self._key(wall_id, version))
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    def put(self, wall_id, version, body):
+        # Older versions are never read again and simply expire
+        self.redis.set(self._key(wall_id, version), body, ex=self.ttl)
+        return body
@@ -1,5 +1,52 @@
 import os
 import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# App tests run against the in-process Redis stand-in, a throwaway database and export cache
+os.environ.setdefault('REDIS_BACKEND', 'memory')
+os.environ.setdefault('SQLITE_PATH', os.path.join(tempfile.mkdtemp(), 'test.db'))
+os.environ.setdefault('EXPORT_CACHE_DIR', tempfile.mkdtemp())
+
+
+@pytest.fixture
+def gallery_app():
+    """The Flask app module, with CSRF off and an empty session store"""
+    import app as gallery_app
+    gallery_app.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    gallery_app.redis_manager.redis.flushall()
+    return gallery_app
+
+
+@pytest.fixture
+def client(gallery_app):
+    with gallery_app.app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def query_budget(gallery_app):
+    """
+    Fail the test if a block runs more than `limit` SQL statements, or runs
+    one query shape `repeated` times or more (an N+1 lazy load):
+
+        with query_budget(6):
+            client.get('/editor')
+    """
+    @contextmanager
+    def budget(limit, repeated=5):
+        with gallery_app.query_stats.collect() as log:
+            yield log
+        if log.count > limit:
+            pytest.fail(f"Query budget exceeded: {log.summary()}, budget {limit}\n"
+                        + "\n".join(sql for sql, _ in log.statements))
+        suspects = log.repeated(repeated) if repeated else {}
+        if suspects:
+            pytest.fail("Possible N+1 queries:\n"
+                        + "\n".join(f"{n}x {shape}" for shape, n in suspects.items()))
+    return budget
@@ -0,0 +1,76 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models.permanent_object import PermanentObject
+from gallery.models.wall_line import SingleLine
+
+
+@pytest.fixture
+def big_wall(gallery_app, client):
+    """A logged-in user's exhibit with one wall holding 40 artworks, 5 fixtures and 5 snap lines"""
+    with gallery_app.app.app_context():
+        user = User(name='Ada')
+        db.session.add(user)
+        db.session.flush()
+        exhibit = Exhibit(name='Show', user_id=user.id)
+        db.session.add(exhibit)
+        db.session.flush()
+        wall = Wall(name='North', width=400, height=300, exhibit_id=exhibit.id)
+        db.session.add(wall)
+        db.session.flush()
+        db.session.add_all(
+            [Artwork(name=f'A{i}', width=10, height=10, wall_id=wall.id, user_id=user.id) for i in range(40)]
+            + [PermanentObject(name=f'P{i}', width=10, height=10, wall_id=wall.id) for i in range(5)]
+            + [SingleLine(x=wall.id, y=i, length=400, wall_id=wall.id) for i in range(5)])
+        unplaced = Artwork(name='Loose', width=10, height=10, user_id=user.id)
+        unplaced.exhibit_id = exhibit.id
+        db.session.add(unplaced)
+        db.session.commit()
+        ids = {'user': user.id, 'exhibit': exhibit.id, 'wall': wall.id}
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = ids['user']
+    return ids
+
+
+def remaining(wall_id):
+    return (Artwork.query.filter_by(wall_id=wall_id).count()
+            + PermanentObject.query.filter_by(wall_id=wall_id).count()
+            + SingleLine.query.filter_by(wall_id=wall_id).count())
+
+
+def test_delete_wall_is_one_delete(gallery_app, client, big_wall, query_budget):
+    with query_budget(4) as log:
+        response = client.post(f"/delete-wall/{big_wall['wall']}")
+    assert response.status_code == 302
+    assert [sql for sql, _ in log.statements if sql.startswith('DELETE')] == ['DELETE FROM wall WHERE wall.id = ?']
+    with gallery_app.app.app_context():
+        assert db.session.get(Wall, big_wall['wall']) is None
+        assert remaining(big_wall['wall']) == 0
+
+
+def test_delete_wall_of_another_user(gallery_app, client, big_wall):
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = big_wall['user'] + 1000
+    assert client.post(f"/delete-wall/{big_wall['wall']}").status_code == 404
+
+
+def test_delete_exhibit_cascades(gallery_app, big_wall):
+    with gallery_app.app.app_context():
+        db.session.delete(db.session.get(Exhibit, big_wall['exhibit']))
+        db.session.commit()
+        assert db.session.get(Wall, big_wall['wall']) is None
+        assert remaining(big_wall['wall']) == 0
+        assert Artwork.query.filter_by(name='Loose', user_id=big_wall['user']).count() == 0
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
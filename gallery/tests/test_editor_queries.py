@@ -0,0 +1,90 @@
+import pytest
+import sys
+import os
+from sqlalchemy import event
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+
+
+def make_exhibit(user, name, hanging, unplaced):
+    exhibit = Exhibit(name=name, user_id=user.id)
+    db.session.add(exhibit)
+    db.session.flush()
+    wall = Wall(name=f'{name} wall', width=400, height=300, exhibit_id=exhibit.id)
+    db.session.add(wall)
+    db.session.flush()
+    for i in range(hanging):
+        db.session.add(Artwork(name=f'{name} hanging {i}', width=10, height=10, wall_id=wall.id, user_id=user.id))
+    for i in range(unplaced):
+        artwork = Artwork(name=f'{name} unplaced {i}', width=10, height=10, user_id=user.id)
+        artwork.exhibit_id = exhibit.id
+        db.session.add(artwork)
+    return exhibit, wall
+
+
+@pytest.fixture
+def editor_client(gallery_app, client):
+    """Log in a user and select a wall holding `hanging` artworks"""
+    def login(hanging):
+        with gallery_app.app.app_context():
+            user, other = User(name='Ada'), User(name='Grace')
+            db.session.add_all([user, other])
+            db.session.flush()
+            exhibit, wall = make_exhibit(user, f'Show{hanging}', hanging, 2)
+            make_exhibit(user, f'Other show{hanging}', 2, 2)
+            make_exhibit(other, f'Someone else{hanging}', 2, 2)
+            db.session.commit()
+            ids = (user.id, exhibit.id, wall.id)
+        with client.session_transaction() as flask_session:
+            flask_session['user_id'], flask_session['current_exhibit_id'], flask_session['current_wall_id'] = ids
+        return client
+    return login
+
+
+def count_statements(gallery_app, fn):
+    statements = []
+    with gallery_app.app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    return response, statements
+
+
+def test_editor_only_shows_own_exhibit(gallery_app, editor_client):
+    client = editor_client(3)
+    response, _ = count_statements(gallery_app, lambda: client.get('/editor'))
+    page = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'Show3 hanging 2' in page and 'Show3 unplaced 1' in page
+    assert 'Other show3 unplaced' not in page
+    assert 'Someone else3' not in page
+
+
+def test_editor_statement_count_does_not_grow(gallery_app, editor_client):
+    """Loading the editor costs the same number of statements for 3 or 30 artworks"""
+    client = editor_client(3)
+    _, small = count_statements(gallery_app, lambda: client.get('/editor'))
+    client = editor_client(30)
+    _, large = count_statements(gallery_app, lambda: client.get('/editor'))
+    assert len(small) == len(large) <= 8
+
+
+def test_artwork_manual_lists_own_unplaced(gallery_app, editor_client):
+    page = editor_client(1).get('/artwork-manual').get_data(as_text=True)
+    assert 'Show1 unplaced 0' in page and 'Show1 hanging 0' in page
+    assert 'Other show1 unplaced' not in page and 'Someone else1' not in page
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,165 @@
+import io
+import pytest
+import subprocess
+import sys
+import os
+import textwrap
+import openpyxl
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models.permanent_object import PermanentObject
+from gallery.models.wall_line import SingleLine
+from gallery.models.project_exporter import export_exhibit_to_excel, SheetPool, PARALLEL_MIN_WALLS
+
+
+@pytest.fixture
+def exhibit_id(gallery_app, client):
+    """A logged-in user's exhibit: wall 0 holds three artworks, a door and a snap line, wall 1 is empty"""
+    with gallery_app.app.app_context():
+        user = User(name='Ada')
+        db.session.add(user)
+        db.session.flush()
+        exhibit = Exhibit(name='Spring Show', user_id=user.id)
+        db.session.add(exhibit)
+        db.session.flush()
+        walls = [Wall(name=f'Wall {i}', width=400, height=300, exhibit_id=exhibit.id) for i in range(2)]
+        db.session.add_all(walls)
+        db.session.flush()
+        db.session.add_all([Artwork(name=f'Piece {i}', width=10 + i, height=20, medium='Oil',
+                                    wall_id=walls[0].id, user_id=user.id) for i in range(3)])
+        db.session.add(PermanentObject(name='Door', width=36, height=80, x=5, y=0, wall_id=walls[0].id))
+        db.session.add(SingleLine(x=walls[0].id, y=60, length=400, distance=60, wall_id=walls[0].id))
+        unplaced = Artwork(name='Loose sketch', width=5, height=5, user_id=user.id)
+        unplaced.exhibit_id = exhibit.id
+        db.session.add(unplaced)
+        db.session.commit()
+        user_id, exhibit_id = user.id, exhibit.id
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_id
+    return exhibit_id
+
+
+def rows(sheet):
+    return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+
+def test_export_route_streams_workbook(client, exhibit_id, query_budget):
+    # Exhibit, content hash, walls and one streamed query per sheet type, however big the exhibit
+    with query_budget(6):
+        response = client.get(f'/export-exhibit?exhibit_id={exhibit_id}')
+        body = response.get_data()
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename=Spring_Show.xlsx'
+    assert int(response.headers['Content-Length']) == len(body)
+
+    workbook = openpyxl.load_workbook(io.BytesIO(body), read_only=True)
+    assert workbook.sheetnames == ['ExportInfo', 'Walls',
+                                   'Wall 0 - Art', 'Wall 0 - Lines', 'Wall 0 - Perm',
+                                   'Wall 1 - Art', 'Wall 1 - Lines', 'Wall 1 - Perm']
+    assert rows(workbook['Walls'])[1:] == [['Wall 0', 400, 300, 'White', 'Wall 0'],
+                                            ['Wall 1', 400, 300, 'White', 'Wall 1']]
+    art = rows(workbook['Wall 0 - Art'])
+    assert art[0][:4] == ['id', 'name', 'width', 'height']
+    assert [row[1] for row in art[1:]] == ['Piece 0', 'Piece 1', 'Piece 2']
+    assert rows(workbook['Wall 0 - Lines'])[1][7] == 'horizontal'
+    assert rows(workbook['Wall 0 - Perm'])[1][1] == 'Door'
+    assert rows(workbook['Wall 1 - Art']) == [['info'], ['No artworks']]
+
+
+def test_export_route_checks_ownership(client, exhibit_id):
+    assert client.get(f'/export-exhibit?exhibit_id={exhibit_id + 1}').status_code == 404
+
+
+def test_exhibit_report(gallery_app, exhibit_id, tmp_path):
+    with gallery_app.app.app_context():
+        path = db.session.get(Exhibit, exhibit_id).export_to_excel(str(tmp_path / 'report.xlsx'))
+    sheet = openpyxl.load_workbook(path)['Artworks']
+    first_cells = [row[:2] for row in sheet.iter_rows(values_only=True)]
+    titles, names = [row[0] for row in first_cells], [row[1] for row in first_cells]
+    assert titles.index('Spring Show') < names.index('Piece 0') < titles.index('Unplaced Artwork') < names.index('Loose sketch')
+    assert sheet.column_dimensions['B'].width > 10
+
+
+def test_guest_export(client):
+    client.get('/guest')
+    client.post('/new-exhibit', data={'exhibit_name': 'Guest show'})
+    client.post('/create-wall', data={'wall_name': 'East', 'wall_width': 300, 'wall_height': 200})
+    response = client.get('/export-exhibit')
+    assert response.status_code == 200
+    workbook = openpyxl.load_workbook(io.BytesIO(response.get_data()), read_only=True)
+    assert rows(workbook['Walls'])[1][:3] == ['East', 300, 200]
+    assert rows(workbook['East - Art']) == [['info'], ['No artworks']]
+
+
+def test_parallel_export_matches_serial(gallery_app, tmp_path):
+    with gallery_app.app.app_context():
+        exhibit = Exhibit(name='Big Show')
+        db.session.add(exhibit)
+        db.session.flush()
+        walls = [Wall(name=f'Big {i}', width=500, height=300, exhibit_id=exhibit.id)
+                 for i in range(PARALLEL_MIN_WALLS + 1)]
+        db.session.add_all(walls)
+        db.session.flush()
+        # Every third wall left without artworks, so placeholders land between rendered sheets
+        db.session.add_all([Artwork(name=f'Work {i}', width=10, height=10, medium='Ink', wall_id=wall.id)
+                            for wall in walls if wall.id % 3 for i in range(50)])
+        db.session.add(SingleLine(x=walls[1].id, y=90, length=500, distance=90, wall_id=walls[1].id))
+        db.session.add(PermanentObject(name='Vent', width=20, height=20, x=0, y=0, wall_id=walls[-1].id))
+        db.session.commit()
+        expected_rows = 50 * sum(1 for wall in walls if wall.id % 3) + 2
+
+        progress = []
+        pool = SheetPool(2)
+        try:
+            export_exhibit_to_excel(str(tmp_path / 'parallel.xlsx'), exhibit, progress.append, pool)
+        finally:
+            pool.shutdown()
+        export_exhibit_to_excel(str(tmp_path / 'serial.xlsx'), exhibit)
+
+    parallel = openpyxl.load_workbook(tmp_path / 'parallel.xlsx')
+    serial = openpyxl.load_workbook(tmp_path / 'serial.xlsx')
+    assert parallel.sheetnames == serial.sheetnames
+    for name in serial.sheetnames:
+        assert rows(parallel[name]) == rows(serial[name])
+        assert parallel[name]['A1'].font.b == serial[name]['A1'].font.b
+    assert sum(progress) == expected_rows
+
+
+def test_sheet_workers_do_not_rerun_app_start_up(tmp_path):
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    # Like run.py: a main script that keeps the app start-up under its __main__ guard
+    script = tmp_path / 'serve.py'
+    script.write_text(textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {root!r})
+
+        if __name__ == '__main__':
+            import app
+            from gallery.models.project_exporter import SheetPool
+            pool = SheetPool(1)
+            loaded = "[name in __import__('sys').modules for name in ('app', 'gallery.models.project_exporter')]"
+            print(pool.submit(eval, loaded).result())
+            pool.shutdown()
+    """))
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    # The initializer loaded the exporter; nothing loaded the app
+    assert result.stdout.strip().splitlines()[-1] == '[False, True]'
+
+    # run.py itself, imported again the way a spawned worker imports the main script
+    check = (f"import runpy, sys; sys.path.insert(0, {root!r}); "
+             f"runpy.run_path({os.path.join(root, 'run.py')!r}, run_name='__mp_main__'); print('app' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'False'
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
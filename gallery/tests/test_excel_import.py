@@ -0,0 +1,138 @@
+import io
+import pytest
+import sys
+import os
+import xlsxwriter
+from sqlalchemy import func, select
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models.permanent_object import PermanentObject
+from gallery.models.wall_line import SingleLine, Orientation
+from gallery.models.project_exporter import (import_exhibit_from_excel, ExcelImportError, wall_sheet_names,
+                                             export_exhibit_to_excel)
+
+
+def workbook(sheets):
+    """An .xlsx in memory from {sheet name: [header, *rows]}"""
+    buffer = io.BytesIO()
+    book = xlsxwriter.Workbook(buffer)
+    for name, rows in sheets.items():
+        sheet = book.add_worksheet(name)
+        for r, row in enumerate(rows):
+            for c, value in enumerate(row):
+                if value is not None:
+                    sheet.write(r, c, value)
+    book.close()
+    buffer.seek(0)
+    return buffer
+
+
+def catalog(artworks=3):
+    return {
+        'Walls': [['name', 'width', 'height', 'color'], ['North', 400, 300, 'Grey'], ['South', 200, 150, None]],
+        'North - Art': [['id', 'name', 'width', 'height', 'x_position', 'y_position', 'medium', 'nfs', 'price']]
+                       + [[i, f'Piece {i}', 10 + i, 20, 5 * i, 100, 'Oil', 'Y' if i % 2 else 'N', '250']
+                          for i in range(artworks)],
+        'North - Lines': [['x_cord', 'y_cord', 'orientation', 'alignment', 'distance'], [0, 60, 'vertical', 'left', 60]],
+        'North - Perm': [['name', 'width', 'height', 'x', 'y'], ['Door', 36, 80, 5, 0]],
+        'South - Art': [['info'], ['No artworks']],
+    }
+
+
+@pytest.fixture
+def user_id(gallery_app):
+    with gallery_app.app.app_context():
+        user = User(name='Ada')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def test_import_catalog(gallery_app, user_id):
+    with gallery_app.app.app_context():
+        exhibit_id = import_exhibit_from_excel(workbook(catalog()), user_id=user_id, name='Catalog').id
+        walls = {w.name: w for w in Wall.query.filter_by(exhibit_id=exhibit_id)}
+        assert set(walls) == {'North', 'South'} and walls['South'].color == 'White'
+        pieces = Artwork.query.filter_by(wall_id=walls['North'].id).order_by(Artwork.name).all()
+        assert [(a.name, a.width, a.nfs, a.price, a.x_position) for a in pieces] == [
+            ('Piece 0', 10, False, 250, 0), ('Piece 1', 11, True, 250, 5), ('Piece 2', 12, False, 250, 10)]
+        assert all(a.exhibit_id == exhibit_id and a.user_id == user_id and a.hanging_point == 0 for a in pieces)
+        line = SingleLine.query.filter_by(wall_id=walls['North'].id).one()
+        assert (line.orientation, line.alignment, line.distance) == (Orientation.VERTICAL, 'left', 60)
+        assert PermanentObject.query.filter_by(wall_id=walls['North'].id).one().name == 'Door'
+
+
+def test_import_inserts_in_batches(gallery_app, user_id, query_budget):
+    with gallery_app.app.app_context():
+        # Exhibit, wall id allocation, walls, then one INSERT per 50 artworks
+        with query_budget(3 + 4 + 2 + 2):
+            import_exhibit_from_excel(workbook(catalog(artworks=200)), user_id=user_id, batch_size=50)
+
+
+def test_invalid_cells_import_nothing(gallery_app, user_id):
+    sheets = catalog()
+    sheets['North - Art'][2][2] = 'wide'    # width of row 3
+    sheets['North - Art'][3][1] = None      # name of row 4
+    sheets['North - Lines'][1][2] = 'diagonal'
+    with gallery_app.app.app_context():
+        before = db.session.scalar(select(func.count(Exhibit.id)))
+        with pytest.raises(ExcelImportError) as error:
+            import_exhibit_from_excel(workbook(sheets), user_id=user_id)
+        assert sorted(error.value.errors) == [
+            ('North - Art', 3, "invalid width: 'wide'"),
+            ('North - Art', 4, 'invalid name: None'),
+            ('North - Lines', 2, "invalid orientation: 'diagonal'"),
+        ]
+        assert db.session.scalar(select(func.count(Exhibit.id))) == before
+
+
+def test_import_route_round_trip(client, gallery_app, user_id):
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_id
+    response = client.post('/import-exhibit', data={'file': (workbook(catalog()), 'Spring.xlsx')},
+                           content_type='multipart/form-data')
+    exhibit_id = response.get_json()['exhibit_id']
+    exported = client.get(f'/export-exhibit?exhibit_id={exhibit_id}').get_data()
+
+    response = client.post('/import-exhibit', data={'file': (io.BytesIO(exported), 'Copy.xlsx')},
+                           content_type='multipart/form-data')
+    assert response.get_json()['success']
+    with gallery_app.app.app_context():
+        copy = db.session.get(Exhibit, response.get_json()['exhibit_id'])
+        assert copy.name == 'Copy'
+        assert sorted(a.name for w in copy.walls for a in w.artworks) == ['Piece 0', 'Piece 1', 'Piece 2']
+
+
+def test_wall_sheet_names():
+    long_name = 'Main Entrance Feature Wall'
+    assert wall_sheet_names([long_name, 'a/b: [c]*?', 'North', 'north', long_name, None]) == [
+        'Main Entrance Feature W', 'ab c', 'North', 'north (4)', 'Main Entrance Featu (5)', 'Wall']
+    assert all(len(f"{prefix} - Lines") <= 31 for prefix in wall_sheet_names(['x' * 40, 'x' * 40]))
+
+
+def test_round_trip_keeps_walls_with_awkward_names(gallery_app, user_id):
+    names = ['Main Entrance Feature Wall', 'Main Entrance Feature Wall', 'East: [old] wing']
+    sheets = {'Walls': [['name', 'width', 'height', 'color', 'sheet']]
+              + [[name, 100 + i, 50, 'White', f'W{i}'] for i, name in enumerate(names)]}
+    for i in range(len(names)):
+        sheets[f'W{i} - Art'] = [['name', 'width', 'height'], [f'Piece {i}', 10, 10]]
+    with gallery_app.app.app_context():
+        exhibit = import_exhibit_from_excel(workbook(sheets), user_id=user_id)
+        buffer = io.BytesIO()
+        export_exhibit_to_excel(buffer, exhibit)
+        buffer.seek(0)
+        copy = import_exhibit_from_excel(buffer, user_id=user_id)
+        walls = Wall.query.filter_by(exhibit_id=copy.id).order_by(Wall.id).all()
+        assert [(w.name, w.width) for w in walls] == [(name, 100 + i) for i, name in enumerate(names)]
+        assert [[a.name for a in w.artworks] for w in walls] == [['Piece 0'], ['Piece 1'], ['Piece 2']]
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,96 @@
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models.exhibit_listing import guest_exhibit_page
+
+
+@pytest.fixture
+def user_exhibits(gallery_app, client):
+    """A logged-in user with five exhibits; exhibit i has i walls of two artworks and one unplaced artwork"""
+    with gallery_app.app.app_context():
+        user = User(name='Ada')
+        db.session.add(user)
+        db.session.flush()
+        for i in range(5):
+            exhibit = Exhibit(name=f'Show {i}', user_id=user.id)
+            db.session.add(exhibit)
+            db.session.flush()
+            for w in range(i):
+                wall = Wall(name=f'Wall {w}', width=400, height=300, exhibit_id=exhibit.id)
+                db.session.add(wall)
+                db.session.flush()
+                db.session.add_all([Artwork(name='Hung', width=10, height=10, wall_id=wall.id, user_id=user.id)
+                                    for _ in range(2)])
+            unplaced = Artwork(name='Loose', width=10, height=10, user_id=user.id)
+            unplaced.exhibit_id = exhibit.id
+            db.session.add(unplaced)
+        db.session.commit()
+        user_id = user.id
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_id
+    return user_id
+
+
+def all_pages(client, limit, query_budget=None):
+    pages, after = [], None
+    while True:
+        url = f'/api/exhibits?limit={limit}' + (f'&after={after}' if after else '')
+        if query_budget:
+            with query_budget(1):
+                body = client.get(url).get_json()
+        else:
+            body = client.get(url).get_json()
+        pages.append(body['exhibits'])
+        after = body['next_cursor']
+        if not after:
+            return pages
+
+
+def test_user_pages_with_counts(client, user_exhibits, query_budget):
+    pages = all_pages(client, 2, query_budget)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    exhibits = [e for page in pages for e in page]
+    assert [e['name'] for e in exhibits] == [f'Show {i}' for i in reversed(range(5))]
+    newest = exhibits[0]
+    assert (newest['walls'], newest['placed'], newest['unplaced'], newest['artworks']) == (4, 8, 1, 9)
+    assert newest['last_modified'] >= newest['created_at']
+    assert exhibits[-1]['walls'] == 0 and exhibits[-1]['artworks'] == 1
+
+
+def test_load_exhibit_page(client, user_exhibits):
+    page = client.get('/load-exhibit').get_data(as_text=True)
+    assert 'Show 4' in page and '(8 placed, 1 unplaced)' in page
+    assert client.get('/api/exhibits?after=nope').status_code == 400
+
+
+def test_guest_pages(client):
+    client.get('/guest')
+    for i in range(3):
+        client.post('/new-exhibit', data={'exhibit_name': f'Guest show {i}'})
+    client.post('/create-wall', data={'wall_name': 'East', 'wall_width': 300, 'wall_height': 200})
+    pages = all_pages(client, 2)
+    assert [[e['name'] for e in page] for page in pages] == [['Guest show 2', 'Guest show 1'], ['Guest show 0']]
+    assert pages[0][0]['walls'] == 1 and pages[0][0]['artworks'] == 0
+
+
+def test_guest_exhibits_without_ids_are_skipped():
+    guest_doc = SimpleNamespace(exhibits=[{'name': 'First'}, {'id': 'e2', 'name': 'Second'},
+                                          {'id': 'e3', 'name': 'Third'}, {'id': None, 'name': 'Fourth'}])
+    first, cursor = guest_exhibit_page(guest_doc, limit=1)
+    assert [(e['id'], e['name']) for e in first] == [('e3', 'Third')] and cursor == 'e3'
+    rest, cursor = guest_exhibit_page(guest_doc, limit=1, after=cursor)
+    assert [(e['id'], e['name']) for e in rest] == [('e2', 'Second')] and cursor is None
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,105 @@
+import os
+import time
+import pytest
+import sys
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models import export_cache as cache_module
+from gallery.models.export_cache import ExportCache, exhibit_fingerprint, guest_fingerprint, export_key
+
+
+@pytest.fixture
+def exhibit(gallery_app, client):
+    """A logged-in user's exhibit with one artwork on one wall; yields (exhibit id, artwork id)"""
+    with gallery_app.app.app_context():
+        user = User(name='Ada')
+        db.session.add(user)
+        db.session.flush()
+        exhibit = Exhibit(name='Spring Show', user_id=user.id)
+        db.session.add(exhibit)
+        db.session.flush()
+        wall = Wall(name='North', width=400, height=300, exhibit_id=exhibit.id)
+        db.session.add(wall)
+        db.session.flush()
+        artwork = Artwork(name='Piece', width=10, height=20, wall_id=wall.id, user_id=user.id)
+        db.session.add(artwork)
+        db.session.commit()
+        user_id, ids = user.id, (exhibit.id, artwork.id)
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_id
+    return ids
+
+
+def test_fingerprint_follows_edits(gallery_app, exhibit):
+    exhibit_id, artwork_id = exhibit
+    with gallery_app.app.app_context():
+        before = exhibit_fingerprint(exhibit_id)
+        assert exhibit_fingerprint(exhibit_id) == before
+        db.session.get(Artwork, artwork_id).x_position = 42
+        db.session.commit()
+        moved = exhibit_fingerprint(exhibit_id)
+        assert moved != before
+        db.session.get(Exhibit, exhibit_id).name = 'Summer Show'
+        db.session.commit()
+        assert exhibit_fingerprint(exhibit_id) not in (before, moved)
+        assert exhibit_fingerprint(987654) is None
+
+    assert guest_fingerprint({'name': 'A', 'walls': []}) == guest_fingerprint({'walls': [], 'name': 'A'})
+    assert export_key(before, 'excel', 'xlsx') != export_key(before, 'instructions', 'xlsx')
+
+
+def test_unchanged_exhibit_is_served_from_cache(gallery_app, client, exhibit, query_budget):
+    exhibit_id, artwork_id = exhibit
+    first = client.get(f'/export-exhibit?exhibit_id={exhibit_id}').get_data()
+    # Exhibit and content hash only
+    with query_budget(2):
+        again = client.get(f'/export-exhibit?exhibit_id={exhibit_id}').get_data()
+    assert again == first
+
+    with gallery_app.app.app_context():
+        db.session.get(Artwork, artwork_id).name = 'Renamed'
+        db.session.commit()
+    misses = gallery_app.export_cache.misses
+    client.get(f'/export-exhibit?exhibit_id={exhibit_id}')
+    assert gallery_app.export_cache.misses == misses + 1
+
+
+def test_cached_job_is_done_on_submit(client, exhibit):
+    exhibit_id, _ = exhibit
+    client.get(f'/export-exhibit?exhibit_id={exhibit_id}')
+    response = client.post('/export-jobs', json={'exhibit_id': exhibit_id})
+    job = client.get(response.get_json()['status_url']).get_json()['job']
+    assert job['status'] == 'done'
+    assert client.get(job['download_url']).status_code == 200
+
+
+def test_lru_eviction(tmp_path):
+    cache = ExportCache(str(tmp_path), max_bytes=250)
+    for i, key in enumerate('abc'):
+        scratch = cache.scratch_path()
+        with open(scratch, 'wb') as f:
+            f.write(b'x' * 100)
+        cache.put(key, 'xlsx', scratch)
+        os.utime(cache.path(key, 'xlsx'), (time.time() - 100 + i, time.time() - 100 + i))
+        if key == 'b':
+            # 'a' is read again, so 'b' is now the least recently used
+            assert cache.get('a', 'xlsx')
+    assert sorted(os.listdir(tmp_path)) == ['a.xlsx', 'c.xlsx']
+    assert cache.get('b', 'xlsx') is None
+
+
+def test_template_version_changes_keys(monkeypatch):
+    key = export_key('fingerprint', 'excel', 'xlsx')
+    monkeypatch.setattr(cache_module, 'EXPORT_TEMPLATE_VERSION', cache_module.EXPORT_TEMPLATE_VERSION + 1)
+    assert export_key('fingerprint', 'excel', 'xlsx') != key
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,116 @@
+import io
+import os
+import time
+import pytest
+import sys
+import openpyxl
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models.export_jobs import ExportJobs
+from gallery.models.export_cache import ExportCache
+
+
+class InlineQueue:
+    """Runs each job as it is submitted"""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def exhibit_id(gallery_app, client):
+    """A logged-in user's exhibit with one wall of three artworks"""
+    with gallery_app.app.app_context():
+        user = User(name='Ada')
+        db.session.add(user)
+        db.session.flush()
+        exhibit = Exhibit(name='Spring Show', user_id=user.id)
+        db.session.add(exhibit)
+        db.session.flush()
+        wall = Wall(name='North', width=400, height=300, exhibit_id=exhibit.id)
+        db.session.add(wall)
+        db.session.flush()
+        for i in (2, 0, 1):
+            artwork = Artwork(name=f'Piece {i}', width=10, height=20, hanging_point=3, wall_id=wall.id, user_id=user.id)
+            artwork.x_position, artwork.y_position = 50 * i, 120
+            db.session.add(artwork)
+        db.session.commit()
+        user_id, exhibit_id = user.id, exhibit.id
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_id
+        flask_session['current_exhibit_id'] = exhibit_id
+    return exhibit_id
+
+
+def finished(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/export-jobs/{job_id}').get_json()['job']
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.02)
+    pytest.fail(f"Export job {job_id} still {job['status']}")
+
+
+def test_excel_job(client, exhibit_id):
+    response = client.post('/export-jobs', json={'exhibit_id': exhibit_id})
+    assert response.status_code == 202
+    job = finished(client, response.get_json()['job_id'])
+    assert (job['status'], job['done'], job['total'], job['progress']) == ('done', 3, 3, 1.0)
+
+    download = client.get(job['download_url'])
+    assert download.headers['Content-Disposition'] == 'attachment; filename=Spring_Show.xlsx'
+    workbook = openpyxl.load_workbook(io.BytesIO(download.get_data()), read_only=True)
+    assert len(list(workbook['North - Art'].iter_rows())) == 4
+
+
+def test_instructions_job(client, exhibit_id):
+    job_id = client.post('/export-jobs', json={'kind': 'instructions', 'format': 'txt'}).get_json()['job_id']
+    job = finished(client, job_id)
+    lines = client.get(job['download_url']).get_data(as_text=True).splitlines()
+    assert lines[:2] == ['Installation instructions: Spring Show', 'NORTH (400 IN X 300 IN)']
+    assert lines[2] == 'Piece 0 (10 in x 20 in): left edge at 0 in, bottom edge at 120 in, hanging point 3 in'
+    assert [line.split(' (')[0] for line in lines[2:]] == ['Piece 0', 'Piece 1', 'Piece 2']
+    assert client.post('/export-jobs', json={'kind': 'instructions', 'format': 'exe'}).status_code == 400
+
+
+def test_jobs_are_private(client, exhibit_id):
+    job_id = client.post('/export-jobs', json={}).get_json()['job_id']
+    finished(client, job_id)
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = flask_session['user_id'] + 1000
+    assert client.get(f'/export-jobs/{job_id}').status_code == 404
+    assert client.get(f'/export-jobs/{job_id}/download').status_code == 404
+
+
+def test_unknown_job_without_a_session(client):
+    assert client.get('/export-jobs/nope').status_code == 404
+    assert client.get('/export-jobs/nope/download').status_code == 404
+
+
+def test_guest_job(client):
+    client.get('/guest')
+    client.post('/new-exhibit', data={'exhibit_name': 'Guest show'})
+    client.post('/create-wall', data={'wall_name': 'East', 'wall_width': 300, 'wall_height': 200})
+    job = finished(client, client.post('/export-jobs', json={}).get_json()['job_id'])
+    assert job['status'] == 'done' and job['filename'] == 'Guest_show.xlsx'
+
+
+def test_failed_job(gallery_app, tmp_path):
+    jobs = ExportJobs(gallery_app.redis_manager.redis, gallery_app.app, InlineQueue(), ExportCache(str(tmp_path)))
+    with gallery_app.app.app_context():
+        job_id = jobs.submit('user:1', 'excel', 'Gone', exhibit_id=987654)
+    job = jobs.status(job_id, 'user:1')
+    assert job['status'] == 'failed' and job['error']
+    assert jobs.artifact(job_id, 'user:1') is None and os.listdir(tmp_path) == []
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
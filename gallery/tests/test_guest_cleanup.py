@@ -0,0 +1,91 @@
+import pytest
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models.permanent_object import PermanentObject
+from gallery.models.guest_cleanup import GuestCleanup
+
+OLD = datetime.utcnow() - timedelta(days=3)
+
+
+def add_exhibit(name, user_id=None, created_at=OLD, image_path=None):
+    exhibit = Exhibit(name=name, user_id=user_id)
+    exhibit.created_at = created_at
+    db.session.add(exhibit)
+    db.session.flush()
+    wall = Wall(name=f'{name} wall', width=400, height=300, exhibit_id=exhibit.id)
+    db.session.add(wall)
+    db.session.flush()
+    db.session.add_all([
+        Artwork(name=f'{name} art', width=10, height=10, wall_id=wall.id, user_id=user_id, image_path=image_path),
+        PermanentObject(name='Door', width=90, height=200, wall_id=wall.id),
+    ])
+    return exhibit.id
+
+
+def upload(directory, name, age_days):
+    path = directory / name
+    path.write_bytes(b'img')
+    stamp = time.time() - age_days * 86400
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_removes_expired_guest_rows_in_batches(gallery_app, tmp_path):
+    with gallery_app.app.app_context():
+        user = User(name='Ada')
+        db.session.add(user)
+        db.session.flush()
+        expired = [add_exhibit(f'Abandoned {i}') for i in range(5)]
+        recent = add_exhibit('Fresh guest', created_at=datetime.utcnow())
+        owned = add_exhibit('Owned', user_id=user.id)
+        db.session.commit()
+
+        report = GuestCleanup(gallery_app.redis_manager, str(tmp_path), batch_size=2, pause=0).run()
+
+        assert report['finished'] and report['batches'] >= 3
+        assert report['deleted']['exhibits'] >= 5 and report['deleted']['permanent_object'] >= 5
+        assert not Exhibit.query.filter(Exhibit.id.in_(expired)).count()
+        assert not Artwork.query.filter(Artwork.name.like('Abandoned%')).count()
+        assert db.session.get(Exhibit, recent) and db.session.get(Exhibit, owned)
+
+
+def test_removes_only_orphaned_old_guest_uploads(gallery_app, tmp_path):
+    manager = gallery_app.redis_manager
+    manager.create_guest_session({'exhibits': [{'id': 'e', 'walls': [{'id': 'w', 'artworks': [
+        {'id': 'a', 'name': 'Guest art', 'image_path': 'static/uploads/guest/live.png'}]}]}]})
+    guest_dir = tmp_path / 'guest'
+    guest_dir.mkdir()
+    with gallery_app.app.app_context():
+        user = User(name='Grace')
+        db.session.add(user)
+        db.session.flush()
+        # Uploaded as a guest, then migrated to the user's exhibit
+        add_exhibit('Kept', user_id=user.id, image_path='static/uploads/guest/migrated.png')
+        db.session.commit()
+
+        orphan = upload(guest_dir, 'orphan.png', 10)
+        kept = [upload(guest_dir, 'migrated.png', 10), upload(guest_dir, 'live.png', 10),
+                upload(guest_dir, 'just-uploaded.png', 0),
+                # Outside the guest directory, even with a referenced name elsewhere
+                upload(tmp_path, 'orphan.png', 10)]
+        assert 'upload_files' not in GuestCleanup(manager, str(tmp_path), pause=0).run()['deleted']
+        assert orphan.exists()
+
+        report = GuestCleanup(manager, str(tmp_path), pause=0, delete_uploads=True).run()
+
+    assert report['deleted']['upload_files'] == 1
+    assert not orphan.exists() and all(path.exists() for path in kept)
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
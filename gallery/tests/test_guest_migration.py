@@ -0,0 +1,111 @@
+import pytest
+import sys
+import os
+from sqlalchemy import event
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models.permanent_object import PermanentObject
+from gallery.models.wall_line import SingleLine
+from gallery.models.guest_migration import GuestMigration, migrate_guest_session
+
+
+def guest_tree(name, walls):
+    """A guest project with `walls` walls, each holding two artworks, a fixture and a snap line"""
+    return {'exhibits': [{
+        'id': f'{name}-exhibit',
+        'name': name,
+        'walls': [{
+            'id': f'{name}-wall-{w}', 'name': f'Wall {w}', 'width': 400, 'height': 300, 'color': 'Grey',
+            'artworks': [{'id': f'{name}-art-{w}-{a}', 'name': f'{name} art {w}.{a}', 'width': 40, 'height': 30,
+                          'x_position': 10 * a, 'y_position': 50} for a in range(2)],
+            'permanent_objects': [{'id': f'{name}-door-{w}', 'name': 'Door', 'width': 90, 'height': 200, 'x': 5}],
+            'wall_lines': [{'id': f'0000{w:04d}-line-{name}', 'x_cord': 0, 'y_cord': 150, 'length': 400,
+                            'orientation': 'horizontal', 'alignment': 'center'}],
+        } for w in range(walls)],
+        'artworks': [{'id': f'{name}-loose', 'name': f'{name} loose', 'width': 20, 'height': 20}],
+    }]}
+
+
+def migrate(gallery_app, name, walls):
+    """Migrate a fresh guest session, returning (user id, session id, exhibit ids, statements run)"""
+    manager = gallery_app.redis_manager
+    session_id = manager.create_guest_session(guest_tree(name, walls))
+    with gallery_app.app.app_context():
+        user = User(name=name)
+        db.session.add(user)
+        db.session.commit()
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            exhibit_ids = migrate_guest_session(manager, session_id, user.id)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return user.id, session_id, exhibit_ids, statements
+
+
+def test_migrates_the_whole_tree(gallery_app):
+    user_id, session_id, exhibit_ids, _ = migrate(gallery_app, 'Spring', 2)
+    assert gallery_app.redis_manager.get_session(session_id) is None
+    with gallery_app.app.app_context():
+        exhibit = db.session.get(Exhibit, exhibit_ids[0])
+        assert exhibit.name == 'Spring' and exhibit.user_id == user_id
+        walls = Wall.query.filter_by(exhibit_id=exhibit.id).order_by(Wall.id).all()
+        assert [w.name for w in walls] == ['Wall 0', 'Wall 1']
+        assert Artwork.query.filter_by(wall_id=walls[1].id).count() == 2
+        assert [a.name for a in exhibit.unplaced_artworks] == ['Spring loose']
+        assert PermanentObject.query.filter_by(wall_id=walls[0].id).one().x == 5
+        assert SingleLine.query.filter_by(wall_id=walls[0].id).one().length == 400
+
+
+def test_retry_does_not_duplicate(gallery_app):
+    user_id, session_id, exhibit_ids, _ = migrate(gallery_app, 'Summer', 1)
+    # A retried callback for the same session, even with its guest data back
+    assert gallery_app.redis_manager.update_session(session_id, guest_tree('Summer', 1))
+    assert gallery_app.redis_manager.get_session(session_id)
+    with gallery_app.app.app_context():
+        assert migrate_guest_session(gallery_app.redis_manager, session_id, user_id) == []
+        assert Exhibit.query.filter_by(user_id=user_id).count() == 1
+        assert db.session.get(GuestMigration, session_id).exhibit_count == 1
+
+
+def test_statement_count_does_not_grow_with_project(gallery_app):
+    *_, small = migrate(gallery_app, 'Autumn', 1)
+    *_, large = migrate(gallery_app, 'Winter', 20)
+    assert len(small) == len(large)
+
+
+def test_sign_in_migrates_holding_the_write_lock(gallery_app):
+    # auth_callback is a GET; migrate_guest_data must still BEGIN IMMEDIATE
+    if not gallery_app.sqlite_mode:
+        pytest.skip("SQLite only")
+    manager = gallery_app.redis_manager
+    session_id = manager.create_guest_session(guest_tree('Equinox', 1))
+    with gallery_app.app.test_request_context('/auth/callback'):
+        user = User(name='Equinox')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        gallery_app.sqlite_mode.set_writing(False)
+        locks = []
+        listener = lambda conn: locks.append(conn.info.get('_holds_write_lock', False))
+        event.listen(db.engine, 'begin', listener)
+        try:
+            exhibit_ids = gallery_app.migrate_guest_data(session_id, user_id)
+        finally:
+            event.remove(db.engine, 'begin', listener)
+        assert exhibit_ids and locks and all(locks)
+        # The retry is a read-only no-op and still releases the lock
+        assert gallery_app.migrate_guest_data(session_id, user_id) == []
+        assert not gallery_app.sqlite_mode._write_lock.locked()
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
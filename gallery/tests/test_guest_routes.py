@@ -0,0 +1,99 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+AJAX = {'X-Requested-With': 'XMLHttpRequest'}
+
+
+@pytest.fixture
+def wall(client):
+    """A guest with one exhibit and one selected wall; returns the wall id"""
+    client.get('/guest')
+    client.post('/new-exhibit', data={'exhibit_name': 'Spring show'})
+    client.post('/create-wall', data={'wall_name': 'North', 'wall_width': '400', 'wall_height': '300'})
+    with client.session_transaction() as flask_session:
+        return flask_session['current_wall_id']
+
+
+def guest_data(client):
+    import app as gallery_app
+    with client.session_transaction() as flask_session:
+        guest_id = flask_session['guest_session_id']
+    return gallery_app.redis_manager.get_session(guest_id)['data']
+
+
+def test_guest_builds_an_exhibit(client, wall):
+    exhibit = guest_data(client)['exhibits'][0]
+    assert exhibit['name'] == 'Spring show'
+    assert [w['id'] for w in exhibit['walls']] == [wall]
+    assert client.get('/select-wall-space').status_code == 200
+
+
+def test_guest_places_and_moves_artwork(client, wall):
+    response = client.post('/artwork-manual', data={'name': 'Dusk', 'width': '40', 'height': '30'}, headers=AJAX)
+    artwork_id = response.get_json()['artwork']['id']
+
+    response = client.post(f'/update_artwork_position/{artwork_id}',
+                           json={'x_position': 120, 'y_position': 80, 'wall_id': wall})
+    assert response.get_json()['success']
+
+    artwork, = guest_data(client)['exhibits'][0]['walls'][0]['artworks']
+    assert (artwork['name'], artwork['x_position'], artwork['y_position']) == ('Dusk', 120, 80)
+    assert client.get('/editor').status_code == 200
+
+    assert client.delete(f'/delete-artwork/{artwork_id}').get_json()['success']
+    assert guest_data(client)['exhibits'][0]['walls'][0]['artworks'] == []
+
+
+def test_guest_fixtures_and_snap_lines(client, wall):
+    response = client.post('/add_permanent_object', data={'wall_id': wall, 'name': 'Door', 'width': '90',
+                                                          'height': '200'}, headers=AJAX)
+    obj_id = response.get_json()['object']['id']
+    assert client.post(f'/update_object_position/{obj_id}', json={'x': 10, 'y': 0}).get_json()['success']
+
+    line = client.post('/save-snap-line', json={'wall_id': wall, 'distance': 150}).get_json()['line']
+    wall_data = guest_data(client)['exhibits'][0]['walls'][0]
+    assert wall_data['permanent_objects'][0]['x'] == 10
+    assert [l['id'] for l in wall_data['wall_lines']] == [line['id']]
+
+    assert client.delete(f"/delete-snap-line/{line['id']}").get_json()['success']
+    assert guest_data(client)['exhibits'][0]['walls'][0]['wall_lines'] == []
+
+
+def test_guest_deletes_wall(client, wall):
+    client.post('/artwork-manual', data={'name': 'Dusk'}, headers=AJAX)
+    client.post(f'/delete-wall/{wall}')
+    assert guest_data(client)['exhibits'][0]['walls'] == []
+
+
+def test_moving_missing_artwork_is_404(client, wall):
+    response = client.post('/update_artwork_position/nope', json={'x_position': 1, 'y_position': 1})
+    assert response.status_code == 404
+
+
+def test_guest_batched_positions(client, wall):
+    """Many moves on one wall are applied together; unknown ids are reported"""
+    ids = [client.post('/artwork-manual', data={'name': f'A{i}'}, headers=AJAX).get_json()['artwork']['id']
+           for i in range(3)]
+    obj_id = client.post('/add_permanent_object', data={'wall_id': wall, 'name': 'Door'},
+                         headers=AJAX).get_json()['object']['id']
+
+    response = client.post(f'/walls/{wall}/positions', json={
+        'artworks': [{'id': i, 'x_position': n * 50, 'y_position': 60} for n, i in enumerate(ids)]
+                    + [{'id': 'gone', 'x_position': 0, 'y_position': 0}],
+        'permanent_objects': [{'id': obj_id, 'x': 300, 'y': 0}],
+    }).get_json()
+    assert response['updated'] == {'artworks': ids, 'permanent_objects': [obj_id]}
+    assert response['missing'] == {'artworks': ['gone'], 'permanent_objects': []}
+
+    wall_data = guest_data(client)['exhibits'][0]['walls'][0]
+    assert [a['x_position'] for a in wall_data['artworks']] == [0, 50, 100]
+    assert wall_data['permanent_objects'][0]['x'] == 300
+    assert client.post('/walls/other/positions', json={}).status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
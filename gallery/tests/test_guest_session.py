@@ -0,0 +1,77 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.guest_session import GuestSession
+from gallery.models.redis_manager import flatten_entity, assemble_entity
+
+
+@pytest.fixture
+def doc():
+    """A guest session with one exhibit, one wall and a few objects"""
+    session_data = {
+        'created_at': '2025-01-01T00:00:00',
+        'data': {
+            'exhibits': [{
+                'id': 'ex1',
+                'name': 'Exhibit',
+                'artworks': [{'id': 'loose', 'name': 'Unplaced'}],
+                'walls': [{
+                    'id': 'w1',
+                    'name': 'Wall',
+                    'artworks': [{'id': 'a1', 'x_position': 0}, {'id': 'a2', 'x_position': 0}],
+                    'permanent_objects': [{'id': 'p1', 'x': 0, 'y': 0}],
+                    'wall_lines': [{'id': 'l1', 'distance': 10}],
+                }],
+            }]
+        }
+    }
+    return GuestSession('guest:test', session_data)
+
+
+def test_lookup_by_id(doc):
+    """Every entity is reachable by id, and parent scoping is enforced"""
+    assert doc.exhibit('ex1')['name'] == 'Exhibit'
+    assert doc.wall('w1', 'ex1')['name'] == 'Wall'
+    assert doc.wall('w1', 'other') is None
+    assert doc.get('artwork', 'a2', 'wall', 'w1')['id'] == 'a2'
+    assert doc.get('artwork', 'loose', 'wall', 'w1') is None
+    assert doc.parent('artwork', 'loose') == ('exhibit', 'ex1')
+    assert doc.get('permanent_object', 'p1') is not None
+    assert doc.get('wall_line', 'missing') is None
+
+
+def test_add_and_remove_track_changes(doc):
+    """Adds and removes keep the nested data in sync and record dirty entities"""
+    doc.add('artwork', {'id': 'a3'}, 'wall', 'w1')
+    assert [a['id'] for a in doc.wall('w1')['artworks']] == ['a1', 'a2', 'a3']
+    assert doc.dirty == {('wall', 'w1'), ('artwork', 'a3')}
+
+    doc.dirty.clear()
+    doc.remove('wall', 'w1')
+    assert doc.exhibit('ex1')['walls'] == []
+    assert doc.get('artwork', 'a1') is None
+    assert doc.dirty == {('exhibit', 'ex1')}
+    assert ('wall_line', 'l1') in doc.removed
+    assert ('artwork', 'a3') in doc.removed
+
+
+def test_update_marks_only_that_entity(doc):
+    """Moving one artwork only dirties that artwork"""
+    doc.update('artwork', 'a1', {'x_position': 12})
+    assert doc.get('artwork', 'a1')['x_position'] == 12
+    assert doc.dirty == {('artwork', 'a1')}
+
+
+def test_flatten_round_trip(doc):
+    """The entity layout used in Redis rebuilds the same tree"""
+    entities = flatten_entity('root', doc.to_data())
+    assert entities['wall:w1']['artworks'] == ['a1', 'a2']
+    assert assemble_entity('root', entities['root'], entities) == doc.to_data()
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,104 @@
+import json
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models.permanent_object import PermanentObject
+from gallery.models.wall_line import SingleLine, Orientation
+from gallery.models.project_exporter import (encode_internal, decode_internal, decode_internal_rows,
+                                             InternalFormatError, INTERNAL_SCHEMAS, _project_to_excel,
+                                             _project_from_excel)
+
+
+def columns(obj):
+    _, fields = INTERNAL_SCHEMAS[1][{Wall: 'wall', Artwork: 'artwork', PermanentObject: 'permanent',
+                                     SingleLine: 'line'}[type(obj)]]
+    return {field: getattr(obj, field) for field in fields}
+
+
+@pytest.fixture
+def project(gallery_app):
+    """A stored wall with an artwork (odd floats, unicode, a NULL), a door and a snap line"""
+    with gallery_app.app.app_context():
+        exhibit = Exhibit(name='Codec')
+        db.session.add(exhibit)
+        db.session.flush()
+        wall = Wall(name='Nord — Ost', width=412.125, height=300, exhibit_id=exhibit.id)
+        db.session.add(wall)
+        db.session.flush()
+        artwork = Artwork(name='Stillleben "1"', width=0.1 + 0.2, height=20, medium='Öl', wall_id=wall.id)
+        artwork.price = None
+        door = PermanentObject(name='Door', width=36, height=80, x=5, y=0, wall_id=wall.id)
+        line = SingleLine(x=wall.id, y=61.5, length=412.125, distance=61.5, wall_id=wall.id)
+        db.session.add_all([artwork, door, line])
+        db.session.commit()
+        yield wall, [artwork], [door], [line]
+
+
+def test_round_trip(project):
+    wall, artworks, doors, lines = project
+    for obj in [wall, *artworks, *doors, *lines]:
+        decoded, = decode_internal([encode_internal(obj)])
+        assert type(decoded) is type(obj)
+        assert columns(decoded) == columns(obj)
+    assert decode_internal([encode_internal(lines[0])])[0].orientation is Orientation.HORIZONTAL
+    assert decode_internal([encode_internal(wall)])[0].updated_at == wall.updated_at
+
+
+def test_rows_for_bulk_insert(project):
+    wall, artworks, doors, lines = project
+    rows = decode_internal_rows(encode_internal(obj) for obj in [*artworks, *lines])
+    assert [model for model, _ in rows] == [Artwork, SingleLine]
+    assert rows[0][1] == columns(artworks[0])
+    assert rows[1][1]['orientation'] is Orientation.HORIZONTAL
+
+
+def test_record_is_compact_and_versioned(project):
+    wall = project[0]
+    record = json.loads(encode_internal(wall))
+    assert record[:2] == [1, 'wall']
+    assert record[2][:2] == [wall.id, 'Nord — Ost']
+    assert '_sa_instance_state' not in encode_internal(wall)
+
+
+def test_workbook_round_trip(project, tmp_path):
+    wall, artworks, doors, lines = project
+    path = str(tmp_path / 'project.xlsx')
+    _project_to_excel(path, wall, artworks, doors, lines)
+    loaded = _project_from_excel(path)
+    assert columns(loaded['wall']) == columns(wall)
+    assert [columns(a) for a in loaded['artworks']] == [columns(a) for a in artworks]
+    assert [columns(p) for p in loaded['permanent_objects']] == [columns(p) for p in doors]
+    assert [columns(line) for line in loaded['wall_lines']] == [columns(line) for line in lines]
+
+
+@pytest.mark.parametrize('value', [
+    "{'name': 'old repr format'}",
+    '[2,"wall",[]]',
+    '[1,"sculpture",[]]',
+    '[1,"wall",[1,"short"]]',
+])
+def test_rejects_unknown_records(value):
+    with pytest.raises(InternalFormatError):
+        decode_internal([value])
+
+
+def test_each_cell_holds_one_record():
+    line = encode_internal(SingleLine(x=1, y=2, length=3))
+    # An edited cell holding two records must not import as two rows
+    with pytest.raises(InternalFormatError, match='Row 3'):
+        decode_internal_rows([line, f"{line},{line}", line])
+    with pytest.raises(InternalFormatError, match='Row 5: unreadable'):
+        decode_internal_rows([line, None, line, 'not json'])
+    assert len(decode_internal_rows([line, None, line])) == 2
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
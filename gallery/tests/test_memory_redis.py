@@ -0,0 +1,94 @@
+import pytest
+import redis
+import sys
+import os
+from datetime import timedelta
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.memory_redis import MemoryRedis
+from gallery.models.redis_manager import RedisSessionManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def client(clock):
+    return MemoryRedis(clock=clock)
+
+
+def test_keys_expire(client, clock):
+    """TTL counts down and the key disappears once it runs out"""
+    client.set('a', 'x', ex=10)
+    client.hset('h', mapping={'f': 1})
+    client.expire('h', timedelta(seconds=5))
+    assert client.ttl('a') == 10 and client.ttl('h') == 5
+    assert client.ttl('missing') == -2
+
+    clock.now += 6
+    assert client.hgetall('h') == {}
+    assert client.get('a') == b'x'
+    clock.now += 5
+    assert client.get('a') is None
+    assert client.ttl('a') == -2
+
+
+def test_watch_detects_concurrent_write(client):
+    """A write (even just EXPIRE) to a watched key makes EXEC fail"""
+    client.hset('h', 'v', 1)
+    with client.pipeline() as pipe:
+        pipe.watch('h')
+        assert pipe.hget('h', 'v') == b'1'
+        client.expire('h', 60)
+        pipe.multi()
+        pipe.hincrby('h', 'v', 1)
+        with pytest.raises(redis.WatchError):
+            pipe.execute()
+    assert client.hget('h', 'v') == b'1'
+
+    with client.pipeline() as pipe:
+        pipe.watch('h')
+        pipe.multi()
+        pipe.hincrby('h', 'v', 1)
+        assert pipe.execute() == [2]
+
+
+def test_wrong_type(client):
+    client.set('s', 'x')
+    with pytest.raises(redis.ResponseError):
+        client.hget('s', 'f')
+    pipe = client.pipeline(transaction=False)
+    pipe.hgetall('s')
+    pipe.get('s')
+    error, value = pipe.execute(raise_on_error=False)
+    assert isinstance(error, redis.ResponseError) and value == b'x'
+
+
+def test_session_manager_on_memory_backend():
+    """The session manager runs unchanged on the memory backend, TTL included"""
+    manager = RedisSessionManager(backend='memory')
+    clock = Clock()
+    manager.redis.clock = clock
+    session_id = manager.create_guest_session({'exhibits': [{'id': 'ex1', 'walls': []}]})
+    assert manager.add_entity(session_id, 'wall', {'id': 'w1'}, 'exhibit', 'ex1')
+    assert manager.get_session(session_id)['data']['exhibits'][0]['walls'] == [{'id': 'w1'}]
+    assert manager.pool_stats() == {'backend': 'memory'}
+
+    clock.now += manager.session_ttl.total_seconds() + 1
+    assert manager.get_session(session_id) is None
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
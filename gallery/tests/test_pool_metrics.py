@@ -0,0 +1,90 @@
+import pytest
+import sys
+import os
+import redis
+from sqlalchemy import create_engine, exc, text
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.pool_metrics import PoolMetrics
+from gallery.models.redis_manager import RedisSessionManager, CountingConnectionPool
+
+
+@pytest.fixture
+def metered_engine(tmp_path):
+    metrics = PoolMetrics()
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=metrics.pool_class(),
+                           pool_size=1, max_overflow=1, pool_timeout=0.1)
+    metrics.attach(engine)
+    yield engine, metrics
+    engine.dispose()
+
+
+def test_counts_checkouts_overflow_and_timeouts(metered_engine):
+    engine, metrics = metered_engine
+    first, second = engine.connect(), engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    first.close()
+    second.close()
+
+    stats = metrics.snapshot(engine)
+    assert stats['checkouts'] == 2
+    assert stats['checkout_timeouts'] == 1
+    assert stats['overflow_max'] == 1  # the second checkout went past pool_size
+    assert stats['checked_out_max'] == 2
+    assert stats['connections_opened'] == 2
+    assert stats['connections_closed'] == 1  # the overflow connection is not kept
+    assert stats['checked_out'] == 0 and stats['pool_size'] == 1
+
+
+def test_connection_age_grows_with_reuse(metered_engine):
+    engine, metrics = metered_engine
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+    stats = metrics.snapshot(engine)
+    assert stats['checkouts'] == 3
+    assert stats['connections_opened'] == 1
+    assert stats['connection_age_max_s'] > 0
+
+
+def test_db_stats_route(gallery_app, client):
+    client.get('/')
+    stats = client.get('/admin/db-stats').get_json()['pool']
+    assert stats['checkouts'] >= 1
+
+
+class IdleConnection(redis.Connection):
+    """A connection that never touches the network"""
+
+    def connect(self):
+        pass
+
+    def can_read(self, timeout=0):
+        return False
+
+    def disconnect(self, *args, **kwargs):
+        pass
+
+
+def test_redis_pool_stats_count_checkouts():
+    manager = RedisSessionManager(max_connections=3, pool_timeout=0.05)
+    manager.pool = CountingConnectionPool(connection_class=IdleConnection, max_connections=3, timeout=0.05)
+    first, second = manager.pool.get_connection(), manager.pool.get_connection()
+    assert manager.pool_stats() == {'max_connections': 3, 'created': 2, 'in_use': 2, 'idle': 0,
+                                    'utilization': 2 / 3}
+
+    manager.pool.release(first)
+    third = manager.pool.get_connection()  # reuses the released connection
+    manager.pool.release(second)
+    stats = manager.pool_stats()
+    assert (stats['created'], stats['in_use'], stats['idle']) == (2, 1, 1)
+
+    manager.pool.release(third)
+    assert manager.pool_stats()['in_use'] == 0
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
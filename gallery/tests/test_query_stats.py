@@ -0,0 +1,55 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.query_stats import statement_shape
+
+
+@pytest.fixture
+def user_with_exhibits(gallery_app, client):
+    """A logged-in user with six exhibits of one wall each"""
+    with gallery_app.app.app_context():
+        user = User(name='Ada')
+        db.session.add(user)
+        db.session.flush()
+        for i in range(6):
+            exhibit = Exhibit(name=f'Show {i}', user_id=user.id)
+            db.session.add(exhibit)
+            db.session.flush()
+            db.session.add(Wall(name=f'Wall {i}', width=400, height=300, exhibit_id=exhibit.id))
+        db.session.commit()
+        user_id = user.id
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_id
+    return user_id
+
+
+def test_load_exhibit_within_budget(client, user_with_exhibits, query_budget):
+    with query_budget(2):
+        response = client.get('/load-exhibit')
+    assert response.status_code == 200
+    assert 'db;dur=' in response.headers['Server-Timing']
+
+
+def test_lazy_loads_are_reported(gallery_app, user_with_exhibits, query_budget):
+    with gallery_app.app.app_context():
+        with pytest.raises(pytest.fail.Exception, match='N\\+1'):
+            with query_budget(50):
+                for exhibit in Exhibit.query.filter_by(user_id=user_with_exhibits):
+                    exhibit.walls  # one SELECT per exhibit
+
+
+def test_statement_shape_folds_in_lists():
+    assert statement_shape('SELECT a FROM t WHERE id IN (?, ?, ?)') == \
+        statement_shape('SELECT a FROM t\n WHERE id IN (?)')
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
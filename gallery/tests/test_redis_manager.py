@@ -0,0 +1,197 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.redis_manager import RedisSessionManager, SessionConflictError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def manager(clock):
+    manager = RedisSessionManager(backend='memory')
+    manager.redis.clock = clock
+    return manager
+
+
+@pytest.fixture
+def session_id(manager):
+    return manager.create_guest_session({'exhibits': [{'id': 'ex1', 'name': 'Spring', 'walls': []}]})
+
+
+def concurrent_write(manager, session_id):
+    """Change the session the way another request would, outside the caller's WATCH"""
+    manager.redis.hincrby(manager._entities_key(session_id), 'version', 1)
+
+
+def test_mutate_retries_after_a_concurrent_write(manager, session_id):
+    calls = []
+
+    def rename(document):
+        calls.append(document.version)
+        if len(calls) == 1:
+            concurrent_write(manager, session_id)
+        document.update('exhibit', 'ex1', {'name': f"Summer {len(calls)}"})
+        return len(calls)
+
+    assert manager.mutate(session_id, rename) == 2
+    # The retry ran on the data as it was after the concurrent write
+    assert calls[1] == calls[0] + 1
+    session = manager.get_session(session_id)
+    assert session['data']['exhibits'][0]['name'] == 'Summer 2'
+    assert session['version'] == calls[1] + 1
+
+
+def test_mutate_gives_up_after_max_retries(manager, session_id):
+    calls = []
+
+    def always_raced(document):
+        calls.append(document.version)
+        concurrent_write(manager, session_id)
+        document.update('exhibit', 'ex1', {'name': 'Lost'})
+
+    with pytest.raises(SessionConflictError):
+        manager.mutate(session_id, always_raced)
+    assert len(calls) == manager.max_retries
+    assert manager.get_session(session_id)['data']['exhibits'][0]['name'] == 'Spring'
+
+
+def test_save_document_rejects_a_stale_document(manager, session_id):
+    document = manager.load_document(session_id)
+    concurrent_write(manager, session_id)
+    document.update('exhibit', 'ex1', {'name': 'Stale'})
+
+    with pytest.raises(SessionConflictError):
+        manager.save_document(document)
+    assert manager.get_session(session_id)['data']['exhibits'][0]['name'] == 'Spring'
+
+    fresh = manager.load_document(session_id)
+    fresh.update('exhibit', 'ex1', {'name': 'Fresh'})
+    assert manager.save_document(fresh)
+    assert fresh.version == manager.get_session(session_id)['version']
+
+
+def test_save_document_retries_when_raced_before_exec(manager, session_id, monkeypatch):
+    """A write that lands between the version check and EXEC is retried, not lost"""
+    document = manager.load_document(session_id)
+    document.update('exhibit', 'ex1', {'name': 'Autumn'})
+    queue_document = manager._queue_document
+    raced = []
+
+    def race_once(pipe, doc):
+        if not raced:
+            raced.append(True)
+            manager.redis.hset(manager._entities_key(session_id), 'unrelated', b'{}')
+        queue_document(pipe, doc)
+
+    monkeypatch.setattr(manager, '_queue_document', race_once)
+    assert manager.save_document(document)
+    assert raced and manager.get_session(session_id)['data']['exhibits'][0]['name'] == 'Autumn'
+
+
+def test_route_answers_409_when_the_session_keeps_changing(gallery_app, client, monkeypatch):
+    client.get('/guest')
+    client.post('/new-exhibit', data={'exhibit_name': 'Spring show'})
+    client.post('/create-wall', data={'wall_name': 'North', 'wall_width': '400', 'wall_height': '300'})
+    response = client.post('/artwork-manual', data={'name': 'Dusk', 'width': '40', 'height': '30'},
+                           headers={'X-Requested-With': 'XMLHttpRequest'})
+    artwork_id = response.get_json()['artwork']['id']
+    with client.session_transaction() as flask_session:
+        guest_id = flask_session['guest_session_id']
+        wall_id = flask_session['current_wall_id']
+
+    manager = gallery_app.redis_manager
+    fetch_entities = manager._fetch_entities
+
+    def raced_fetch(pipe, sid, refs):
+        entities = fetch_entities(pipe, sid, refs)
+        concurrent_write(manager, sid)
+        return entities
+
+    monkeypatch.setattr(manager, '_fetch_entities', raced_fetch)
+    response = client.post(f'/update_artwork_position/{artwork_id}',
+                           json={'x_position': 120, 'y_position': 80, 'wall_id': wall_id})
+    assert response.status_code == 409
+    assert response.get_json()['success'] is False
+
+    monkeypatch.undo()
+    artwork, = manager.get_session(guest_id)['data']['exhibits'][0]['walls'][0]['artworks']
+    assert artwork['x_position'] != 120
+
+
+def session_ttls(manager, session_id):
+    return [manager.redis.ttl(key) for key in (manager._meta_key(session_id), manager._entities_key(session_id),
+                                                manager._last_activity_key(session_id))]
+
+
+def test_writes_slide_the_ttl_of_every_session_key(manager, session_id, clock):
+    full = int(manager.session_ttl.total_seconds())
+    assert session_ttls(manager, session_id) == [full] * 3
+
+    clock.now += 3600
+    assert session_ttls(manager, session_id) == [full - 3600] * 3
+    manager.mutate(session_id, lambda document: document.update('exhibit', 'ex1', {'name': 'Summer'}))
+    assert session_ttls(manager, session_id) == [full] * 3
+
+
+def test_reads_refresh_the_ttl_only_once_it_ran_down_by_touch_interval(manager, session_id, clock):
+    full = int(manager.session_ttl.total_seconds())
+    interval = int(manager.touch_interval.total_seconds())
+
+    clock.now += interval - 1
+    assert manager.get_session(session_id) is not None
+    assert manager.get_entities(session_id, ('exhibit', 'ex1'))[0]['name'] == 'Spring'
+    assert session_ttls(manager, session_id) == [full - interval + 1] * 3
+
+    clock.now += 1
+    assert manager.get_session(session_id) is not None
+    assert session_ttls(manager, session_id) == [full] * 3
+
+    clock.now += interval
+    assert manager.get_entities(session_id, ('exhibit', 'ex1'))[0] is not None
+    assert session_ttls(manager, session_id) == [full] * 3
+
+
+def test_created_at_survives_writes_and_refreshes(manager, session_id, clock):
+    created_at = manager.get_session(session_id)['created_at']
+    assert created_at
+
+    clock.now += 3600
+    manager.update_session(session_id, {'exhibits': []})
+    manager.mutate(session_id, lambda document: document.add('exhibit', {'id': 'ex2', 'walls': []}))
+    clock.now += manager.touch_interval.total_seconds()
+    session = manager.get_session(session_id)
+    assert session['created_at'] == created_at
+    assert [e['id'] for e in session['data']['exhibits']] == ['ex2']
+
+
+def test_last_activity_lives_in_its_own_expiring_key(manager, session_id, clock):
+    last_activity_key = manager._last_activity_key(session_id)
+    session = manager.get_session(session_id)
+    assert session['last_activity'] == manager.redis.get(last_activity_key).decode()
+    # Touching the session must not rewrite the meta hash
+    assert set(manager.redis.hgetall(manager._meta_key(session_id))) == {b'created_at'}
+
+    clock.now += manager.session_ttl.total_seconds() - 1
+    assert manager.redis.get(last_activity_key) is not None
+    clock.now += 1
+    assert manager.redis.get(last_activity_key) is None
+    assert manager.get_session(session_id) is None
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,60 @@
+import json
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.session_codec import SessionCodec, MAGIC, available_codecs
+
+WALL = {
+    'id': '3f6c1c2e-8d1a-4c4e-9a55-0f1e2d3c4b5a',
+    'name': 'North wall',
+    'width': 412.5,
+    'height': 300.0,
+    'artworks': [f"{i:08d}-0000-0000-0000-000000000000" for i in range(40)],
+}
+
+
+@pytest.mark.parametrize('name', available_codecs())
+def test_round_trip(name):
+    """Every installed codec decodes what it encodes"""
+    codec = SessionCodec(name, min_compress_size=0)
+    encoded = codec.encode(WALL)
+    assert encoded.startswith(MAGIC)
+    assert SessionCodec.decode(encoded) == WALL
+
+
+def test_legacy_json_still_loads():
+    """Values written before the codec layer are plain JSON text"""
+    assert SessionCodec.decode(json.dumps(WALL)) == WALL
+    assert SessionCodec.decode(json.dumps(WALL).encode('utf-8')) == WALL
+
+
+def test_small_values_are_not_compressed():
+    """Compression is skipped below min_compress_size but decoding still works"""
+    codec = SessionCodec('json+zlib', min_compress_size=10_000)
+    encoded = codec.encode(WALL)
+    assert encoded[len(MAGIC) + 2] == 0
+    assert SessionCodec.decode(encoded) == WALL
+    assert len(SessionCodec('json+zlib', min_compress_size=0).encode(WALL)) < len(encoded)
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        SessionCodec('pickle')
+
+
+def test_redis_memory_sample_is_bounded(gallery_app, client, monkeypatch):
+    samples = []
+    monkeypatch.setattr(gallery_app.redis_manager, 'memory_report', lambda sample: samples.append(sample) or {})
+    assert client.get('/admin/redis-memory?sample=10000000').status_code == 200
+    assert client.get('/admin/redis-memory').status_code == 200
+    assert samples == [1000, 100]
+    for bad in ('0', '-5', 'all'):
+        assert client.get(f'/admin/redis-memory?sample={bad}').status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,54 @@
+import pytest
+import sys
+import os
+import threading
+from sqlalchemy import create_engine, text
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.sqlite_mode import SQLiteMode
+
+
+def test_app_engine_uses_wal(gallery_app):
+    with gallery_app.app.app_context(), db.engine.connect() as conn:
+        assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+
+
+def test_concurrent_read_modify_write(tmp_path):
+    """Transactions that read before writing do not fail with 'database is locked'"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'counter.db'}")
+    mode = SQLiteMode({'busy_timeout': 10000}).attach(engine)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE counter (n INTEGER)'))
+        conn.execute(text('INSERT INTO counter VALUES (0)'))
+
+    errors = []
+
+    def increment(times):
+        with mode.writing():
+            for _ in range(times):
+                try:
+                    with engine.begin() as conn:
+                        n = conn.execute(text('SELECT n FROM counter')).scalar()
+                        conn.execute(text('UPDATE counter SET n = :n'), {'n': n + 1})
+                except Exception as e:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=increment, args=(50,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT n FROM counter')).scalar() == 200
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
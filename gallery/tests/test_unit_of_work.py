@@ -0,0 +1,80 @@
+import copy
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.guest_session import GuestSession
+from gallery.models.redis_manager import SessionConflictError
+from gallery.models.unit_of_work import GuestUnitOfWork
+
+
+class RecordingManager:
+    """Just enough of RedisSessionManager to count loads and saves"""
+
+    def __init__(self, data):
+        self.data = data
+        self.version = 1
+        self.loads = 0
+        self.saves = 0
+
+    def load_document(self, session_id):
+        self.loads += 1
+        return GuestSession(session_id, {'version': self.version, 'data': copy.deepcopy(self.data)})
+
+    def save_document(self, document):
+        if document.version != self.version:
+            raise SessionConflictError("stale")
+        self.saves += 1
+        self.version += 1
+        self.data = copy.deepcopy(document.to_data())
+        document.version = self.version
+        document.dirty.clear()
+        document.removed.clear()
+        return True
+
+    def mutate(self, session_id, fn):
+        document = self.load_document(session_id)
+        result = fn(document)
+        self.save_document(document)
+        return result
+
+
+@pytest.fixture
+def manager():
+    return RecordingManager({'exhibits': [{'id': 'ex1', 'walls': [{'id': 'w1', 'artworks': []}]}]})
+
+
+def test_loads_once_and_flushes_once(manager):
+    """Repeated reads and several changes cost one load and one save"""
+    unit = GuestUnitOfWork(manager, 'guest:test')
+    assert unit.document.wall('w1', 'ex1') is not None
+    unit.mutate(lambda doc: doc.add('artwork', {'id': 'a1'}, 'wall', 'w1'))
+    unit.mutate(lambda doc: doc.update('artwork', 'a1', {'x_position': 4}))
+    assert unit.document.get('artwork', 'a1')['x_position'] == 4
+
+    assert unit.flush()
+    assert (manager.loads, manager.saves) == (1, 1)
+    assert manager.data['exhibits'][0]['walls'][0]['artworks'] == [{'id': 'a1', 'x_position': 4}]
+    assert not unit.flush()
+
+
+def test_conflicting_flush_replays_changes(manager):
+    """If the session changed during the request, the changes are reapplied to fresh data"""
+    unit = GuestUnitOfWork(manager, 'guest:test')
+    unit.mutate(lambda doc: doc.add('artwork', {'id': 'a1'}, 'wall', 'w1'))
+
+    # Another request adds a wall in the meantime
+    manager.data['exhibits'][0]['walls'].append({'id': 'w2', 'artworks': []})
+    manager.version += 1
+
+    assert unit.flush()
+    walls = manager.data['exhibits'][0]['walls']
+    assert [w['id'] for w in walls] == ['w1', 'w2']
+    assert walls[0]['artworks'] == [{'id': 'a1'}]
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
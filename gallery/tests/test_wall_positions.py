@@ -0,0 +1,117 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models.permanent_object import PermanentObject
+
+
+@pytest.fixture
+def user_wall(gallery_app, client):
+    """A logged-in user with one wall holding three artworks and a fixture"""
+    with gallery_app.app.app_context():
+        user = User(name='Ada')
+        db.session.add(user)
+        db.session.flush()
+        exhibit = Exhibit(name='Show', user_id=user.id)
+        db.session.add(exhibit)
+        db.session.flush()
+        wall = Wall(name='North', width=400, height=300, exhibit_id=exhibit.id)
+        db.session.add(wall)
+        db.session.flush()
+        artworks = [Artwork(name=f'A{i}', width=40, height=30, wall_id=wall.id, user_id=user.id) for i in range(3)]
+        obj = PermanentObject(name='Door', width=90, height=200, wall_id=wall.id)
+        db.session.add_all(artworks + [obj])
+        db.session.commit()
+        ids = {'user': user.id, 'wall': wall.id, 'artworks': [a.id for a in artworks], 'object': obj.id}
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = ids['user']
+    return ids
+
+
+def test_user_batched_positions(gallery_app, client, user_wall):
+    first, second, third = user_wall['artworks']
+    response = client.post(f"/walls/{user_wall['wall']}/positions", json={
+        'artworks': [
+            {'id': first, 'x_position': 10, 'y_position': 60},
+            {'id': second, 'x_position': 110, 'y_position': 60},
+            {'id': third, 'x_position': None, 'y_position': None, 'wall_id': None},
+        ],
+        'permanent_objects': [{'id': user_wall['object'], 'x': 300, 'y': 0}],
+    }).get_json()
+    assert response['success']
+    assert sorted(response['updated']['artworks']) == [first, second, third]
+
+    with gallery_app.app.app_context():
+        assert db.session.get(Artwork, second).x_position == 110
+        assert db.session.get(Artwork, third).wall_id is None
+        assert db.session.get(PermanentObject, user_wall['object']).x == 300
+
+
+def test_user_cannot_move_on_foreign_wall(gallery_app, client, user_wall):
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_wall['user'] + 1000
+    response = client.post(f"/walls/{user_wall['wall']}/positions", json={'artworks': []})
+    assert response.status_code == 404
+
+
+def test_user_cannot_hang_artwork_on_another_wall(gallery_app, client, user_wall):
+    first, second, _ = user_wall['artworks']
+    response = client.post(f"/walls/{user_wall['wall']}/positions", json={'artworks': [
+        {'id': first, 'x_position': 5, 'y_position': 5},
+        {'id': second, 'x_position': 5, 'y_position': 5, 'wall_id': user_wall['wall'] + 1},
+    ]})
+    assert response.status_code == 400
+    with gallery_app.app.app_context():
+        assert [db.session.get(Artwork, i).wall_id for i in (first, second)] == [user_wall['wall']] * 2
+        assert db.session.get(Artwork, first).x_position != 5
+
+
+def test_missing_coordinates_are_kept(gallery_app, client, user_wall):
+    first = user_wall['artworks'][0]
+    url = f"/walls/{user_wall['wall']}/positions"
+    client.post(url, json={'artworks': [{'id': first, 'x_position': 10, 'y_position': 60}]})
+    client.post(url, json={'artworks': [{'id': first, 'x_position': 20}]})
+    with gallery_app.app.app_context():
+        artwork = db.session.get(Artwork, first)
+        assert (artwork.x_position, artwork.y_position) == (20, 60)
+
+
+def test_only_artworks_of_this_wall_or_its_exhibit_move(gallery_app, client, user_wall):
+    with gallery_app.app.app_context():
+        exhibit_id = db.session.get(Wall, user_wall['wall']).exhibit_id
+        other = Exhibit(name='Other show', user_id=user_wall['user'])
+        db.session.add(other)
+        db.session.flush()
+        other_wall = Wall(name='South', width=400, height=300, exhibit_id=other.id)
+        db.session.add(other_wall)
+        db.session.flush()
+        elsewhere = Artwork(name='Elsewhere', width=10, height=10, wall_id=other_wall.id, user_id=user_wall['user'])
+        loose = Artwork(name='Loose', width=10, height=10, user_id=user_wall['user'])
+        loose.exhibit_id = exhibit_id
+        stray = Artwork(name='Stray', width=10, height=10, user_id=user_wall['user'])
+        stray.exhibit_id = other.id
+        db.session.add_all([elsewhere, loose, stray])
+        db.session.commit()
+        ids = {'elsewhere': elsewhere.id, 'loose': loose.id, 'stray': stray.id, 'other_wall': other_wall.id}
+
+    response = client.post(f"/walls/{user_wall['wall']}/positions", json={'artworks': [
+        {'id': ids[name], 'x_position': 5, 'y_position': 5} for name in ('elsewhere', 'loose', 'stray')]})
+    body = response.get_json()
+    assert body['updated']['artworks'] == [ids['loose']]
+    assert sorted(body['missing']['artworks']) == sorted([str(ids['elsewhere']), str(ids['stray'])])
+    with gallery_app.app.app_context():
+        assert db.session.get(Artwork, ids['loose']).wall_id == user_wall['wall']
+        assert db.session.get(Artwork, ids['elsewhere']).wall_id == ids['other_wall']
+        assert db.session.get(Artwork, ids['stray']).wall_id is None
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,131 @@
+import pytest
+import sys
+import os
+import json
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery.models.base import db
+from gallery.models.user import User
+from gallery.models.exhibit import Exhibit
+from gallery.models.wall import Wall
+from gallery.models.artwork import Artwork
+from gallery.models.wall_line import SingleLine
+
+
+@pytest.fixture
+def user_wall(gallery_app, client):
+    """A logged-in user with one wall holding two artworks and a snap line"""
+    with gallery_app.app.app_context():
+        user = User(name='Ada')
+        db.session.add(user)
+        db.session.flush()
+        exhibit = Exhibit(name='Show', user_id=user.id)
+        db.session.add(exhibit)
+        db.session.flush()
+        wall = Wall(name='North', width=400, height=300, exhibit_id=exhibit.id)
+        db.session.add(wall)
+        db.session.flush()
+        artworks = [Artwork(name=f'A{i}', width=40, height=30, wall_id=wall.id, user_id=user.id) for i in range(2)]
+        # Line ids derive from the coordinates, so keep them unique per test
+        db.session.add_all(artworks + [SingleLine(x=wall.id, y=150, length=400, wall_id=wall.id)])
+        db.session.commit()
+        ids = {'user': user.id, 'wall': wall.id, 'artworks': [a.id for a in artworks]}
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = ids['user']
+        flask_session['current_wall_id'] = ids['wall']
+    return ids
+
+
+def get_scene(client, wall_id, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get(f'/walls/{wall_id}/scene', headers=headers)
+
+
+def test_repeat_loads_are_not_modified(gallery_app, client, user_wall, query_budget):
+    first = get_scene(client, user_wall['wall'])
+    scene = first.get_json()
+    assert first.status_code == 200
+    assert [a['name'] for a in scene['artworks']] == ['A0', 'A1']
+    assert len(scene['wall_lines']) == 1
+
+    etag = first.headers['ETag']
+    with query_budget(1):
+        second = get_scene(client, user_wall['wall'], etag)
+    assert second.status_code == 304 and second.headers['ETag'] == etag
+    # A client without the ETag is served from the scene cache
+    with query_budget(1):
+        assert get_scene(client, user_wall['wall']).get_data() == first.get_data()
+
+
+def test_mutations_bump_the_version(gallery_app, client, user_wall):
+    first = get_scene(client, user_wall['wall'])
+    etag, version = first.headers['ETag'], first.get_json()['version']
+    client.post(f"/walls/{user_wall['wall']}/positions",
+                json={'artworks': [{'id': user_wall['artworks'][0], 'x_position': 50, 'y_position': 20}]})
+    moved = get_scene(client, user_wall['wall'], etag)
+    assert moved.status_code == 200 and moved.get_json()['version'] == version + 1
+    assert moved.get_json()['artworks'][0]['x_position'] == 50
+
+    etag = moved.headers['ETag']
+    assert client.delete(f"/delete-artwork/{user_wall['artworks'][1]}").get_json()['success']
+    removed = get_scene(client, user_wall['wall'], etag)
+    assert removed.status_code == 200 and removed.get_json()['version'] == version + 2
+    assert len(removed.get_json()['artworks']) == 1
+
+
+def test_other_users_wall_is_not_found(client, user_wall):
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_wall['user'] + 1000
+    assert get_scene(client, user_wall['wall']).status_code == 404
+
+
+def test_guest_scene_etag(client):
+    client.get('/guest')
+    client.post('/new-exhibit', data={'exhibit_name': 'Guest show'})
+    client.post('/create-wall', data={'wall_name': 'East', 'wall_width': 300, 'wall_height': 200})
+    with client.session_transaction() as flask_session:
+        wall_id = flask_session['current_wall_id']
+    first = get_scene(client, wall_id)
+    assert first.status_code == 200 and first.get_json()['wall']['name'] == 'East'
+    assert get_scene(client, wall_id, first.headers['ETag']).status_code == 304
+
+    client.post('/save-snap-line', json={'y_cord': 100, 'length': 300})
+    changed = get_scene(client, wall_id, first.headers['ETag'])
+    assert changed.status_code == 200 and len(changed.get_json()['wall_lines']) == 1
+
+
+def page_etag(client):
+    page = client.get('/editor').get_data(as_text=True)
+    assert "window.sceneUrl = \"/walls/" in page
+    return json.loads(page.split('window.sceneEtag = ', 1)[1].split(';', 1)[0])
+
+
+def test_editor_page_revalidates_its_scene(gallery_app, client, user_wall):
+    etag = page_etag(client)
+    assert get_scene(client, user_wall['wall'], etag).status_code == 304
+
+    client.post(f"/walls/{user_wall['wall']}/positions",
+                json={'artworks': [{'id': user_wall['artworks'][0], 'x_position': 7, 'y_position': 9}]})
+    changed = get_scene(client, user_wall['wall'], etag)
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+
+
+def test_guest_revalidation_reads_only_the_session_version(gallery_app, client, monkeypatch):
+    client.get('/guest')
+    client.post('/new-exhibit', data={'exhibit_name': 'Guest show'})
+    client.post('/create-wall', data={'wall_name': 'West', 'wall_width': 300, 'wall_height': 200})
+    with client.session_transaction() as flask_session:
+        wall_id = flask_session['current_wall_id']
+    etag = page_etag(client)
+
+    def no_full_load(session_id):
+        raise AssertionError('revalidation loaded the whole session')
+
+    monkeypatch.setattr(gallery_app.redis_manager, 'get_session', no_full_load)
+    assert get_scene(client, wall_id, etag).status_code == 304
+
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
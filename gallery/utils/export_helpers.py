@@ -92,3 +92,35 @@ def save_to_pdf(lines, filename):
     
     # Build the PDF document
     doc.build(story)
+
+
+def installation_lines(exhibit_name, walls):
+    """
+    Build installation instructions for an exhibit, one line per artwork.
+
+    Args:
+        exhibit_name (str): Title for the first line.
+        walls (list of dict): Walls with name, width, height and an "artworks"
+            list of dicts (name, width, height, x_position, y_position, hanging_point).
+
+    Returns:
+        list of str: The lines; wall headings are upper case, as save_to_pdf expects.
+    """
+    def inches(value):
+        return f"{float(value or 0):g} in"
+
+    lines = [f"Installation instructions: {exhibit_name}"]
+    for wall in walls:
+        lines.append(f"{wall['name']} ({inches(wall['width'])} x {inches(wall['height'])})".upper())
+        artworks = wall.get("artworks") or []
+        if not artworks:
+            lines.append("No artworks on this wall.")
+        # Left to right, as they are hung
+        for artwork in sorted(artworks, key=lambda a: a.get("x_position") or 0):
+            lines.append(
+                f"{artwork['name']} ({inches(artwork['width'])} x {inches(artwork['height'])}): "
+                f"left edge at {inches(artwork.get('x_position'))}, "
+                f"bottom edge at {inches(artwork.get('y_position'))}, "
+                f"hanging point {inches(artwork.get('hanging_point'))}"
+            )
+    return lines
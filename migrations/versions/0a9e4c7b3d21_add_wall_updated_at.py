@@ -0,0 +1,32 @@
+"""add wall updated_at
+
+Revision ID: 0a9e4c7b3d21
+Revises: f1c6d8e2b947
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a9e4c7b3d21'
+down_revision = 'f1c6d8e2b947'
+branch_labels = None
+depends_on = None
+
+
+def _has_updated_at():
+    # Databases created by db.create_all() after this revision already have it
+    return 'updated_at' in {c['name'] for c in sa.inspect(op.get_bind()).get_columns('wall')}
+
+
+def upgrade():
+    if not _has_updated_at():
+        op.add_column('wall', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    if _has_updated_at():
+        with op.batch_alter_table('wall') as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,44 @@
+"""add foreign key lookup indexes
+
+Revision ID: 3f2a9c1d7b10
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns) matching the query shapes in app.py
+INDEXES = [
+    ('exhibits', 'ix_exhibits_user_id', ['user_id']),
+    ('wall', 'ix_wall_exhibit_id', ['exhibit_id']),
+    ('artworks', 'ix_artworks_wall_id', ['wall_id']),
+    ('artworks', 'ix_artworks_exhibit_id_wall_id', ['exhibit_id', 'wall_id']),
+    ('artworks', 'ix_artworks_user_id_wall_id', ['user_id', 'wall_id']),
+    ('permanent_object', 'ix_permanent_object_wall_id', ['wall_id']),
+    ('single_lines', 'ix_single_lines_wall_id', ['wall_id']),
+]
+
+
+def _existing_indexes(table):
+    # Databases created by db.create_all() after this revision already have them
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for table, name, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
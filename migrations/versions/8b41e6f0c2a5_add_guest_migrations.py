@@ -0,0 +1,35 @@
+"""add guest migrations
+
+Revision ID: 8b41e6f0c2a5
+Revises: 3f2a9c1d7b10
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41e6f0c2a5'
+down_revision = '3f2a9c1d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() after this revision already have it
+    if 'guest_migrations' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'guest_migrations',
+        sa.Column('guest_session_id', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('exhibit_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('guest_session_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('guest_migrations')
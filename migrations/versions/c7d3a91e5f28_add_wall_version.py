@@ -0,0 +1,33 @@
+"""add wall version
+
+Revision ID: c7d3a91e5f28
+Revises: 8b41e6f0c2a5
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d3a91e5f28'
+down_revision = '8b41e6f0c2a5'
+branch_labels = None
+depends_on = None
+
+
+def _has_version():
+    # Databases created by db.create_all() after this revision already have it
+    return 'version' in {c['name'] for c in sa.inspect(op.get_bind()).get_columns('wall')}
+
+
+def upgrade():
+    if not _has_version():
+        with op.batch_alter_table('wall') as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    if _has_version():
+        with op.batch_alter_table('wall') as batch_op:
+            batch_op.drop_column('version')
@@ -0,0 +1,34 @@
+"""add exhibit cleanup index
+
+Revision ID: e5b8f2d4a613
+Revises: c7d3a91e5f28
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8f2d4a613'
+down_revision = 'c7d3a91e5f28'
+branch_labels = None
+depends_on = None
+
+INDEX = 'ix_exhibits_user_id_created_at'
+
+
+def _has_index():
+    # Databases created by db.create_all() after this revision already have it
+    return INDEX in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('exhibits')}
+
+
+def upgrade():
+    if not _has_index():
+        # On MySQL this is an online (INPLACE, LOCK=NONE) index build
+        op.create_index(INDEX, 'exhibits', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    if _has_index():
+        op.drop_index(INDEX, table_name='exhibits')
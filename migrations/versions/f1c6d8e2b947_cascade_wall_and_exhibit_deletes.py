@@ -0,0 +1,64 @@
+"""cascade wall and exhibit deletes
+
+Revision ID: f1c6d8e2b947
+Revises: e5b8f2d4a613
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6d8e2b947'
+down_revision = 'e5b8f2d4a613'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table), parents before children
+FOREIGN_KEYS = [
+    ('wall', 'exhibit_id', 'exhibits'),
+    ('artworks', 'exhibit_id', 'exhibits'),
+    ('artworks', 'wall_id', 'wall'),
+    ('permanent_object', 'wall_id', 'wall'),
+    ('single_lines', 'wall_id', 'wall'),
+]
+
+
+def _constraint_name(table, column):
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        if fk['constrained_columns'] == [column]:
+            return fk['name']
+    return None
+
+
+def _set_ondelete(ondelete):
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot alter a constraint, so batch mode copies each table.
+        # Enforcement has to be off meanwhile: dropping the old copy of a
+        # parent table would otherwise cascade into (or be refused by) its children
+        with op.get_context().autocommit_block():
+            op.execute('PRAGMA foreign_keys=OFF')
+        for table in dict.fromkeys(table for table, _, _ in FOREIGN_KEYS):
+            # Columns given here replace the reflected ones, foreign key included
+            columns = [sa.Column(column, sa.Integer, sa.ForeignKey(f'{referred}.id', ondelete=ondelete))
+                       for t, column, referred in FOREIGN_KEYS if t == table]
+            with op.batch_alter_table(table, recreate='always', reflect_args=columns):
+                pass
+        with op.get_context().autocommit_block():
+            op.execute('PRAGMA foreign_keys=ON')
+        return
+
+    for table, column, referred in FOREIGN_KEYS:
+        name = _constraint_name(table, column)
+        if name:
+            op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(f'fk_{table}_{column}', table, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _set_ondelete('CASCADE')
+
+
+def downgrade():
+    _set_ondelete(None)
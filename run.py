@@ -0,0 +1,19 @@
+"""
+Start the development server: python run.py
+
+The app is imported inside main() rather than at the top of the file:
+spawned worker processes (the Excel SheetPool) import the main script again
+as __mp_main__, and must not repeat the app's start-up when they do.
+"""
+import os
+
+
+def main():
+    from app import app
+    host = os.environ.get("HOST", "0.0.0.0")  # Default to 0.0.0.0
+    port = int(os.environ.get("HOST_PORT", 8080))  # Default to 8080
+    app.run(debug=True, host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import { EvenSpacing } from './even_spacing.js';
 import { MeasurementManager } from './modules/MeasurementManager.js';
 import { InstallationInstruction } from './modules/InstallationInstruction.js';
 import { SnapLineManager } from './modules/SnapLineManager.js';
+import { PositionBatcher } from './modules/PositionBatcher.js';
+import { SceneRevalidator } from './modules/SceneRevalidator.js';
 
 document.addEventListener('DOMContentLoaded', function() {
     console.log('DOM Loaded: Starting wall editor setup');
@@ -325,20 +327,11 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         }
 
-        // Update the updateArtworkPosition function to handle removal
-        function updateArtworkPosition(id, x, y, wall_id = null) {
-            fetch(`/update_artwork_position/${id}`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'X-CSRFToken': window.csrfToken
-                },
-                body: JSON.stringify({
-                    x_position: x,
-                    y_position: y,
-                    wall_id: wall_id !== null ? wall_id : window.currentWallData.id
-                })
-            }).catch(error => console.error('Error updating position:', error));
+        // Moves are coalesced and saved in one request per batch;
+        // pass wall_id = null to take the artwork off the wall
+        const positionBatcher = new PositionBatcher(window.currentWallData.id);
+        function updateArtworkPosition(id, x, y, wall_id = undefined) {
+            return positionBatcher.moveArtwork(id, x, y, wall_id);
         }
 
 
@@ -424,6 +417,13 @@ document.addEventListener('DOMContentLoaded', function() {
             renderArtworks();
         });
 
+        // The editor is rendered server-side, so a wall that changed elsewhere
+        // is picked up by reloading the page
+        new SceneRevalidator(window.sceneUrl, window.sceneEtag, {
+            beforeCheck: () => positionBatcher.flush(),
+            onChange: () => window.location.reload()
+        });
+
         // Add Artwork button handler
         const addArtworkBtn = document.getElementById('addArtworkBtn');
         if (addArtworkBtn) {
@@ -464,6 +464,7 @@ document.addEventListener('DOMContentLoaded', function() {
             wall: window.currentWallData,
             placedArtworks: placedArtworks,
             updateArtworkPosition: updateArtworkPosition,
+            flushPositions: () => positionBatcher.flush(),
             renderArtworks: renderArtworks,
             getScale: getScale, 
             drawWall: drawWall,
@@ -247,11 +247,12 @@ export class EvenSpacing {
             // Calculate Y position so center is at yPosCenter
             artwork.y_position = yPosCenter - (artwork.height / 2);
 
-            // Update in database
-            await this.editor.updateArtworkPosition(artwork.id, artwork.x_position, artwork.y_position);
+            // Queue the move; all of them are saved together below
+            this.editor.updateArtworkPosition(artwork.id, artwork.x_position, artwork.y_position);
 
             currentX += artwork.width + spacing;
         }
+        await this.editor.flushPositions();
 
         // Refresh the display
         this.editor.renderArtworks();
@@ -1,5 +1,6 @@
 import { CollisionDetector } from './modules/CollisionDetector.js';
 import { MeasurementManager } from './modules/MeasurementManager.js';
+import { PositionBatcher } from './modules/PositionBatcher.js';
 
 const canvas = document.getElementById('wall-canvas');
 const ctx = canvas.getContext('2d');
@@ -215,33 +216,12 @@ function makeObjectsDraggable() {
     });
 }
 
+// Moves are coalesced and saved in one request per batch
+const positionBatcher = new PositionBatcher(window.wallData.id);
+
 function updateObjectPosition(objId, x, y) {
-    const url = `${window.urls.updatePosition}${objId}`;
-    fetch(url, {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-            'X-CSRFToken': window.csrfToken
-        },
-        body: JSON.stringify({ x, y })
-    })
-    .then(response => {
-        if (!response.ok) {
-            console.error('Error updating position:', response.statusText);
-        }
-        return response.json();
-    })
-    .then(data => {
-        if (data.success) {
-            // The local data is already updated in the drag end handler.
-            // const objIndex = window.wallData.permanentObjects.findIndex(o => o.id == objId);
-            // if (objIndex !== -1) {
-            //     window.wallData.permanentObjects[objIndex].x = x;
-            //     window.wallData.permanentObjects[objIndex].y = y;
-            // }
-        }
-    })
-    .catch(error => console.error('Error updating position:', error));
+    // The local data is already updated in the drag end handler.
+    return positionBatcher.moveObject(objId, x, y);
 }
 
 // Handle sidebar toggle
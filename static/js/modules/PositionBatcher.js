@@ -0,0 +1,88 @@
+// static/js/modules/PositionBatcher.js
+//
+// Collects artwork and permanent object moves for one wall and sends them to
+// /walls/<id>/positions in a single request. Moves queued within `delay` ms
+// of each other share a request, and a later move of the same item replaces
+// the earlier one, so dragging or evenly spacing many pieces costs one round
+// trip instead of one per piece.
+export class PositionBatcher {
+    constructor(wallId, { delay = 150 } = {}) {
+        this.url = `/walls/${wallId}/positions`;
+        this.delay = delay;
+        this.artworks = new Map();
+        this.objects = new Map();
+        this.timer = null;
+        this.inFlight = Promise.resolve();
+        this.waiting = null;
+
+        // Send whatever is still pending if the page is closed mid-debounce
+        window.addEventListener('pagehide', () => this.flush({ keepalive: true }));
+    }
+
+    moveArtwork(id, x, y, wallId) {
+        const move = { id, x_position: x, y_position: y };
+        if (wallId === null) {
+            move.wall_id = null; // taken off the wall
+        }
+        this.artworks.set(String(id), move);
+        return this.schedule();
+    }
+
+    moveObject(id, x, y) {
+        this.objects.set(String(id), { id, x, y });
+        return this.schedule();
+    }
+
+    // Resolves once the queued moves have been saved
+    schedule() {
+        clearTimeout(this.timer);
+        if (!this.waiting) {
+            this.waiting = {};
+            this.waiting.promise = new Promise(resolve => { this.waiting.resolve = resolve; });
+        }
+        this.timer = setTimeout(() => this.flush(), this.delay);
+        return this.waiting.promise;
+    }
+
+    flush({ keepalive = false } = {}) {
+        clearTimeout(this.timer);
+        this.timer = null;
+        const waiting = this.waiting;
+        this.waiting = null;
+        if (this.artworks.size === 0 && this.objects.size === 0) {
+            if (waiting) waiting.resolve(null);
+            return this.inFlight;
+        }
+
+        const body = JSON.stringify({
+            artworks: [...this.artworks.values()],
+            permanent_objects: [...this.objects.values()]
+        });
+        this.artworks.clear();
+        this.objects.clear();
+
+        // Keep batches in order so an older batch never overwrites a newer one
+        this.inFlight = this.inFlight.then(() => fetch(this.url, {
+            method: 'POST',
+            keepalive,
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': window.csrfToken
+            },
+            body
+        }))
+        .then(response => response.json())
+        .then(result => {
+            if (!result.success) {
+                console.error('Error updating positions:', result.error);
+            }
+            return result;
+        })
+        .catch(error => {
+            console.error('Error updating positions:', error);
+            return null;
+        });
+        if (waiting) this.inFlight.then(waiting.resolve);
+        return this.inFlight;
+    }
+}
@@ -0,0 +1,46 @@
+// static/js/modules/SceneRevalidator.js
+//
+// Checks whether the wall drawn by the editor is still current when the page
+// is shown again: on returning to the tab, and when the browser restores the
+// page from its back/forward cache. The request sends the scene's ETag in
+// If-None-Match, so an unchanged wall costs a 304 with no body; a changed one
+// (edited in another tab or window) is handed to onChange.
+export class SceneRevalidator {
+    constructor(url, etag, { beforeCheck = () => Promise.resolve(), onChange } = {}) {
+        this.url = url;
+        this.etag = etag;
+        this.beforeCheck = beforeCheck;
+        this.onChange = onChange;
+        this.checking = null;
+
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'visible') this.check();
+        });
+        window.addEventListener('pageshow', event => {
+            if (event.persisted) this.check();
+        });
+    }
+
+    check() {
+        if (!this.etag || this.checking) return this.checking;
+        // Let this page's own pending writes land first
+        this.checking = this.beforeCheck()
+            .then(() => fetch(this.url, {
+                headers: { 'If-None-Match': this.etag },
+                cache: 'no-store'
+            }))
+            .then(async response => {
+                if (response.status !== 200) return null;
+                this.etag = response.headers.get('ETag');
+                const scene = await response.json();
+                this.onChange(scene);
+                return scene;
+            })
+            .catch(error => {
+                console.error('Error checking the wall scene:', error);
+                return null;
+            })
+            .finally(() => { this.checking = null; });
+        return this.checking;
+    }
+}